@@ -1,15 +1,7 @@
 # Bridge to shared module - 桥接到共享模块
-import sys as _sys
-import importlib.util as _importlib_util
-from pathlib import Path as _Path
+import _wq_shared_path  # noqa: F401  确保项目根目录在 sys.path 中
 
-# 直接加载共享模块，避免循环导入
-_shared_file = _Path(__file__).resolve().parent.parent / "wq_shared" / "session_manager.py"
-_spec = _importlib_util.spec_from_file_location("_session_manager_shared", _shared_file)
-_module = _importlib_util.module_from_spec(_spec)
-_spec.loader.exec_module(_module)
-
-# 导出所有公共接口
-SessionManager = _module.SessionManager
+# 通过常规包路径导入，与 wq_shared 共用 sys.modules 中的同一个模块对象
+from wq_shared.session_manager import SessionManager  # noqa: F401
 
 __all__ = ['SessionManager']
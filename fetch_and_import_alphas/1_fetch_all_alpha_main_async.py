@@ -172,13 +172,13 @@ def fetch_single_time_slice(session_proxy: SessionProxy, session_manager: Sessio
             # 根据类型调用相应的函数
             # 注意：不再返回updated_session，SessionProxy会自动管理session
             if alpha_type == "regular":
-                fetched_alphas, filename, info = faa.fetch_and_save_regular_alphas(
+                fetched_count, filename, info = faa.fetch_and_save_regular_alphas(
                     session_proxy, slice_start, slice_end, userkey, base_directory)
             else:
-                fetched_alphas, filename, info = faa.fetch_and_save_super_alphas(
+                fetched_count, filename, info = faa.fetch_and_save_super_alphas(
                     session_proxy, slice_start, slice_end, userkey, base_directory)
             
-            if fetched_alphas:
+            if fetched_count:
                 # 如果不全，标记为失败以进入重试，但仍已保存当前数据
                 if info and info.get('incomplete'):
                     missing = info.get('skipped_offsets', [])
@@ -186,7 +186,7 @@ def fetch_single_time_slice(session_proxy: SessionProxy, session_manager: Sessio
                 # 完整成功 - 重置连续失败计数器
                 consecutive_failures = 0
                 _increment_success_count()
-                return True, f"[Scope:Slice][{thread_name}] 成功获取 {len(fetched_alphas)} 个{alpha_type} alphas -> {filename}", filename
+                return True, f"[Scope:Slice][{thread_name}] 成功获取 {fetched_count} 个{alpha_type} alphas -> {filename}", filename
             else:
                 # 返回None表示失败，增加失败计数
                 consecutive_failures += 1
@@ -776,7 +776,8 @@ def main():
         logger.info("会话初始化完成（使用SessionProxy确保始终获取最新session）")
 
         userkey = wq_login.USER_KEY
-        base_directory = faa.base_directory
+        # 按调用时的用户计算，模块被多个用户复用时不会沿用导入时的目录
+        base_directory = wq_login.WQ_DATA_ROOT / userkey / "primeval_data"
         # 覆盖数据输出目录（如提供）
         if base_directory_override:
             base_directory = Path(base_directory_override)
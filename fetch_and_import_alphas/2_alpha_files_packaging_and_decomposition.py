@@ -172,14 +172,28 @@ def get_correct_target_dir_for_alpha(
     return build_target(None, meta, final_root)
 
 
+def _parse_alpha_file(content: str):
+    """解析切片文件：JSON 数组，或每行一条 alpha 的 NDJSON（OUTPUT_NDJSON 开启时的输出）"""
+    stripped = content.lstrip()
+    if stripped.startswith('['):
+        return json.loads(content)
+    # NDJSON 的首行是完整对象；缩进格式的单个对象首行只有 "{"
+    first_line = stripped.split('\n', 1)[0].rstrip()
+    if first_line.startswith('{') and first_line.endswith('}'):
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
+    return json.loads(content)
+
+
 def split_and_copy_file(
-    file_info: Tuple[pathlib.Path, re.Pattern, pathlib.Path]
+    file_info: Tuple[pathlib.Path, re.Pattern, pathlib.Path],
+    collected: Optional[list] = None
 ) -> Tuple[bool, int, int, str]:
     """
     拆分文件并保存（multiprocessing-safe version）
     
     Args:
         file_info: Tuple of (path, re_name, final_root)
+        collected: 非 None 时，每写出一个 alpha 追加 (kind, 目标路径, alpha)
     
     Returns:
         Tuple of (success, alpha_count, alphas_in_json, error_message)
@@ -197,7 +211,7 @@ def split_and_copy_file(
             content = f.read()
             if not content:
                 return True, 0, 0, ""
-            data = json.loads(content)
+            data = _parse_alpha_file(content)
         
         if not isinstance(data, list):
             return True, 0, 0, ""
@@ -243,6 +257,8 @@ def split_and_copy_file(
                 with open(new_path, 'w', encoding='utf-8') as f_out:
                     json.dump(alpha, f_out, indent=2, ensure_ascii=False)
                 count += 1
+                if collected is not None:
+                    collected.append((kind, str(new_path), alpha))
             except Exception as write_err:
                 return False, count, alphas_in_json, f"Failed to write {new_path}: {write_err}"
         
@@ -254,6 +270,17 @@ def split_and_copy_file(
         return False, 0, 0, f"Unexpected error in {path.name}: {exc}"
 
 
+def split_and_collect_file(
+    file_info: Tuple[pathlib.Path, re.Pattern, pathlib.Path]
+) -> Tuple[bool, int, int, str, list]:
+    """
+    同 split_and_copy_file，并额外返回写出的 (kind, 目标路径, alpha) 列表，
+    供步骤3直接在内存中导入
+    """
+    collected = []
+    return split_and_copy_file(file_info, collected) + (collected,)
+
+
 def find_latest_output_time(final_root: pathlib.Path) -> Optional[datetime]:
     """
     扫描输出目录，找到最新的文件时间（用于incremental模式）
@@ -413,7 +440,8 @@ def group_and_split_by_date(
     workers: int,
     mode: str = 'full',
     start_time_str: Optional[str] = None,
-    end_time_str: Optional[str] = None
+    end_time_str: Optional[str] = None,
+    yield_docs: bool = False
 ):
     """
     按日期分组批量拆分并复制文件
@@ -422,6 +450,8 @@ def group_and_split_by_date(
         mode: 处理模式 'full' | 'incremental' | 'manual'
         start_time_str: 手动模式的起始时间 (格式: YYYY-MM-DD-HH-MM-SS)
         end_time_str: 手动模式的结束时间 (格式: YYYY-MM-DD-HH-MM-SS)
+        yield_docs: 为 True 时返回生成器，文件照常写出，同时逐个产出
+            (kind, 目标路径, alpha)，供步骤3不经磁盘回读直接导入
     """
     stats = ProcessingStats()
     
@@ -487,7 +517,7 @@ def group_and_split_by_date(
     
     if not files_to_process:
         logger.info("未找到需要处理的文件")
-        return
+        return iter(()) if yield_docs else None
     
     stats.total_files = len(files_to_process)
     logger.info(f"发现 {stats.total_files} 个文件需要处理")
@@ -509,11 +539,32 @@ def group_and_split_by_date(
     # Prepare arguments for each file
     file_args = [(file_path, re_name, final_root) for file_path in files_to_process]
     
+    if yield_docs:
+        return _run_split_pool(file_args, workers, stats, collect=True)
+    
+    for _ in _run_split_pool(file_args, workers, stats, collect=False):
+        pass
+    
+    # 步骤4：程序运行完毕，清理所有累积的内存
+    del file_args, files_to_process, stats
+    gc.collect()
+    logger.info("内存清理完成")
+
+
+def _run_split_pool(file_args: list, workers: int, stats: ProcessingStats, collect: bool):
+    """
+    用进程池拆分文件并显示进度，结束时打印统计摘要
+    
+    collect 为 True 时逐个产出各文件写出的 (kind, 目标路径, alpha)，否则不产出任何内容。
+    """
+    worker = split_and_collect_file if collect else split_and_copy_file
+    
     with Pool(processes=workers) as pool:
         # Use imap_unordered for better progress tracking
-        results_iterator = pool.imap_unordered(split_and_copy_file, file_args)
+        results_iterator = pool.imap_unordered(worker, file_args)
         
-        for success, alpha_count, alphas_in_json, error_msg in results_iterator:
+        for result in results_iterator:
+            success, alpha_count, alphas_in_json, error_msg = result[:4]
             stats.processed_files += 1
             stats.total_alphas_in_json += alphas_in_json
             
@@ -531,17 +582,15 @@ def group_and_split_by_date(
             print(f"\r进度: {stats.processed_files}/{stats.total_files} ({progress:.1f}%) | "
                   f"已处理:{stats.processed_alphas} 个alpha", 
                   end="", flush=True)
+            
+            if collect:
+                yield from result[4]
     
     print()  # Newline
     logger.info("")
     
     # 步骤3：打印统计摘要
     stats.print_summary()
-    
-    # 步骤4：程序运行完毕，清理所有累积的内存
-    del file_args, files_to_process, stats
-    gc.collect()
-    logger.info("内存清理完成")
 
 
 if __name__ == "__main__":
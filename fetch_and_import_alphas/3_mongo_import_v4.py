@@ -13,22 +13,40 @@ Architecture:
 
 import gc
 import json
+import multiprocessing
 import logging
 import argparse
+import bisect
 import time
 import os
+import re
 import sys
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Tuple, Optional, Set
-from collections import defaultdict
-
+from typing import Any, Callable, Iterator, List, Dict, Tuple, Optional, Set
+from collections import Counter, defaultdict, deque
+from enum import IntEnum
+from contextlib import nullcontext
+from functools import partial
+
+import bson
+from bson.raw_bson import RawBSONDocument
 from pymongo import MongoClient, UpdateOne, ReplaceOne
 from pymongo.errors import ConnectionFailure, BulkWriteError
 from multiprocessing import Pool, cpu_count
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+# Bound once at import so every worker reuses the same C decoder entry point
+# (orjson.JSONDecodeError subclasses json.JSONDecodeError)
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 # Check for Python 3.14+ free-threading support (GIL disabled)
 GIL_ENABLED = True
 if hasattr(sys, '_is_gil_enabled'):
@@ -64,6 +82,15 @@ except ImportError:
 # Constants
 DAY_PARALLEL_FILE_THRESHOLD = 20000
 MAX_PARALLEL_DAYS = 4
+DEFAULT_COMPRESSORS = None  # Wire compression is opt-in (e.g. 'zstd,zlib' for a remote server)
+BULK_WRITE_MIN_SHARD_OPS = 500  # Smallest op slice worth a separate concurrent bulk_write
+UNPARSED_MONTH_KEY = 999999  # Sort key for month dirs without a YYYY-MM segment (kept by every window)
+ID_SCAN_BYTES = 4096  # Bytes read when sniffing the document ID without a full parse
+BATCH_QUERY_CHUNK_SIZE = 1000  # IDs per $in sub-query in batch-query mode
+BATCH_QUERY_THREADS = 4  # Concurrent $in sub-queries per worker (also the worker's connection pool size)
+PREFETCH_WINDOW_FILES = 64  # Files opened and fadvised ahead of the one being parsed (bounds open fds)
+
+_MONTH_SEGMENT_PATTERN = re.compile(r"(\d{4})-(\d{2})")
 
 # Initialize logger
 logger = get_logger('MongoDB_Importer_v4')
@@ -77,7 +104,27 @@ logger = get_logger('MongoDB_Importer_v4')
 # ----------------------------------------------------------------------------
 
 class Config:
-    """Configuration container with validation"""
+    """
+    Configuration container with validation.
+
+    Fields are declared in __slots__ (no per-instance __dict__, and a typo
+    in an attribute name fails instead of silently adding one). Once CLI
+    overrides are applied, parse_arguments() calls freeze() so the phases
+    that share this instance cannot change it underneath each other.
+    """
+
+    __slots__ = (
+        'db_host', 'db_port', 'db_port_27017', 'db_port_27018',
+        'db_name_regular', 'db_name_super', 'compressors', 'write_concern',
+        'data_base_path', 'regular_collection', 'super_collection',
+        'workers', 'batch_size', 'bulk_write_threads', 'bulk_ordered', 'bypass_document_validation',
+        'fast_mode', 'fast_mode_months', 'use_preload', 'use_batch_query', 'server_side_merge',
+        'parallel_days_mode', 'parallel_days_workers', 'parallel_phases', 'mtime_delta_import',
+        'prefetch_next_month',
+        'time_range_hours', 'time_range_buffer_days',
+        'key_field', 'state_file', 'use_smart_validation', 'log_path', 'import_mode',
+        '_frozen'
+    )
     
     def __init__(self, config_dict: dict):
         # MongoDB settings
@@ -91,6 +138,8 @@ class Config:
         self.db_port_27018 = self._coerce_int(raw_port_27018, 27018) if raw_port_27018 is not None else None
         self.db_name_regular = config_dict.get('db_name_regular', 'regular_alphas')
         self.db_name_super = config_dict.get('db_name_super', 'super_alphas')
+        self.compressors = config_dict.get('compressors', DEFAULT_COMPRESSORS) or None
+        self.write_concern = self._coerce_write_concern(config_dict.get('write_concern', 1))
         
         # Data paths
         self.data_base_path = config_dict.get('data_base_path') or \
@@ -104,16 +153,25 @@ class Config:
         self.workers = self._coerce_int(raw_workers, default_workers) if raw_workers is not None else default_workers
         raw_batch_size = config_dict.get('batch_size')
         self.batch_size = self._coerce_int(raw_batch_size, 1000) if raw_batch_size is not None else 1000
+        self.bulk_write_threads = self._coerce_int(config_dict.get('BULK_WRITE_THREADS', 4), 4)
+        self.bulk_ordered = self._coerce_bool(config_dict.get('BULK_ORDERED', False))
+        self.bypass_document_validation = self._coerce_bool(
+            config_dict.get('BYPASS_DOCUMENT_VALIDATION', False)
+        )
         
         # Advanced toggles
         self.fast_mode = self._coerce_bool(config_dict.get('FAST_MODE', False))
         self.fast_mode_months = self._coerce_int(config_dict.get('FAST_MODE_MONTHS', 3), 3)
         self.use_preload = self._coerce_bool(config_dict.get('USE_PRELOAD', True))
         self.use_batch_query = self._coerce_bool(config_dict.get('USE_BATCH_QUERY', False))
+        self.server_side_merge = self._coerce_bool(config_dict.get('SERVER_SIDE_MERGE', False))
         self.parallel_days_mode = self._coerce_bool(config_dict.get('PARALLEL_DAYS_MODE', False))
         self.parallel_days_workers = self._coerce_int(
             config_dict.get('PARALLEL_DAYS_WORKERS', 2), 2
         )
+        self.parallel_phases = self._coerce_bool(config_dict.get('PARALLEL_PHASES', False))
+        self.mtime_delta_import = self._coerce_bool(config_dict.get('MTIME_DELTA_IMPORT', False))
+        self.prefetch_next_month = self._coerce_bool(config_dict.get('PREFETCH_NEXT_MONTH', False))
         
         # Time-range settings
         self.time_range_hours = self._coerce_int(
@@ -160,6 +218,21 @@ class Config:
         except (TypeError, ValueError):
             raise ValueError(f"Expected integer value, got {value!r}")
     
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError(f"Config is frozen, cannot set '{name}'")
+        object.__setattr__(self, name, value)
+
+    def freeze(self) -> None:
+        """Make this instance read-only."""
+        object.__setattr__(self, '_frozen', True)
+
+    @staticmethod
+    def _coerce_write_concern(value):
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value)
+        return value
+
     def _calculate_default_workers(self) -> int:
         """Calculate default number of workers"""
         try:
@@ -179,6 +252,15 @@ class Config:
         if self.batch_size < 1:
             raise ValueError(f"Batch size must be >= 1, got {self.batch_size}")
         
+        if self.bulk_write_threads < 1:
+            raise ValueError(f"BULK_WRITE_THREADS must be >= 1, got {self.bulk_write_threads}")
+        
+        # w=0 is rejected: unacknowledged writes report no counts and files
+        # would be marked processed without knowing they were stored
+        if not (self.write_concern == 'majority'
+                or (isinstance(self.write_concern, int) and self.write_concern >= 1)):
+            raise ValueError(f"write_concern must be an integer >= 1 or 'majority', got {self.write_concern!r}")
+        
         valid_modes = ['incremental_fast', 'incremental_slow', 
                       'overwrite', 'rebuild', 'time_range', 'smart_merge', 'smart_incremental_slow']
         if self.import_mode not in valid_modes:
@@ -271,6 +353,24 @@ def _add_boolean_cli_flag(
     parser.set_defaults(**{dest: default})
 
 
+def create_mongo_client(config: Config) -> MongoClient:
+    """
+    Create the MongoClient shared by both import phases.
+
+    One client means one topology discovery and one set of monitor threads
+    per run. The pool is sized for the main process's concurrent bulk writes
+    (never below the driver default), and the configured write concern is
+    applied to every write (w=1 skips replica-set majority acknowledgement).
+    """
+    return MongoClient(
+        host=config.db_host,
+        port=config.db_port,
+        compressors=config.compressors,
+        maxPoolSize=max(100, config.workers * 2),
+        w=config.write_concern
+    )
+
+
 def test_mongodb_connection(host: str, port: int) -> bool:
     """Test MongoDB connection"""
     try:
@@ -378,36 +478,58 @@ def filter_files_by_time_window(
     return kept
 
 
-def extract_month_from_dirname(directory: Path) -> Optional[datetime]:
-    """Extract YYYY-MM from directory name."""
+def month_key_from_segment(segment: str) -> int:
+    """Map a 'YYYY-MM' directory name segment to YYYYMM (UNPARSED_MONTH_KEY if malformed)."""
+
+    match = _MONTH_SEGMENT_PATTERN.fullmatch(segment)
+    if not match:
+        return UNPARSED_MONTH_KEY
+    year, month = int(match.group(1)), int(match.group(2))
+    if not 1 <= month <= 12:
+        return UNPARSED_MONTH_KEY
+    return year * 100 + month
 
-    try:
-        parts = directory.name.split('_')
-        for part in parts:
-            if len(part) == 7 and part[4] == '-':
-                month_dt = datetime.strptime(part, '%Y-%m')
-                return month_dt.replace(tzinfo=timezone.utc)
-    except Exception:
-        return None
-    return None
+
+def _month_entry_sort_key(entry: Tuple[int, Path]) -> Tuple[int, str]:
+    """Sort key for (YYYYMM, path) entries: month first, then directory name."""
+    return entry[0], entry[1].name
 
 
 def filter_month_dirs_by_window(
-    month_dirs: List[Path],
+    month_entries: List[Tuple[int, Path]],
     window_start: Optional[datetime]
-) -> List[Path]:
-    """Filter month directories so they start at or after window_start."""
+) -> List[Tuple[int, Path]]:
+    """Filter (YYYYMM, path) entries, sorted by key, to months at or after window_start."""
 
     if window_start is None:
-        return month_dirs
+        return month_entries
+
+    # (key,) sorts before every (key, path), so this finds the first month >= window
+    cut = bisect.bisect_left(month_entries, (window_start.year * 100 + window_start.month,))
+    return month_entries[cut:]
 
-    filtered = []
-    for month_dir in month_dirs:
-        month_dt = extract_month_from_dirname(month_dir)
-        if month_dt is None or month_dt >= window_start.replace(day=1, hour=0, minute=0, second=0, microsecond=0):
-            filtered.append(month_dir)
 
-    return filtered
+def _add_log_file_handler(log_path: Path) -> bool:
+    """Attach a FileHandler for log_path to the root logger; returns False if one is already attached."""
+
+    root_logger = logging.getLogger()
+    existing_paths = {
+        getattr(handler, 'baseFilename', None)
+        for handler in root_logger.handlers
+        if hasattr(handler, 'baseFilename')
+    }
+
+    if str(log_path) in existing_paths:
+        return False
+
+    file_handler = logging.FileHandler(log_path, encoding='utf-8')
+    formatter = logging.Formatter(
+        '%(asctime)s - %(processName)s/%(threadName)s - %(levelname)s - %(message)s',
+        '%Y-%m-%d %H:%M:%S'
+    )
+    file_handler.setFormatter(formatter)
+    root_logger.addHandler(file_handler)
+    return True
 
 
 def configure_logging(config: Config) -> None:
@@ -419,42 +541,89 @@ def configure_logging(config: Config) -> None:
     try:
         log_path = Path(config.log_path)
         log_path.parent.mkdir(parents=True, exist_ok=True)
+        if _add_log_file_handler(log_path):
+            logger.info(f"File logging enabled: {log_path}")
+    except Exception as e:
+        logger.warning(f"Failed to configure log file '{config.log_path}': {e}")
+
+
+# (db_name, collection_name, key_field) already known to have the key index
+_INDEX_CREATED: Set[Tuple[str, str, str]] = set()
+
+
+def ensure_key_index(collection, key_field: str) -> None:
+    """
+    Make sure a unique index on key_field exists, creating it only if missing.
+
+    Checks index_information() first so an existing index never triggers a
+    createIndexes call, and remembers the result per process so later phases
+    on the same collection skip the check entirely.
+    """
+    cache_key = (collection.database.name, collection.name, key_field)
+    if cache_key in _INDEX_CREATED:
+        return
+
+    has_index = any(
+        info.get('key') == [(key_field, 1)]
+        for info in collection.index_information().values()
+    )
+    if not has_index:
+        collection.create_index(key_field, unique=True)
+    _INDEX_CREATED.add(cache_key)
+
+
+# (db_name, collection_name, field) -> name of an index led by (field, -1)
+_DESC_INDEX_NAMES: Dict[Tuple[str, str, str], str] = {}
 
-        root_logger = logging.getLogger()
-        existing_paths = {
-            getattr(handler, 'baseFilename', None)
-            for handler in root_logger.handlers
-            if hasattr(handler, 'baseFilename')
-        }
 
-        if str(log_path) in existing_paths:
-            return
+def ensure_desc_index(collection, field: str) -> Optional[str]:
+    """
+    Return the name of an index led by (field, -1), creating one if missing.
+
+    Any existing index whose first key is (field, -1) is reused whatever its
+    name, since it serves the descending sort just as well. A new index is
+    created as (field desc, id asc), the same spec fetch_updated_alphas.py
+    builds on dateModified, so the two scripts share a single index. Returns
+    None if the index cannot be created, so callers can skip the hint and
+    fall back to an unhinted query.
+    """
+    cache_key = (collection.database.name, collection.name, field)
+    if cache_key in _DESC_INDEX_NAMES:
+        return _DESC_INDEX_NAMES[cache_key]
 
-        file_handler = logging.FileHandler(log_path, encoding='utf-8')
-        formatter = logging.Formatter(
-            '%(asctime)s - %(processName)s - %(levelname)s - %(message)s',
-            '%Y-%m-%d %H:%M:%S'
+    try:
+        name = next(
+            (index_name for index_name, info in collection.index_information().items()
+             if info.get('key', [])[:1] == [(field, -1)]),
+            None
         )
-        file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
-        logger.info(f"File logging enabled: {log_path}")
+        if name is None:
+            name = collection.create_index([(field, -1), ("id", 1)], name=f"{field}_desc")
     except Exception as e:
-        logger.warning(f"Failed to configure log file '{config.log_path}': {e}")
+        logger.warning(f"Could not ensure descending index on '{field}': {e}")
+        return None
+
+    _DESC_INDEX_NAMES[cache_key] = name
+    return name
+
+
+def _find_latest(collection, field: str) -> Optional[dict]:
+    """Newest document by field, read through its descending index when available."""
+    projection = {"_id": 0, "dateModified": 1, "dateCreated": 1}
+    cursor = collection.find({field: {"$exists": True}}, projection).sort(field, -1).limit(1)
+    index_name = ensure_desc_index(collection, field)
+    if index_name:
+        cursor = cursor.hint(index_name)
+    return next(cursor, None)
 
 
 def get_latest_alpha_timestamp(collection) -> Optional[datetime]:
     """Fetch the latest alpha timestamp (dateModified/dateCreated) from MongoDB."""
 
     try:
-        latest_doc = collection.find_one(
-            {"dateModified": {"$exists": True}},
-            sort=[("dateModified", -1)]
-        )
+        latest_doc = _find_latest(collection, "dateModified")
         if not latest_doc:
-            latest_doc = collection.find_one(
-                {"dateCreated": {"$exists": True}},
-                sort=[("dateCreated", -1)]
-            )
+            latest_doc = _find_latest(collection, "dateCreated")
 
         if not latest_doc:
             return None
@@ -493,7 +662,8 @@ def process_month_parallel_days(
     state_manager,
     alpha_type: str,
     time_window_start: Optional[datetime],
-    time_window_end: Optional[datetime]
+    time_window_end: Optional[datetime],
+    modified_after: Optional[float] = None
 ) -> Optional[dict]:
     """Process a month directory day-by-day when parallel day mode is enabled."""
 
@@ -529,7 +699,7 @@ def process_month_parallel_days(
 
     for day_dir in day_dirs:
         try:
-            day_paths = list(day_dir.rglob('*.json'))
+            day_paths = scan_directory_for_json(day_dir, modified_after)
         except Exception as e:
             logger.warning(f"Failed to scan {day_dir}: {e}")
             continue
@@ -553,7 +723,7 @@ def process_month_parallel_days(
 
     def _process_single_day(day_name: str, files: List[str]):
         logger.info("Parallel day start: %s (%d files)", day_name, len(files))
-        stats = process_batch(files, collection, config, None, show_progress=False)
+        stats = process_batch(files, collection, config, None, show_progress=False, pool=pool)
         stats['day_name'] = day_name
         logger.info(
             "Parallel day finished: %s | processed=%d updated=%d inserted=%d errors=%d",
@@ -567,7 +737,11 @@ def process_month_parallel_days(
 
     all_processed_paths: List[str] = []
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    # Day threads share one worker pool: Pool accepts tasks from several
+    # threads, so days interleave on the same `workers` processes instead of
+    # each day starting (and tearing down) a pool of its own
+    with create_worker_pool(collection, config) as pool, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_map = {
             executor.submit(_process_single_day, day_name, file_list): (day_name, file_list)
             for day_name, file_list in day_tasks
@@ -616,7 +790,12 @@ def deep_merge_dicts(old_dict: dict, new_dict: dict) -> dict:
     """
     if not isinstance(old_dict, dict) or not isinstance(new_dict, dict):
         return new_dict
-    
+
+    # Fast path: with no container values in new_dict every key is a plain
+    # override, so a single C-level dict merge gives the same result
+    if not any(isinstance(v, (dict, list)) for v in new_dict.values()):
+        return {**old_dict, **new_dict}
+
     result = old_dict.copy()
     
     for key, new_value in new_dict.items():
@@ -705,12 +884,15 @@ def merge_arrays(old_array: list, new_array: list) -> list:
 # 1.3 File Scanner Module
 # ----------------------------------------------------------------------------
 
-def scan_directory_for_json(directory: Path) -> List[Path]:
+def scan_directory_for_json(directory: Path, modified_after: Optional[float] = None) -> List[Path]:
     """
     Recursively scan directory for all .json files.
     
     Args:
         directory: Directory to scan
+        modified_after: If set, only return files with mtime newer than this
+            Unix timestamp (walks with os.scandir so the stat comes from the
+            directory entry)
     
     Returns:
         List of Path objects for JSON files
@@ -718,7 +900,25 @@ def scan_directory_for_json(directory: Path) -> List[Path]:
     if not directory.exists() or not directory.is_dir():
         return []
     
-    return list(directory.rglob('*.json'))
+    if modified_after is None:
+        return list(directory.rglob('*.json'))
+
+    found: List[Path] = []
+    pending = [str(directory)]
+    while pending:
+        current = pending.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    # Don't descend into symlinked dirs (same as rglob): a link
+                    # cycle would otherwise keep the walk going forever
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.endswith('.json') and entry.stat().st_mtime > modified_after:
+                        found.append(Path(entry.path))
+        except OSError as e:
+            logger.warning(f"Failed to scan {current}: {e}")
+    return found
 
 
 def filter_files_by_state(files: List[Path], state_manager, mode: str, workers: int = 32) -> List[str]:
@@ -755,6 +955,25 @@ def filter_files_by_state(files: List[Path], state_manager, mode: str, workers:
 # 1.4 ID Extraction Module
 # ----------------------------------------------------------------------------
 
+_KEY_PREFIX_PATTERNS: Dict[str, 're.Pattern[bytes]'] = {}
+
+
+def _key_prefix_pattern(key_field: str) -> 're.Pattern[bytes]':
+    """
+    Return a compiled regex matching `key_field` as the first top-level key.
+
+    Only the leading key is accepted so that a nested object carrying the
+    same field name can never be mistaken for the document ID.
+    """
+    pattern = _KEY_PREFIX_PATTERNS.get(key_field)
+    if pattern is None:
+        pattern = re.compile(
+            rb'\s*\{\s*"' + re.escape(key_field.encode('utf-8')) + rb'"\s*:\s*"([^"\\]*)"'
+        )
+        _KEY_PREFIX_PATTERNS[key_field] = pattern
+    return pattern
+
+
 def _extract_id_worker(args: Tuple[str, str]) -> Optional[str]:
     """
     Worker function to extract document ID from a single JSON file.
@@ -768,14 +987,20 @@ def _extract_id_worker(args: Tuple[str, str]) -> Optional[str]:
     """
     file_path, key_field = args
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            doc = json.load(f)
+        with open(file_path, 'rb') as f:
+            head = f.read(ID_SCAN_BYTES)
+            match = _key_prefix_pattern(key_field).match(head)
+            if match:
+                return match.group(1).decode('utf-8')
+            # Key is not the leading field: fall back to a full parse
+            doc = _json_loads(head + f.read())
             return doc.get(key_field)
     except Exception:
         return None
 
 
-def extract_document_ids_parallel(file_paths: List[str], workers: int, key_field: str) -> List[str]:
+def extract_document_ids_parallel(file_paths: List[str], workers: int, key_field: str,
+                                  pool=None) -> List[str]:
     """
     Extract document IDs from JSON files in parallel.
     
@@ -783,6 +1008,7 @@ def extract_document_ids_parallel(file_paths: List[str], workers: int, key_field
         file_paths: List of file paths
         workers: Number of worker processes
         key_field: Field name for document ID (default: 'id')
+        pool: Existing worker pool to reuse (a temporary pool is created if None)
     
     Returns:
         List of unique document IDs
@@ -800,7 +1026,7 @@ def extract_document_ids_parallel(file_paths: List[str], workers: int, key_field
     chunksize = max(1, len(file_paths) // (workers * 4))
     
     # Parallel extraction
-    with Pool(processes=workers) as pool:
+    with (nullcontext(pool) if pool is not None else Pool(processes=workers)) as pool:
         doc_ids_raw = pool.map(_extract_id_worker, args_list, chunksize=chunksize)
     
     # Filter out None values and get unique IDs
@@ -825,17 +1051,18 @@ def _query_batch_worker(args: Tuple) -> Dict[str, dict]:
     Used by multiprocessing.Pool.
     
     Args:
-        args: Tuple of (batch_ids, key_field, db_host, db_port, db_name, collection_name)
+        args: Tuple of (batch_ids, key_field, db_host, db_port, db_name, collection_name, compressors)
     
     Returns:
         Dictionary of {doc_id: document}
     """
-    batch_ids, key_field, db_host, db_port, db_name, collection_name = args
+    batch_ids, key_field, db_host, db_port, db_name, collection_name, compressors = args
     batch_docs = {}
     
     try:
         # Each worker creates its own MongoDB connection
-        client = MongoClient(host=db_host, port=db_port, serverSelectionTimeoutMS=10000)
+        client = MongoClient(host=db_host, port=db_port, serverSelectionTimeoutMS=10000,
+                             compressors=compressors)
         collection = client[db_name][collection_name]
         
         # Query this batch of IDs
@@ -861,7 +1088,9 @@ def preload_documents_from_db(
     collection,
     doc_ids: List[str],
     key_field: str,
-    workers: int
+    workers: int,
+    compressors: Optional[str] = None,
+    pool=None
 ) -> Dict[str, dict]:
     """
     Preload documents from MongoDB using parallel $in queries.
@@ -871,6 +1100,8 @@ def preload_documents_from_db(
         doc_ids: List of document IDs to query
         key_field: Field name for document ID
         workers: Number of worker processes for parallel queries
+        compressors: Wire compressors for the query connections (None disables)
+        pool: Existing worker pool to reuse (a temporary pool is created if None)
     
     Returns:
         Dictionary of {doc_id: document}
@@ -897,19 +1128,22 @@ def preload_documents_from_db(
     db_host, db_port = collection.database.client.address
     query_args = [
         (batch_ids, key_field, db_host, db_port, 
-         collection.database.name, collection.name)
+         collection.database.name, collection.name, compressors)
         for batch_ids in batch_id_list
     ]
     
     # Parallel queries
     query_workers = min(workers, total_batches)
-    with Pool(processes=query_workers) as pool:
+    with (nullcontext(pool) if pool is not None else Pool(processes=query_workers)) as pool:
         batch_results = pool.map(_query_batch_worker, query_args)
     
-    # Merge all batch results
-    preloaded_docs = {}
-    for batch_docs in batch_results:
-        preloaded_docs.update(batch_docs)
+    # Merge all batch results: seed with the largest batch dict so its table is
+    # reused as-is, and release each merged batch so peak memory stays ~1x
+    batch_results.sort(key=len, reverse=True)
+    preloaded_docs = batch_results[0] if batch_results else {}
+    for i in range(1, len(batch_results)):
+        preloaded_docs.update(batch_results[i])
+        batch_results[i] = None
     
     preload_time = time.time() - start_time
     hit_rate = (len(preloaded_docs) / len(doc_ids)) * 100 if doc_ids else 0
@@ -924,30 +1158,221 @@ def preload_documents_from_db(
 # PHASE 2: WORKER PROCESS IMPLEMENTATION
 # ============================================================================
 
+class Mode(IntEnum):
+    """Per-batch write strategy, resolved once so workers branch on a single int."""
+    REBUILD = 0            # ReplaceOne, no lookups
+    SERVER_MERGE = 1       # Pipeline upsert, MongoDB merges ($mergeObjects)
+    MERGE_PRELOAD = 2      # Deep merge against docs preloaded by the main process
+    MERGE_BATCH_QUERY = 3  # Deep merge against one $in query per chunk
+    MERGE_PER_DOC = 4      # Deep merge against a find_one per document
+
+
+def resolve_mode(config: 'Config', preloaded_docs: Optional[Dict[str, dict]]) -> Mode:
+    """Map import mode, merge toggles and preload outcome to a worker Mode."""
+    if config.import_mode == 'rebuild':
+        return Mode.REBUILD
+    if config.server_side_merge:
+        return Mode.SERVER_MERGE
+    if preloaded_docs is not None:
+        return Mode.MERGE_PRELOAD
+    if config.use_batch_query:
+        return Mode.MERGE_BATCH_QUERY
+    return Mode.MERGE_PER_DOC
+
+
 # Thread-local storage for worker connections
 _worker_db_client = None
 _worker_collection = None
 
-def _init_worker_connection(db_host: str, db_port: int, db_name: str, collection_name: str):
+def _init_worker_connection(db_host: str, db_port: int, db_name: str, collection_name: str,
+                            compressors: Optional[str] = None):
     """Initialize MongoDB connection for this worker process (called once per worker)"""
     global _worker_db_client, _worker_collection
     try:
         _worker_db_client = MongoClient(host=db_host, port=db_port, 
                                         serverSelectionTimeoutMS=10000,
-                                        maxPoolSize=1)  # Each worker needs only 1 connection
+                                        maxPoolSize=BATCH_QUERY_THREADS,  # One connection per concurrent sub-query
+                                        compressors=compressors)
         _worker_collection = _worker_db_client[db_name][collection_name]
     except Exception as e:
         logger.error(f"Worker connection initialization failed: {e}")
         _worker_db_client = None
         _worker_collection = None
 
+
+def _init_worker(log_path: Optional[str], log_level: int, *connection_info):
+    """
+    Pool initializer: restore logging, open the persistent connection when needed, then freeze GC.
+
+    forkserver/spawn workers re-import this module instead of inheriting the
+    parent's root logger, so the parent's level and log file are passed in and
+    re-applied here; otherwise worker warnings would only reach stdout.
+
+    gc.freeze() moves modules, the client and everything else created at
+    start-up into the permanent generation, so collections triggered while
+    parsing chunks only walk the short-lived per-chunk objects.
+    """
+    logging.getLogger().setLevel(log_level)
+    if log_path:
+        try:
+            _add_log_file_handler(Path(log_path))
+        except OSError as e:
+            logger.warning(f"Worker failed to open log file '{log_path}': {e}")
+    if connection_info:
+        _init_worker_connection(*connection_info)
+    gc.freeze()
+
+
+def _prefetch_files(file_paths: List[str]) -> None:
+    """
+    Hint the kernel to start reading files into the page cache (Linux only).
+
+    Used to warm the next month in the background; the files are closed
+    again and read later by the workers. No-op on platforms
+    without posix_fadvise; errors are ignored since this is only a hint.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+
+    for file_path in file_paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+def _iter_prefetched_files(file_paths: List[str],
+                           window: int = PREFETCH_WINDOW_FILES) -> Iterator[Tuple[str, Optional[int]]]:
+    """
+    Yield (path, fd) with each file opened and fadvised up to window files ahead.
+
+    The caller takes ownership of every yielded fd and reads from it directly,
+    so each file is opened once while readahead overlaps with parsing. fd is
+    None where posix_fadvise is unavailable or the open failed; the caller then
+    opens the path itself (and gets the real error). Fds not yet yielded are
+    closed if the caller stops early.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        for file_path in file_paths:
+            yield file_path, None
+        return
+
+    pending = deque()
+    paths = iter(file_paths)
+    try:
+        while True:
+            while len(pending) < window:
+                file_path = next(paths, None)
+                if file_path is None:
+                    break
+                try:
+                    fd = os.open(file_path, os.O_RDONLY)
+                except OSError:
+                    fd = None
+                else:
+                    try:
+                        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                    except OSError:
+                        pass
+                pending.append((file_path, fd))
+            if not pending:
+                return
+            yield pending.popleft()
+    finally:
+        for _, fd in pending:
+            if fd is not None:
+                os.close(fd)
+
+
+def prefetch_month_async(month_path: Path, max_files: int,
+                         modified_after: Optional[float] = None) -> threading.Thread:
+    """
+    Start a daemon thread that fadvises the first max_files JSON files of a month.
+
+    Files are taken in the order process_month will read them, so bounding to
+    one batch threshold warms exactly the first batch without evicting the
+    month currently being imported from the page cache.
+    """
+    def _run():
+        try:
+            files = scan_directory_for_json(month_path, modified_after)
+            files.sort(key=lambda p: (p.parent, p.name))
+            _prefetch_files([str(p) for p in files[:max_files]])
+        except Exception as e:
+            logger.debug("Prefetch of %s failed: %s", month_path.name, e)
+
+    thread = threading.Thread(target=_run, name=f"prefetch-{month_path.name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def _batch_find_existing(collection, key_field: str, doc_ids: List[str]) -> Dict[str, dict]:
+    """
+    Fetch existing documents for doc_ids as {doc_id: doc}, without '_id'.
+
+    The ID list is split into BATCH_QUERY_CHUNK_SIZE pieces so no single $in
+    grows unbounded, and the pieces run on a few threads so the server scans
+    and streams them concurrently. Any query error propagates to the caller.
+    """
+    def fetch(ids: List[str]) -> List[dict]:
+        return list(collection.find({key_field: {"$in": ids}}, {'_id': 0}))
+
+    id_chunks = [doc_ids[i:i + BATCH_QUERY_CHUNK_SIZE]
+                 for i in range(0, len(doc_ids), BATCH_QUERY_CHUNK_SIZE)]
+
+    found: Dict[str, dict] = {}
+    if len(id_chunks) == 1:
+        results = [fetch(id_chunks[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(BATCH_QUERY_THREADS, len(id_chunks))) as executor:
+            results = list(executor.map(fetch, id_chunks))
+
+    for docs in results:
+        for doc in docs:
+            doc_id = doc.get(key_field)
+            if doc_id:
+                found[doc_id] = doc
+    return found
+
+
+def _raw_bson(doc: dict) -> RawBSONDocument:
+    """
+    Encode a document to BSON once, inside the worker.
+
+    bulk_write copies RawBSONDocument bytes verbatim, so the main process no
+    longer re-encodes every operation, and the result pickles back to the
+    parent as a single bytes blob instead of a nested dict.
+    """
+    return RawBSONDocument(bson.encode(doc))
+
+
+def _server_merge_op(key_field: str, doc_id: str, new_doc: dict) -> UpdateOne:
+    """
+    Build an upsert that merges new_doc into the stored document server-side.
+
+    Uses an aggregation-pipeline update (MongoDB 4.2+), so no read round-trip
+    is needed and only new_doc goes over the wire. $literal keeps string
+    values that start with '$' from being evaluated as field paths. Unlike
+    deep_merge_dicts, $mergeObjects is shallow: nested objects and arrays in
+    new_doc replace the stored ones.
+    """
+    new_doc.pop('_id', None)
+    pipeline = [{'$replaceWith': {'$mergeObjects': ['$$ROOT', {'$literal': new_doc}]}}]
+    return UpdateOne({key_field: doc_id}, pipeline, upsert=True)
+
+
 def worker_process(
     file_chunk: List[str],
     key_field: str,
-    import_mode: str,
-    db_connection_info: Tuple[str, int, str, str],
+    mode: 'Mode',
+    db_connection_info: Tuple[str, int, str, str, Optional[str]],
     preloaded_docs: Optional[Dict[str, dict]],
-    use_batch_query: bool,
     use_smart_validation: bool
 ) -> Tuple[List, List[str], int]:
     """
@@ -960,14 +1385,17 @@ def worker_process(
     4. Deep merge if exists (for non-rebuild modes)
     5. Generate UpdateOne or ReplaceOne operation
     6. Return operations, processed paths, and error count
+
+    In Mode.SERVER_MERGE, steps 3-4 are skipped: each document becomes a
+    pipeline UpdateOne that lets MongoDB merge it into the stored document
+    ($mergeObjects, top-level fields only).
     
     Args:
         file_chunk: List of file paths to process
         key_field: Document ID field name
-        import_mode: Import mode ('incremental', 'overwrite', 'rebuild', etc.)
-        db_connection_info: Tuple of (db_host, db_port, db_name, collection_name)
+        mode: Write strategy resolved once per batch by resolve_mode()
+        db_connection_info: Tuple of (db_host, db_port, db_name, collection_name, compressors)
         preloaded_docs: Dictionary of preloaded documents {doc_id: doc}
-        use_batch_query: Whether to batch-fetch existing docs from MongoDB
         use_smart_validation: Whether to validate docs before processing
     
     Returns:
@@ -980,14 +1408,13 @@ def worker_process(
     preload_hits = 0
     preload_misses = 0
 
-    should_deep_merge = import_mode != 'rebuild'
-    should_use_batch_query = use_batch_query and should_deep_merge and preloaded_docs is None
+    should_use_batch_query = mode == Mode.MERGE_BATCH_QUERY
 
     # Use global persistent connection instead of creating new one
     global _worker_db_client, _worker_collection
     collection = None
     db_client_temp = None  # For fallback temporary connections
-    use_fallback = should_deep_merge and preloaded_docs is None
+    use_fallback = mode in (Mode.MERGE_BATCH_QUERY, Mode.MERGE_PER_DOC)
 
     if use_fallback:
         # Reuse persistent connection if available
@@ -997,8 +1424,9 @@ def worker_process(
             # Fallback: create temporary connection (shouldn't happen if initializer worked)
             logger.warning("Worker persistent connection not found, creating temporary connection")
             try:
-                db_host, db_port, db_name, collection_name = db_connection_info
-                db_client_temp = MongoClient(host=db_host, port=db_port, serverSelectionTimeoutMS=10000)
+                db_host, db_port, db_name, collection_name, compressors = db_connection_info
+                db_client_temp = MongoClient(host=db_host, port=db_port, serverSelectionTimeoutMS=10000,
+                                             compressors=compressors)
                 collection = db_client_temp[db_name][collection_name]
             except Exception as e:
                 logger.warning(f"Worker DB connection failed, skipping fallback: {e}")
@@ -1007,10 +1435,10 @@ def worker_process(
 
     # First pass: load docs, validate, and collect metadata
     doc_entries: List[Tuple[str, str, dict]] = []
-    for file_path_str in file_chunk:
+    for file_path_str, fd in _iter_prefetched_files(file_chunk):
         try:
-            with open(file_path_str, 'r', encoding='utf-8') as f:
-                new_doc = json.load(f)
+            with (os.fdopen(fd, 'rb') if fd is not None else open(file_path_str, 'rb')) as f:
+                new_doc = _json_loads(f.read())
         except json.JSONDecodeError:
             logger.error(f"Invalid JSON file: {file_path_str}, skipped")
             errors_in_chunk += 1
@@ -1044,14 +1472,8 @@ def worker_process(
     if should_use_batch_query and collection is not None:
         doc_ids = [doc_id for _, doc_id, _ in doc_entries]
         try:
-            query = {key_field: {"$in": doc_ids}}
-            cursor = collection.find(query)
-            for doc in cursor:
-                doc_id = doc.get(key_field)
-                if doc_id:
-                    doc.pop('_id', None)
-                    batch_lookup[doc_id] = doc
-            logger.debug(f"Batch queried {len(batch_lookup)} existing docs for {len(doc_entries)} candidates")
+            batch_lookup = _batch_find_existing(collection, key_field, doc_ids)
+            logger.debug("Batch queried %d existing docs for %d candidates", len(batch_lookup), len(doc_entries))
         except Exception as e:
             error_msg = str(e).lower()
             # Check if it's a resource/connection error (don't fallback, fail fast)
@@ -1065,18 +1487,19 @@ def worker_process(
                 batch_lookup = {}
                 should_use_batch_query = False
 
+    lookup = preloaded_docs if mode == Mode.MERGE_PRELOAD else batch_lookup
+    debug_merges = len(doc_entries) < 10 and logger.isEnabledFor(logging.DEBUG)
+
     for file_path_str, doc_id, new_doc in doc_entries:
         try:
-            if import_mode == 'rebuild':
-                op = ReplaceOne({key_field: doc_id}, new_doc, upsert=True)
+            if mode == Mode.REBUILD:
+                op = ReplaceOne({key_field: doc_id}, _raw_bson(new_doc), upsert=True)
+            elif mode == Mode.SERVER_MERGE:
+                op = _server_merge_op(key_field, doc_id, new_doc)
             else:
-                old_doc = None
+                old_doc = lookup.get(doc_id)
 
-                if preloaded_docs and doc_id in preloaded_docs:
-                    old_doc = preloaded_docs[doc_id]
-                    preload_hits += 1
-                elif batch_lookup and doc_id in batch_lookup:
-                    old_doc = batch_lookup[doc_id]
+                if old_doc is not None:
                     preload_hits += 1
                 elif collection is not None:
                     try:
@@ -1099,15 +1522,16 @@ def worker_process(
                     try:
                         merged_doc = deep_merge_dicts(old_doc, new_doc)
                         merged_doc.pop('_id', None)
-                        op = UpdateOne({key_field: doc_id}, {"$set": merged_doc}, upsert=True)
+                        op = UpdateOne({key_field: doc_id}, {"$set": _raw_bson(merged_doc)}, upsert=True)
                         # Temporary debug: verify deep merge is being called
-                        if len(doc_entries) < 10:  # Only log for small batches
-                            logger.debug(f"Deep merged doc {doc_id}: {len(old_doc)} old fields + {len(new_doc)} new fields = {len(merged_doc)} merged fields")
+                        if debug_merges:  # Only log for small batches
+                            logger.debug("Deep merged doc %s: %d old fields + %d new fields = %d merged fields",
+                                         doc_id, len(old_doc), len(new_doc), len(merged_doc))
                     except Exception as e:
                         logger.warning(f"Deep merge failed for {file_path_str}: {e}, using simple $set")
-                        op = UpdateOne({key_field: doc_id}, {"$set": new_doc}, upsert=True)
+                        op = UpdateOne({key_field: doc_id}, {"$set": _raw_bson(new_doc)}, upsert=True)
                 else:
-                    op = UpdateOne({key_field: doc_id}, {"$set": new_doc}, upsert=True)
+                    op = UpdateOne({key_field: doc_id}, {"$set": _raw_bson(new_doc)}, upsert=True)
 
             operations.append(op)
             processed_paths.append(file_path_str)
@@ -1133,6 +1557,116 @@ def worker_process(
 # PHASE 3: BATCH PROCESSING ORCHESTRATION
 # ============================================================================
 
+def _worker_process_star(args: tuple) -> Tuple[List, List[str], int]:
+    """Unpack a worker_process argument tuple (Pool.imap passes one argument)."""
+    return worker_process(*args)
+
+
+def bulk_write_parallel(
+    collection,
+    ops: List,
+    executor: Optional[ThreadPoolExecutor],
+    max_shards: int,
+    ordered: bool = False,
+    bypass_document_validation: bool = False
+) -> Tuple[int, int, Set[int]]:
+    """
+    Execute a bulk write, split into shards written concurrently when unordered.
+
+    Since unordered writes have no sequencing, contiguous slices of ops can
+    go to the server in parallel over separate pooled connections. Lists
+    shorter than two shards of BULK_WRITE_MIN_SHARD_OPS, and ordered writes,
+    are sent in one call.
+
+    Args:
+        collection: MongoDB collection object
+        ops: Write operations
+        executor: Thread pool used for the shards (None writes in one call)
+        max_shards: Upper bound on concurrent shards
+        ordered: Stop at the first error; every op from there on counts as failed
+        bypass_document_validation: Skip the collection's schema validator
+
+    Returns:
+        Tuple of (modified_count, upserted_count, failed op indices into ops)
+    """
+    shard_count = min(max_shards, len(ops) // BULK_WRITE_MIN_SHARD_OPS)
+    if executor is None or ordered or shard_count < 2:
+        shards = [(0, ops)]
+    else:
+        shard_size = -(-len(ops) // shard_count)
+        shards = [(start, ops[start:start + shard_size]) for start in range(0, len(ops), shard_size)]
+
+    def _write_shard(shard: Tuple[int, List]) -> Tuple[int, int, Set[int]]:
+        offset, shard_ops = shard
+        try:
+            result = collection.bulk_write(
+                shard_ops, ordered=ordered, bypass_document_validation=bypass_document_validation
+            )
+            return result.modified_count, result.upserted_count, set()
+        except BulkWriteError as bwe:
+            failed = {offset + err['index'] for err in bwe.details.get('writeErrors', [])}
+            if ordered and failed:
+                # An ordered batch aborts at its first error; nothing after it ran
+                failed = set(range(min(failed), offset + len(shard_ops)))
+            return bwe.details.get('nModified', 0), bwe.details.get('nUpserted', 0), failed
+
+    if len(shards) == 1:
+        return _write_shard(shards[0])
+
+    modified = upserted = 0
+    failed_indices: Set[int] = set()
+    for shard_modified, shard_upserted, shard_failed in executor.map(_write_shard, shards):
+        modified += shard_modified
+        upserted += shard_upserted
+        failed_indices |= shard_failed
+    return modified, upserted, failed_indices
+
+
+# gc.freeze()/gc.disable() are process-wide, while batches (parallel days) and
+# phases (concurrent Regular/Super) run in threads; nesting is reference-counted
+# so only the last one out thaws or re-enables the collector
+_GC_STATE_LOCK = threading.Lock()
+_gc_freeze_depth = 0
+_gc_pause_depth = 0
+_gc_was_enabled = True
+
+
+def _gc_freeze_acquire() -> None:
+    """Freeze everything alive now into the permanent generation (pair with _gc_freeze_release)."""
+    global _gc_freeze_depth
+    with _GC_STATE_LOCK:
+        gc.freeze()
+        _gc_freeze_depth += 1
+
+
+def _gc_freeze_release() -> None:
+    """Thaw the permanent generation once no other batch still holds a freeze."""
+    global _gc_freeze_depth
+    with _GC_STATE_LOCK:
+        _gc_freeze_depth -= 1
+        if _gc_freeze_depth == 0:
+            gc.unfreeze()
+
+
+def _gc_pause_acquire() -> None:
+    """Disable automatic GC (pair with _gc_pause_release)."""
+    global _gc_pause_depth, _gc_was_enabled
+    with _GC_STATE_LOCK:
+        if _gc_pause_depth == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pause_depth += 1
+
+
+def _gc_pause_release() -> None:
+    """Restore the GC setting from before the first pause once the last holder releases."""
+    global _gc_pause_depth
+    with _GC_STATE_LOCK:
+        _gc_pause_depth -= 1
+        if _gc_pause_depth == 0 and _gc_was_enabled:
+            gc.enable()
+
+
 def chunk_generator(items: list, chunk_size: int):
     """
     Generate chunks of specified size from a list.
@@ -1148,12 +1682,69 @@ def chunk_generator(items: list, chunk_size: int):
         yield items[i:i + chunk_size]
 
 
+def _mp_context():
+    """
+    Return the multiprocessing context used for worker pools.
+
+    forkserver is preferred where available: workers start from a small
+    server process instead of forking the main process, so they do not
+    inherit its heap (preloaded docs, file lists) or MongoClient threads.
+    Falls back to the platform default (spawn on Windows).
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context()
+
+
+def db_connection_info_for(collection, config: Config) -> Tuple[str, int, str, str, Optional[str]]:
+    """Build the (host, port, db, collection, compressors) tuple handed to workers."""
+    return (
+        config.db_host,
+        config.db_port,
+        collection.database.name,
+        collection.name,
+        config.compressors
+    )
+
+
+def create_worker_pool(collection, config: Config):
+    """
+    Create the worker pool used by process_batch.
+
+    The pool only depends on the collection and config, so callers that run
+    several batches (process_month) create it once and pass it to each
+    process_batch call instead of paying worker start-up per batch.
+    """
+    pool_initargs = (config.log_path, logging.getLogger().level)
+    merge_in_python = config.import_mode != 'rebuild' and not config.server_side_merge
+    if not config.use_preload and merge_in_python:
+        # Only initialize connections if workers will need to query DB
+        pool_initargs += db_connection_info_for(collection, config)
+        logger.info(f"Initializing {config.workers} workers with persistent MongoDB connections")
+
+    return _mp_context().Pool(processes=config.workers, initializer=_init_worker, initargs=pool_initargs)
+
+
+def _discard_pending_results(results_iterator) -> int:
+    """Consume the rest of an imap_unordered iterator without using the results."""
+    discarded = 0
+    while True:
+        try:
+            next(results_iterator)
+        except StopIteration:
+            return discarded
+        except Exception as e:
+            logger.debug(f"Discarded chunk failed: {e}")
+        discarded += 1
+
+
 def process_batch(
     files: List[str],
     collection,
     config: Config,
     state_manager,
-    show_progress: bool = True
+    show_progress: bool = True,
+    pool=None
 ) -> dict:
     """
     Process a batch of files: preload, distribute to workers, bulk write.
@@ -1172,6 +1763,8 @@ def process_batch(
         collection: MongoDB collection object
         config: Configuration object
         state_manager: State manager for tracking processed files
+        pool: Worker pool from create_worker_pool() to reuse; if None a pool is
+            created for this batch and shut down afterwards
     
     Returns:
         Statistics dictionary
@@ -1185,30 +1778,22 @@ def process_batch(
     
     # Step 1: Extract document IDs (if preloading is enabled)
     preloaded_docs = None
-    if config.use_preload and config.import_mode != 'rebuild':
-        doc_ids = extract_document_ids_parallel(files, config.workers, config.key_field)
+    merge_in_python = config.import_mode != 'rebuild' and not config.server_side_merge
+    if config.use_preload and merge_in_python:
+        doc_ids = extract_document_ids_parallel(files, config.workers, config.key_field, pool=pool)
         
         if doc_ids:
             # Step 2: Preload documents from MongoDB
             preloaded_docs = preload_documents_from_db(
-                collection, doc_ids, config.key_field, config.workers
+                collection, doc_ids, config.key_field, config.workers, config.compressors, pool=pool
             )
     
     # Step 3: Prepare database connection info for workers
-    db_connection_info = (
-        config.db_host,
-        config.db_port,
-        collection.database.name,
-        collection.name
-    )
+    db_connection_info = db_connection_info_for(collection, config)
     
     # Step 4: Distribute files to workers
     file_chunks = list(chunk_generator(files, config.batch_size))
-    batch_query_enabled = (
-        config.use_batch_query
-        and config.import_mode != 'rebuild'
-        and preloaded_docs is None
-    )
+    mode = resolve_mode(config, preloaded_docs)
 
     logger.info(f"Distributing {len(file_chunks)} chunks to {config.workers} workers...")
     
@@ -1226,33 +1811,40 @@ def process_batch(
     
     all_processed_paths: List[str] = []
     
-    # Initialize pool with persistent DB connections for each worker (BEFORE progress bar)
-    pool_initializer = None
-    pool_initargs = ()
-    if not config.use_preload and config.import_mode != 'rebuild':
-        # Only initialize connections if workers will need to query DB
-        pool_initializer = _init_worker_connection
-        pool_initargs = db_connection_info
-        logger.info(f"Initializing {config.workers} workers with persistent MongoDB connections")
+    # Reuse the caller's pool, otherwise start one for this batch (BEFORE progress bar)
+    shared_pool = pool is not None
+    pool_context = nullcontext(pool) if shared_pool else create_worker_pool(collection, config)
+    
+    write_executor = (
+        ThreadPoolExecutor(max_workers=config.bulk_write_threads)
+        if config.bulk_write_threads > 1 else None
+    )
     
     progress_iter = tqdm(total=total_files, desc="Processing files", unit="file") if show_progress else None
+
+    # Preloaded docs live for the whole batch: freeze them (and everything
+    # else alive now) so GC passes during the write loop don't rescan them.
+    # Thawed when the last concurrently running batch finishes.
+    _gc_freeze_acquire()
     try:
-        with Pool(processes=config.workers, initializer=pool_initializer, initargs=pool_initargs) as pool:
+        with pool_context as pool:
             # Prepare arguments for each chunk
             args_for_map = [
                 (
                     chunk,
                     config.key_field,
-                    config.import_mode,
+                    mode,
                     db_connection_info,
                     preloaded_docs,
-                    batch_query_enabled,
                     config.use_smart_validation
                 )
                 for chunk in file_chunks
             ]
             
-            results_iterator = pool.starmap(worker_process, args_for_map, chunksize=1)
+            # imap_unordered hands back each chunk as soon as a worker finishes it,
+            # so bulk writes below overlap with workers still parsing later chunks
+            # (starmap would wait for every chunk and hold all their ops at once)
+            results_iterator = pool.imap_unordered(_worker_process_star, args_for_map, chunksize=1)
 
             # Circuit breaker: stop processing if too many consecutive failures
             consecutive_failures = 0
@@ -1290,7 +1882,15 @@ def process_batch(
                         logger.critical("="*80)
                         logger.critical("")
                         
-                        pool.terminate()  # Force kill all workers
+                        if shared_pool:
+                            # Other batches/days still run on this pool, so don't kill it:
+                            # wait out the chunks already submitted and drop their results.
+                            # Workers only build ops, so nothing of this batch reaches
+                            # MongoDB or the state manager after the breaker trips
+                            discarded = _discard_pending_results(results_iterator)
+                            logger.critical(f"Discarded {discarded} in-flight chunk results")
+                        else:
+                            pool.terminate()  # Force kill all workers
                         raise RuntimeError(
                             f"Circuit breaker triggered: {consecutive_failures} consecutive worker failures. "
                             f"System resources exhausted. Reduce workers ({config.workers}) or batch_size ({config.batch_size})"
@@ -1301,19 +1901,23 @@ def process_batch(
                         consecutive_failures = 0
                 
                 # Debug: Log if operations were generated but no changes
-                if ops and len(ops) > 0:
-                    logger.debug(f"Generated {len(ops)} operations for {len(paths)} files")
+                if ops:
+                    logger.debug("Generated %d operations for %d files", len(ops), len(paths))
                 
                 if ops:
-                    try:
-                        # Bulk write to MongoDB
-                        bulk_result = collection.bulk_write(ops, ordered=False)
-                        stats['updated'] += bulk_result.modified_count
-                        stats['inserted'] += bulk_result.upserted_count
-                        
+                    # Bulk write to MongoDB (split across threads for large op lists)
+                    modified, upserted, failed_indices = bulk_write_parallel(
+                        collection, ops, write_executor, config.bulk_write_threads,
+                        ordered=config.bulk_ordered,
+                        bypass_document_validation=config.bypass_document_validation
+                    )
+                    stats['updated'] += modified
+                    stats['inserted'] += upserted
+                    
+                    if not failed_indices:
                         # Log when documents are unchanged (deep merge produced identical result)
-                        if bulk_result.modified_count == 0 and bulk_result.upserted_count == 0 and len(ops) > 0:
-                            logger.debug(f"Bulk write: {len(ops)} ops executed but 0 changes (documents identical after merge)")
+                        if modified == 0 and upserted == 0:
+                            logger.debug("Bulk write: %d ops executed but 0 changes (documents identical after merge)", len(ops))
                         
                         # Update state manager (mark files as processed)
                         if state_manager and paths:
@@ -1322,13 +1926,8 @@ def process_batch(
                         stats['processed'] += len(paths)
                         all_processed_paths.extend(paths)
                         
-                    except BulkWriteError as bwe:
+                    else:
                         # Partial failure: record successful operations only
-                        stats['updated'] += bwe.details.get('nModified', 0)
-                        stats['inserted'] += bwe.details.get('nUpserted', 0)
-                        
-                        # Find failed operations
-                        failed_indices = {err['index'] for err in bwe.details.get('writeErrors', [])}
                         success_paths = [path for i, path in enumerate(paths) if i not in failed_indices]
                         
                         # Record successful files only
@@ -1345,15 +1944,14 @@ def process_batch(
                 
                 if progress_iter is not None:
                     progress_iter.update(len(paths) + errors)
-                
-                # Periodic memory cleanup for large batches
-                if len(all_processed_paths) % 64000 == 0 and len(all_processed_paths) > 0:
-                    gc.collect()
 
     finally:
+        if write_executor is not None:
+            write_executor.shutdown(wait=True)
         if progress_iter is not None:
             progress_iter.close()
-        # Final cleanup
+        # Final cleanup: thaw the batch's frozen objects so they can be reclaimed
+        _gc_freeze_release()
         if preloaded_docs:
             preloaded_docs.clear()
         gc.collect()
@@ -1375,7 +1973,8 @@ def process_month(
     state_manager,
     alpha_type: str,
     time_window_start: Optional[datetime] = None,
-    time_window_end: Optional[datetime] = None
+    time_window_end: Optional[datetime] = None,
+    modified_after: Optional[float] = None
 ) -> dict:
     """
     Process all files in a month directory with automatic batching.
@@ -1394,6 +1993,9 @@ def process_month(
         config: Configuration object
         state_manager: State manager for tracking processed files
         alpha_type: "regular" or "super" (for logging)
+        time_window_start: Drop files whose alpha timestamp is before this
+        time_window_end: Drop files whose alpha timestamp is after this
+        modified_after: Only consider files modified after this Unix timestamp
     
     Returns:
         Statistics dictionary
@@ -1412,14 +2014,15 @@ def process_month(
             state_manager,
             alpha_type,
             time_window_start,
-            time_window_end
+            time_window_end,
+            modified_after
         )
         if day_stats is not None:
             logger.info(f"Month {month_path.name} (day mode) completed in {time.time() - month_start_time:.2f}s")
             return day_stats
     
     # Step 1: Scan directory for JSON files
-    all_files = scan_directory_for_json(month_path)
+    all_files = scan_directory_for_json(month_path, modified_after)
     # 按父目录排序，让同批次的文件来自相近位置，减少磁盘随机读取
     all_files.sort(key=lambda p: (p.parent, p.name))
     logger.info(f"Found {len(all_files):,} JSON files in month directory")
@@ -1459,6 +2062,8 @@ def process_month(
         # Single batch
         logger.info(f"Processing in single batch ({total_files:,} ≤ {threshold:,})")
         stats = process_batch(files_to_process, collection, config, state_manager)
+        # Callers only need the counters; don't keep the month's path list alive
+        stats.pop('processed_paths', None)
     else:
         # Multiple batches
         num_batches = (total_files + threshold - 1) // threshold
@@ -1469,28 +2074,29 @@ def process_month(
         # Accumulate statistics
         total_stats = {'updated': 0, 'inserted': 0, 'errors': 0, 'processed': 0}
         
-        # Process each batch sequentially
-        for batch_idx in range(num_batches):
-            start_idx = batch_idx * threshold
-            end_idx = min(start_idx + threshold, total_files)
-            batch_files = files_to_process[start_idx:end_idx]
+        # Process each batch sequentially on one pool shared by all batches
+        with create_worker_pool(collection, config) as pool:
+            for batch_idx in range(num_batches):
+                start_idx = batch_idx * threshold
+                end_idx = min(start_idx + threshold, total_files)
+                batch_files = files_to_process[start_idx:end_idx]
             
-            logger.info(f"\nBatch {batch_idx + 1}/{num_batches}: "
-                       f"files {start_idx + 1}-{end_idx}")
+                logger.info(f"\nBatch {batch_idx + 1}/{num_batches}: "
+                           f"files {start_idx + 1}-{end_idx}")
             
-            # Process batch
-            batch_stats = process_batch(batch_files, collection, config, state_manager)
+                # Process batch
+                batch_stats = process_batch(batch_files, collection, config, state_manager, pool=pool)
             
-            # Accumulate statistics
-            for key in total_stats:
-                total_stats[key] += batch_stats.get(key, 0)
+                # Accumulate statistics
+                for key in total_stats:
+                    total_stats[key] += batch_stats.get(key, 0)
             
-            # Step 5: Explicit memory cleanup between batches
-            try:
-                gc.collect()
-                logger.debug(f"Memory cleanup after batch {batch_idx + 1}")
-            except Exception as e:
-                logger.warning(f"Memory cleanup failed: {e}")
+                # Step 5: Explicit memory cleanup between batches
+                try:
+                    gc.collect()
+                    logger.debug(f"Memory cleanup after batch {batch_idx + 1}")
+                except Exception as e:
+                    logger.warning(f"Memory cleanup failed: {e}")
         
         stats = total_stats
     
@@ -1512,11 +2118,53 @@ def process_month(
 # 4.1 Month Traversal Logic
 # ----------------------------------------------------------------------------
 
+# (base_path, userkey) -> (base_path mtime, {alpha_type: sorted (YYYYMM, month dir)})
+_MONTH_DIR_CACHE: Dict[Tuple[str, str], Tuple[float, Dict[str, List[Tuple[int, Path]]]]] = {}
+
+
+def _scan_month_dirs(base_path: Path, userkey: str) -> Dict[str, List[Tuple[int, Path]]]:
+    """
+    List regular and super month directories in one os.scandir pass.
+
+    scandir reports the entry type from the directory read itself, so
+    classifying entries needs no per-entry stat, and both alpha types come
+    out of a single read of base_path. Each directory is returned as
+    (YYYYMM, path), with the month parsed once here and the lists sorted by
+    it, so window filters can bisect instead of re-parsing names. Results
+    are cached per base_path mtime, so later calls only stat base_path
+    unless a month directory was added or removed.
+    """
+    cache_key = (str(base_path), userkey)
+    try:
+        stamp = base_path.stat().st_mtime
+    except OSError:
+        return {'regular': [], 'super': []}
+    cached = _MONTH_DIR_CACHE.get(cache_key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    pattern = re.compile(rf"{re.escape(userkey)}_(.*)_all_(regular|super)_alphas")
+    found: Dict[str, List[Tuple[int, Path]]] = {'regular': [], 'super': []}
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            match = pattern.fullmatch(entry.name)
+            if match and entry.is_dir():
+                found[match.group(2)].append((month_key_from_segment(match.group(1)), Path(entry.path)))
+
+    # Sort numerically by month; the name tie-break (plain str, not Path
+    # comparison) only matters for duplicate or unparsed months
+    for month_entries in found.values():
+        month_entries.sort(key=_month_entry_sort_key)
+
+    _MONTH_DIR_CACHE[cache_key] = (stamp, found)
+    return found
+
+
 def find_month_directories(
     base_path: Path,
     userkey: str,
     alpha_type: str
-) -> List[Path]:
+) -> List[Tuple[int, Path]]:
     """
     Find and sort month directories for given alpha type.
     
@@ -1528,23 +2176,91 @@ def find_month_directories(
         alpha_type: "regular" or "super"
     
     Returns:
-        Sorted list of Path objects (oldest to newest)
+        List of (YYYYMM, Path) tuples sorted oldest to newest
     """
-    pattern = f"{userkey}_*_all_{alpha_type}_alphas"
-    month_dirs = list(base_path.glob(pattern))
-    
-    # Sort by directory name (which contains date)
-    month_dirs.sort()
+    month_entries = list(_scan_month_dirs(base_path, userkey).get(alpha_type, ()))
     
-    logger.info(f"Found {len(month_dirs)} {alpha_type} month directories")
-    return month_dirs
+    logger.info(f"Found {len(month_entries)} {alpha_type} month directories")
+    return month_entries
+
+
+MonthEntries = List[Tuple[int, Path]]
+WindowFn = Callable[[MonthEntries, Any], Tuple[MonthEntries, Optional[datetime], Optional[datetime]]]
+
+
+def _fast_mode_window(month_entries: MonthEntries, collection, config: Config):
+    """FAST_MODE: keep only the most recent fast_mode_months months, no time window."""
+    if len(month_entries) > config.fast_mode_months:
+        original_count = len(month_entries)
+        month_entries = month_entries[-config.fast_mode_months:]
+        logger.info(
+            f"FAST_MODE enabled: limiting month scan from {original_count} to {len(month_entries)} (last {config.fast_mode_months} months)"
+        )
+    else:
+        logger.info(f"FAST_MODE enabled but only {len(month_entries)} months available")
+    return month_entries, None, None
+
+
+def _smart_merge_window(month_entries: MonthEntries, collection, config: Config):
+    """smart_merge: start the window at the newest stored alpha minus the buffer."""
+    latest_ts = get_latest_alpha_timestamp(collection)
+    if not latest_ts:
+        logger.info("Smart merge found no existing documents; processing all months")
+        return month_entries, None, None
+    time_window_start = latest_ts - timedelta(days=config.time_range_buffer_days)
+    logger.info(
+        f"Smart merge window start (UTC): {time_window_start.isoformat()}"
+    )
+    return filter_month_dirs_by_window(month_entries, time_window_start), time_window_start, None
+
+
+def _time_range_window(month_entries: MonthEntries, collection, config: Config):
+    """time_range: window of TIME_RANGE_HOURS back from now, padded by the buffer."""
+    now_utc = datetime.now(timezone.utc)
+    time_window_start = now_utc - timedelta(hours=config.time_range_hours) - \
+        timedelta(days=config.time_range_buffer_days)
+    time_window_end = now_utc + timedelta(days=config.time_range_buffer_days)
+    logger.info(
+        "Time range window (UTC): %s to %s",
+        time_window_start.isoformat(),
+        time_window_end.isoformat()
+    )
+    return filter_month_dirs_by_window(month_entries, time_window_start), time_window_start, time_window_end
+
+
+def _noop_window(month_entries: MonthEntries, collection, config: Config):
+    """All other modes: process every month, no time window."""
+    return month_entries, None, None
+
+
+# Import modes that narrow the month list; anything else uses _noop_window
+MODE_DISPATCH: Dict[str, Callable] = {
+    'smart_merge': _smart_merge_window,
+    'smart_incremental_slow': _smart_merge_window,
+    'time_range': _time_range_window,
+}
+
+
+def _build_window_fn(config: Config) -> WindowFn:
+    """
+    Resolve FAST_MODE / IMPORT_MODE month selection into a single callable.
+
+    The returned function maps (month_entries, collection) to
+    (selected_entries, time_window_start, time_window_end), so each phase
+    runs only the selector that applies instead of re-testing the modes.
+    FAST_MODE takes absolute precedence over the import-mode windows.
+    """
+    window = _fast_mode_window if config.fast_mode else MODE_DISPATCH.get(config.import_mode, _noop_window)
+    return partial(window, config=config)
 
 
 def process_all_months(
     base_path: Path,
     alpha_type: str,
     config: Config,
-    state_manager
+    state_manager,
+    client: MongoClient,
+    window_fn: Optional[WindowFn] = None
 ) -> dict:
     """
     Process all months for given alpha type sequentially.
@@ -1554,6 +2270,8 @@ def process_all_months(
         alpha_type: "regular" or "super"
         config: Configuration object
         state_manager: State manager for tracking processed files
+        client: Shared MongoClient (owned and closed by the caller)
+        window_fn: Month selector from _build_window_fn (built from config if None)
     
     Returns:
         Accumulated statistics dictionary
@@ -1565,9 +2283,9 @@ def process_all_months(
     phase_start_time = time.time()
     
     # Find month directories
-    month_dirs = find_month_directories(base_path, wq_login.USER_KEY, alpha_type)
+    month_entries = find_month_directories(base_path, wq_login.USER_KEY, alpha_type)
     
-    if not month_dirs:
+    if not month_entries:
         logger.warning(f"No {alpha_type} month directories found")
         return {'updated': 0, 'inserted': 0, 'errors': 0, 'processed': 0}
 
@@ -1579,65 +2297,77 @@ def process_all_months(
         db_name = config.db_name_super
         collection_name = config.super_collection
     
-    # Connect to MongoDB
-    with MongoClient(host=config.db_host, port=config.db_port) as client:
-        db = client[db_name]
-        collection = db[collection_name]
-        logger.info(f"Connected to MongoDB: {db_name}.{collection_name}")
-        
-        # Create index on key field (if it doesn't exist)
-        collection.create_index(config.key_field, unique=True)
-        
-        time_window_start: Optional[datetime] = None
-        time_window_end: Optional[datetime] = None
-
-        # FAST_MODE takes absolute precedence - skip other month filtering
-        if config.fast_mode:
-            if len(month_dirs) > config.fast_mode_months:
-                original_count = len(month_dirs)
-                month_dirs = month_dirs[-config.fast_mode_months:]
-                logger.info(
-                    f"FAST_MODE enabled: limiting month scan from {original_count} to {len(month_dirs)} (last {config.fast_mode_months} months)"
-                )
-            else:
-                logger.info(f"FAST_MODE enabled but only {len(month_dirs)} months available")
-        else:
-            # Only apply import_mode filters if FAST_MODE is disabled
-            if config.import_mode in ('smart_merge', 'smart_incremental_slow'):
-                latest_ts = get_latest_alpha_timestamp(collection)
-                if latest_ts:
-                    time_window_start = latest_ts - timedelta(days=config.time_range_buffer_days)
-                    logger.info(
-                        f"Smart merge window start (UTC): {time_window_start.isoformat()}"
-                    )
-                    month_dirs = filter_month_dirs_by_window(month_dirs, time_window_start)
-                else:
-                    logger.info("Smart merge found no existing documents; processing all months")
-            elif config.import_mode == 'time_range':
-                now_utc = datetime.now(timezone.utc)
-                time_window_start = now_utc - timedelta(hours=config.time_range_hours) - \
-                    timedelta(days=config.time_range_buffer_days)
-                time_window_end = now_utc + timedelta(days=config.time_range_buffer_days)
-                logger.info(
-                    "Time range window (UTC): %s to %s",
-                    time_window_start.isoformat(),
-                    time_window_end.isoformat()
-                )
-                month_dirs = filter_month_dirs_by_window(month_dirs, time_window_start)
+    # Select target collection on the shared client
+    db = client[db_name]
+    collection = db[collection_name]
+    logger.info(f"Connected to MongoDB: {db_name}.{collection_name}")
+    
+    # Month selection was resolved from the config once (see _build_window_fn)
+    if window_fn is None:
+        window_fn = _build_window_fn(config)
+    month_entries, time_window_start, time_window_end = window_fn(month_entries, collection)
 
-        if not month_dirs:
-            logger.warning("No month directories meet the selected mode criteria")
-            return {'updated': 0, 'inserted': 0, 'errors': 0, 'processed': 0}
+    # Nothing left after the window: skip index setup and state lookups
+    if not month_entries:
+        logger.warning("No month directories meet the selected mode criteria")
+        return {'updated': 0, 'inserted': 0, 'errors': 0, 'processed': 0}
 
-        logger.info(f"Processing {len(month_dirs)} month directories after mode filters")
+    # Create index on key field (if it doesn't exist)
+    ensure_key_index(collection, config.key_field)
+    logger.info(
+        "Bulk writes: ordered=%s, w=%s, bypass_document_validation=%s",
+        config.bulk_ordered, config.write_concern, config.bypass_document_validation
+    )
 
-        # Accumulate statistics
-        total_stats = {'updated': 0, 'inserted': 0, 'errors': 0, 'processed': 0}
-        
+    # Delta import: in window modes, skip files untouched since the last clean run
+    run_key = f"{db_name}.{collection_name}"
+    track_runs = (
+        config.mtime_delta_import
+        and time_window_start is not None
+        and hasattr(state_manager, 'get_last_run_ts')
+    )
+    modified_after: Optional[float] = state_manager.get_last_run_ts(run_key) if track_runs else None
+    if modified_after is not None:
+        logger.info(
+            "Delta import: only files modified after %s (UTC)",
+            datetime.fromtimestamp(modified_after, timezone.utc).isoformat()
+        )
+
+    logger.info(f"Processing {len(month_entries)} month directories after mode filters")
+
+    # Accumulate statistics
+    total_stats = Counter(updated=0, inserted=0, errors=0, processed=0)
+    
+    # Automatic GC is paused for the month loop: the per-file dicts are
+    # acyclic and freed by refcount, and process_batch still runs an explicit
+    # gc.collect() after every batch to pick up any cycles. Reference-counted,
+    # since the Regular and Super phases may run concurrently
+    _gc_pause_acquire()
+    # State marks are buffered and written in large SQLite transactions:
+    # every MAX_PENDING_MARKS files or MAX_PENDING_SECONDS, and when the phase ends
+    if state_manager and hasattr(state_manager, 'begin'):
+        state_manager.begin()
+    prefetch_thread: Optional[threading.Thread] = None
+    try:
         # Process each month sequentially
-        for month_idx, month_path in enumerate(month_dirs, 1):
-            logger.info(f"\n>>> Processing month {month_idx}/{len(month_dirs)}: {month_path.name}")
+        for month_idx, (_, month_path) in enumerate(month_entries, 1):
+            logger.info(f"\n>>> Processing month {month_idx}/{len(month_entries)}: {month_path.name}")
             
+            # Warm the page cache for the next month while this one is written.
+            # At most one prefetch runs per phase: if the last one is still
+            # going, months are finishing faster than the disk can warm them
+            # and another thread would only compete with the import for I/O
+            if config.prefetch_next_month and month_idx < len(month_entries):
+                if prefetch_thread is not None and prefetch_thread.is_alive():
+                    logger.debug("Previous prefetch still running, skipping prefetch of %s",
+                                 month_entries[month_idx][1].name)
+                else:
+                    prefetch_thread = prefetch_month_async(
+                        month_entries[month_idx][1],
+                        config.workers * config.batch_size,
+                        modified_after
+                    )
+        
             try:
                 month_stats = process_month(
                     month_path,
@@ -1646,72 +2376,84 @@ def process_all_months(
                     state_manager,
                     alpha_type,
                     time_window_start=time_window_start,
-                    time_window_end=time_window_end
+                    time_window_end=time_window_end,
+                    modified_after=modified_after
                 )
-                
+            
                 # Accumulate statistics
-                for key in total_stats:
-                    total_stats[key] += month_stats.get(key, 0)
-                
+                total_stats.update(month_stats)
+            
             except Exception as e:
                 logger.error(f"Failed to process month {month_path.name}: {e}", exc_info=True)
                 total_stats['errors'] += 1
                 # Continue to next month
                 continue
-        
-        phase_time = time.time() - phase_start_time
-        
-        logger.info(f"\n{'#'*60}")
-        logger.info(f"PHASE COMPLETED: {alpha_type.upper()} Alphas")
-        logger.info(f"Time: {phase_time:.2f}s")
-        logger.info(f"Total Processed: {total_stats['processed']:,}")
-        logger.info(f"Total Updated: {total_stats['updated']:,}")
-        logger.info(f"Total Inserted: {total_stats['inserted']:,}")
-        logger.info(f"Total Errors: {total_stats['errors']:,}")
-        logger.info(f"{'#'*60}\n")
+    finally:
+        if state_manager and hasattr(state_manager, 'commit'):
+            state_manager.commit()
+        _gc_pause_release()
     
-    return total_stats
+    # Only a run without errors may move the delta marker forward
+    if track_runs and total_stats['errors'] == 0:
+        state_manager.set_last_run_ts(run_key, phase_start_time)
+    
+    phase_time = time.time() - phase_start_time
+    
+    logger.info(f"\n{'#'*60}")
+    logger.info(f"PHASE COMPLETED: {alpha_type.upper()} Alphas")
+    logger.info(f"Time: {phase_time:.2f}s")
+    logger.info(f"Total Processed: {total_stats['processed']:,}")
+    logger.info(f"Total Updated: {total_stats['updated']:,}")
+    logger.info(f"Total Inserted: {total_stats['inserted']:,}")
+    logger.info(f"Total Errors: {total_stats['errors']:,}")
+    logger.info(f"{'#'*60}\n")
+    
+    return dict(total_stats)
 
 
 # ----------------------------------------------------------------------------
 # 4.2 Main Entry Point
 # ----------------------------------------------------------------------------
 
+def _run_phase(base_path: Path, alpha_type: str, config: Config, state_manager,
+               client: MongoClient, window_fn: WindowFn) -> dict:
+    """Run process_all_months on a thread named after alpha_type (shown in file logs)."""
+    threading.current_thread().name = f"{alpha_type}-phase"
+    return process_all_months(base_path, alpha_type, config, state_manager, client, window_fn)
+
+
 def print_final_summary(regular_stats: dict, super_stats: dict):
-    """Print final summary of all processing"""
-    print("\n" + "="*70)
-    print(" " * 20 + "FINAL SUMMARY")
-    print("="*70)
-    
-    if regular_stats:
-        print(f"\nREGULAR ALPHAS:")
-        print(f"  Processed: {regular_stats.get('processed', 0):,}")
-        print(f"  Updated:   {regular_stats.get('updated', 0):,}")
-        print(f"  Inserted:  {regular_stats.get('inserted', 0):,}")
-        print(f"  Errors:    {regular_stats.get('errors', 0):,}")
-    else:
-        print("\nREGULAR ALPHAS: No files processed")
-    
-    if super_stats:
-        print(f"\nSUPER ALPHAS:")
-        print(f"  Processed: {super_stats.get('processed', 0):,}")
-        print(f"  Updated:   {super_stats.get('updated', 0):,}")
-        print(f"  Inserted:  {super_stats.get('inserted', 0):,}")
-        print(f"  Errors:    {super_stats.get('errors', 0):,}")
-    else:
-        print("\nSUPER ALPHAS: No files processed")
-    
-    total_processed = (regular_stats.get('processed', 0) + super_stats.get('processed', 0))
-    total_updated = (regular_stats.get('updated', 0) + super_stats.get('updated', 0))
-    total_inserted = (regular_stats.get('inserted', 0) + super_stats.get('inserted', 0))
-    total_errors = (regular_stats.get('errors', 0) + super_stats.get('errors', 0))
-    
-    print(f"\nTOTAL:")
-    print(f"  Processed: {total_processed:,}")
-    print(f"  Updated:   {total_updated:,}")
-    print(f"  Inserted:  {total_inserted:,}")
-    print(f"  Errors:    {total_errors:,}")
-    print("="*70 + "\n")
+    """Print final summary of all processing (built up, then written in one call)"""
+    lines = [
+        "\n" + "="*70,
+        " " * 20 + "FINAL SUMMARY",
+        "="*70,
+    ]
+    
+    def _stat_lines(stats: dict) -> List[str]:
+        return [
+            f"  Processed: {stats.get('processed', 0):,}",
+            f"  Updated:   {stats.get('updated', 0):,}",
+            f"  Inserted:  {stats.get('inserted', 0):,}",
+            f"  Errors:    {stats.get('errors', 0):,}",
+        ]
+    
+    for label, stats in (("REGULAR ALPHAS", regular_stats), ("SUPER ALPHAS", super_stats)):
+        if stats:
+            lines.append(f"\n{label}:")
+            lines.extend(_stat_lines(stats))
+        else:
+            lines.append(f"\n{label}: No files processed")
+    
+    totals = {
+        key: regular_stats.get(key, 0) + super_stats.get(key, 0)
+        for key in ('processed', 'updated', 'inserted', 'errors')
+    }
+    lines.append("\nTOTAL:")
+    lines.extend(_stat_lines(totals))
+    lines.append("="*70 + "\n")
+    
+    print("\n".join(lines))
 
 
 def parse_arguments(config: Config) -> argparse.Namespace:
@@ -1735,6 +2477,10 @@ def parse_arguments(config: Config) -> argparse.Namespace:
                        help='Regular Alphas database name')
     parser.add_argument('--db-name-super', type=str, default=config.db_name_super,
                        help='Super Alphas database name')
+    parser.add_argument('--compressors', type=str, default=config.compressors,
+                       help='MongoDB wire compressors in preference order (empty string disables)')
+    parser.add_argument('--write-concern', type=str, default=str(config.write_concern),
+                       help="Write concern for imports: integer >= 1 or 'majority'")
     
     # Data paths
     parser.add_argument('--data-base-path', type=str, default=config.data_base_path,
@@ -1749,6 +2495,26 @@ def parse_arguments(config: Config) -> argparse.Namespace:
                        help='Number of worker processes')
     parser.add_argument('--batch-size', type=int, default=config.batch_size,
                        help='Number of files per worker batch')
+    _add_boolean_cli_flag(
+        parser,
+        option='bulk-ordered',
+        dest='bulk_ordered',
+        default=config.bulk_ordered,
+        help_enable='Send ordered bulk writes (stop at first error, single call per result)',
+        help_disable='Send unordered bulk writes (server may apply them in parallel)'
+    )
+
+    _add_boolean_cli_flag(
+        parser,
+        option='bypass-document-validation',
+        dest='bypass_document_validation',
+        default=config.bypass_document_validation,
+        help_enable="Skip the collection's schema validator on writes",
+        help_disable="Apply the collection's schema validator on writes"
+    )
+
+    parser.add_argument('--bulk-write-threads', type=int, default=config.bulk_write_threads,
+                       help='Concurrent bulk_write calls per worker result (1 = single call)')
     
     # Other settings
     parser.add_argument('--key-field', type=str, default=config.key_field,
@@ -1804,6 +2570,42 @@ def parse_arguments(config: Config) -> argparse.Namespace:
         help_disable='Process months sequentially without per-day parallelism'
     )
 
+    _add_boolean_cli_flag(
+        parser,
+        option='server-side-merge',
+        dest='server_side_merge',
+        default=config.server_side_merge,
+        help_enable='Merge documents on the MongoDB server (shallow $mergeObjects, no per-document reads)',
+        help_disable='Deep merge documents in Python after reading existing ones'
+    )
+
+    _add_boolean_cli_flag(
+        parser,
+        option='parallel-phases',
+        dest='parallel_phases',
+        default=config.parallel_phases,
+        help_enable='Import regular and super alphas concurrently (each phase starts its own worker pool)',
+        help_disable='Import regular alphas first, then super alphas'
+    )
+
+    _add_boolean_cli_flag(
+        parser,
+        option='mtime-delta-import',
+        dest='mtime_delta_import',
+        default=config.mtime_delta_import,
+        help_enable='In time_range/smart_merge modes, only read files modified since the last error-free run',
+        help_disable='In time_range/smart_merge modes, read every file in the selected months'
+    )
+
+    _add_boolean_cli_flag(
+        parser,
+        option='prefetch-next-month',
+        dest='prefetch_next_month',
+        default=config.prefetch_next_month,
+        help_enable="Read-ahead the next month's first batch of files while the current month is imported",
+        help_disable='Do not read ahead the next month'
+    )
+
     parser.add_argument('--parallel-days-workers', type=int, default=config.parallel_days_workers,
                        help='Number of day batches to process concurrently when parallel-days mode is enabled')
 
@@ -1825,11 +2627,16 @@ def parse_arguments(config: Config) -> argparse.Namespace:
     config.db_port_27018 = args.db_port_27018
     config.db_name_regular = args.db_name_regular
     config.db_name_super = args.db_name_super
+    config.compressors = args.compressors or None
+    config.write_concern = Config._coerce_write_concern(args.write_concern)
     config.data_base_path = args.data_base_path
     config.regular_collection = args.regular_collection
     config.super_collection = args.super_collection
     config.workers = args.workers
     config.batch_size = args.batch_size
+    config.bulk_write_threads = args.bulk_write_threads
+    config.bulk_ordered = args.bulk_ordered
+    config.bypass_document_validation = args.bypass_document_validation
     config.key_field = args.key_field
     config.state_file = args.state_file
     config.import_mode = args.import_mode
@@ -1840,11 +2647,16 @@ def parse_arguments(config: Config) -> argparse.Namespace:
     config.fast_mode = args.fast_mode
     config.fast_mode_months = args.fast_mode_months
     config.use_batch_query = args.use_batch_query
+    config.server_side_merge = args.server_side_merge
     config.parallel_days_mode = args.parallel_days_mode
     config.use_smart_validation = args.use_smart_validation
     config.parallel_days_workers = args.parallel_days_workers
+    config.parallel_phases = args.parallel_phases
+    config.mtime_delta_import = args.mtime_delta_import
+    config.prefetch_next_month = args.prefetch_next_month
 
     config._validate()
+    config.freeze()
     
     return args
 
@@ -1890,20 +2702,12 @@ def get_state_manager(state_file: str, import_mode: str = "incremental"):
         else:
             logger.info(f"State manager initialized: {state_dir} ({state_usage} for '{import_mode}' mode, no filtering)")
         
-        # 智能获取统计信息：数据库小就查全表，数据库大就只显示大小
+        # 快速统计：MAX(rowid) 为常数时间，不做全表扫描（数值为近似值）
         try:
-            db_path = state_dir / "processed_files.db"
-            if db_path.exists():
-                db_size_bytes = db_path.stat().st_size
-                db_size_mb = db_size_bytes / (1024 * 1024)
-                
-                # 如果数据库小于100MB，查询完整统计信息
-                if db_size_mb < 100:
-                    stats = state_manager.get_stats(quick=False)
-                    logger.info(f"Processed files tracked: {stats.get('total_files', 0):,} (DB size: {db_size_mb:.1f} MB)")
-                else:
-                    # 数据库太大，跳过全表扫描
-                    logger.info(f"State DB size: {db_size_mb:.1f} MB (skipping full scan for large DB)")
+            stats = state_manager.get_stats_fast()
+            if stats['total_alphas_estimate']:
+                db_size_mb = stats['db_size_bytes'] / (1024 * 1024)
+                logger.info(f"Processed alphas tracked: ~{stats['total_alphas_estimate']:,} (DB size: {db_size_mb:.1f} MB)")
             else:
                 logger.info("State DB is new (empty)")
         except Exception as e:
@@ -1916,6 +2720,156 @@ def get_state_manager(state_file: str, import_mode: str = "incremental"):
         return None
 
 
+def _write_doc_batch(collection, batch: List[Tuple[str, dict]], config: Config,
+                     mode: 'Mode', state_manager, stats: Counter) -> None:
+    """
+    Write one batch of in-memory (file_path, doc) pairs and mark the paths processed.
+
+    Builds the same operations worker_process builds for files: ReplaceOne in
+    rebuild mode, a server-side merge pipeline, or a deep merge against one
+    batched $in lookup of the stored documents.
+    """
+    key_field = config.key_field
+    entries: List[Tuple[str, str, dict]] = []
+    for file_path, doc in batch:
+        doc_id = doc.get(key_field)
+        if not doc_id:
+            logger.warning(f"Missing key field '{key_field}' in {file_path}, skipped")
+            stats['errors'] += 1
+            continue
+        if config.use_smart_validation:
+            is_valid, reason = validate_document_smart(doc)
+            if not is_valid:
+                logger.warning(f"Smart validation failed for {file_path}: {reason}, skipped")
+                stats['errors'] += 1
+                continue
+        entries.append((file_path, doc_id, doc))
+    if not entries:
+        return
+
+    lookup: Dict[str, dict] = {}
+    if mode == Mode.MERGE_BATCH_QUERY:
+        lookup = _batch_find_existing(collection, key_field, [doc_id for _, doc_id, _ in entries])
+
+    ops: List = []
+    paths: List[str] = []
+    for file_path, doc_id, doc in entries:
+        if mode == Mode.REBUILD:
+            op = ReplaceOne({key_field: doc_id}, _raw_bson(doc), upsert=True)
+        elif mode == Mode.SERVER_MERGE:
+            op = _server_merge_op(key_field, doc_id, dict(doc))
+        else:
+            old_doc = lookup.get(doc_id)
+            merged = deep_merge_dicts(old_doc, doc) if old_doc else doc
+            merged.pop('_id', None)
+            op = UpdateOne({key_field: doc_id}, {"$set": _raw_bson(merged)}, upsert=True)
+        ops.append(op)
+        paths.append(file_path)
+
+    modified, upserted, failed_indices = bulk_write_parallel(
+        collection, ops, None, 1,
+        ordered=config.bulk_ordered,
+        bypass_document_validation=config.bypass_document_validation
+    )
+    stats['updated'] += modified
+    stats['inserted'] += upserted
+    stats['errors'] += len(failed_indices)
+    if failed_indices:
+        paths = [path for i, path in enumerate(paths) if i not in failed_indices]
+    stats['processed'] += len(paths)
+    if state_manager and paths:
+        state_manager.mark_processed(paths)
+
+
+def import_iter(docs_iter, config: Optional[Config] = None) -> int:
+    """
+    Import documents handed over in memory by step 2 (fused step 2 + step 3).
+
+    docs_iter yields (kind, file_path, doc) for every file step 2 has just
+    written ('regular' or 'super'), so final_data is neither scanned nor read
+    back. Documents are written in batch_size batches, and their paths are
+    marked processed so a later disk-based run skips them. Month windows
+    (fast/smart_merge/time_range) do not apply: everything step 2 produced
+    is imported.
+
+    Args:
+        docs_iter: Iterable of (kind, file_path, doc)
+        config: Configuration (loaded from mongo_config.json if None)
+
+    Returns:
+        Exit code, 0 on success (same convention as main)
+    """
+    start_time = time.time()
+    client = None
+    state_manager = None
+
+    try:
+        if config is None:
+            config = load_config("mongo_config.json")
+        configure_logging(config)
+
+        state_manager = get_state_manager(config.state_file, config.import_mode)
+        client = create_mongo_client(config)
+        mode = resolve_mode(config, None)
+        if mode == Mode.MERGE_PER_DOC:
+            # No per-file workers here: one $in lookup per batch covers every document
+            mode = Mode.MERGE_BATCH_QUERY
+
+        targets = {
+            'regular': (config.db_name_regular, config.regular_collection),
+            'super': (config.db_name_super, config.super_collection),
+        }
+        collections = {}
+        batches: Dict[str, List[Tuple[str, dict]]] = defaultdict(list)
+        stats = {kind: Counter() for kind in targets}
+
+        def collection_for(kind: str):
+            if kind not in collections:
+                db_name, collection_name = targets[kind]
+                collection = client[db_name][collection_name]
+                ensure_key_index(collection, config.key_field)
+                collections[kind] = collection
+                logger.info(f"Connected to MongoDB: {db_name}.{collection_name}")
+            return collections[kind]
+
+        if state_manager and hasattr(state_manager, 'begin'):
+            state_manager.begin()
+        try:
+            for kind, file_path, doc in docs_iter:
+                batch = batches[kind]
+                batch.append((file_path, doc))
+                if len(batch) >= config.batch_size:
+                    _write_doc_batch(collection_for(kind), batch, config, mode, state_manager, stats[kind])
+                    batch.clear()
+            for kind, batch in batches.items():
+                if batch:
+                    _write_doc_batch(collection_for(kind), batch, config, mode, state_manager, stats[kind])
+        finally:
+            if state_manager and hasattr(state_manager, 'commit'):
+                state_manager.commit()
+
+        print_final_summary(dict(stats['regular']), dict(stats['super']))
+        logger.info(f"In-memory import completed in {time.time() - start_time:.2f}s")
+        return 0
+
+    except KeyboardInterrupt:
+        logger.warning("\n\nProcess interrupted by user")
+        return 130
+
+    except Exception as e:
+        logger.error(f"\n\nFatal error: {e}", exc_info=True)
+        return 1
+
+    finally:
+        if state_manager:
+            try:
+                state_manager.cleanup()
+            except Exception as e:
+                logger.warning(f"State manager cleanup failed: {e}")
+        if client is not None:
+            client.close()
+
+
 def main():
     """Main entry point"""
     print("\n" + "="*70)
@@ -1923,6 +2877,7 @@ def main():
     print("="*70 + "\n")
     
     start_time = time.time()
+    client = None
     
     try:
         # Step 1: Load configuration
@@ -1935,33 +2890,56 @@ def main():
         args = parse_arguments(config)
         configure_logging(config)
         
-        # Step 3: Test MongoDB connection
-        logger.info("\nStep 3: Testing MongoDB connection...")
-        if not test_mongodb_connection(config.db_host, config.db_port):
+        # Steps 3+4: Test MongoDB connection and initialize state manager
+        # concurrently (network round-trip vs. local SQLite, independent)
+        logger.info("\nSteps 3-4: Testing MongoDB connection and initializing state manager...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            ping_future = executor.submit(test_mongodb_connection, config.db_host, config.db_port)
+            state_future = executor.submit(get_state_manager, config.state_file, config.import_mode)
+            connected = ping_future.result()
+            state_manager = state_future.result()
+        
+        if not connected:
             logger.error("MongoDB connection failed, aborting")
+            if state_manager:
+                state_manager.cleanup()
             return 1
         
-        # Step 4: Initialize state manager
-        logger.info("\nStep 4: Initializing state manager...")
-        state_manager = get_state_manager(config.state_file, config.import_mode)
+        # One client for both phases (closed in the finally block below)
+        client = create_mongo_client(config)
+        window_fn = _build_window_fn(config)
         
-        # Step 5: Process Regular Alphas
-        logger.info("\nStep 5: Processing Regular Alphas...")
-        regular_stats = process_all_months(
-            Path(config.data_base_path),
-            "regular",
-            config,
-            state_manager
-        )
-        
-        # Step 6: Process Super Alphas
-        logger.info("\nStep 6: Processing Super Alphas...")
-        super_stats = process_all_months(
-            Path(config.data_base_path),
-            "super",
-            config,
-            state_manager
-        )
+        if config.parallel_phases:
+            # Steps 5+6: Regular and Super write to different databases, run both at once
+            logger.info("\nSteps 5-6: Processing Regular and Super Alphas concurrently...")
+            base_path = Path(config.data_base_path)
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                regular_future = executor.submit(_run_phase, base_path, "regular", config, state_manager, client, window_fn)
+                super_future = executor.submit(_run_phase, base_path, "super", config, state_manager, client, window_fn)
+                regular_stats = regular_future.result()
+                super_stats = super_future.result()
+        else:
+            # Step 5: Process Regular Alphas
+            logger.info("\nStep 5: Processing Regular Alphas...")
+            regular_stats = process_all_months(
+                Path(config.data_base_path),
+                "regular",
+                config,
+                state_manager,
+                client,
+                window_fn
+            )
+            
+            # Step 6: Process Super Alphas
+            logger.info("\nStep 6: Processing Super Alphas...")
+            super_stats = process_all_months(
+                Path(config.data_base_path),
+                "super",
+                config,
+                state_manager,
+                client,
+                window_fn
+            )
         
         # Step 7: Print final summary
         logger.info("\nStep 7: Generating final summary...")
@@ -1996,6 +2974,10 @@ def main():
     except Exception as e:
         logger.error(f"\n\nFatal error: {e}", exc_info=True)
         return 1
+    
+    finally:
+        if client is not None:
+            client.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,7 @@
+# 将项目根目录加入 sys.path（仅在首次导入时执行一次），供桥接模块导入 wq_shared
+import sys as _sys
+from pathlib import Path as _Path
+
+_PROJECT_ROOT = str(_Path(__file__).resolve().parent.parent)
+if _PROJECT_ROOT not in _sys.path:
+    _sys.path.insert(0, _PROJECT_ROOT)
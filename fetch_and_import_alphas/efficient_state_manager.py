@@ -18,6 +18,7 @@ import os
 import sqlite3
 import hashlib
 import json
+import threading
 import time
 from pathlib import Path
 from typing import Set, List, Optional, Dict, Tuple
@@ -159,6 +160,14 @@ class EnhancedStateManager:
                 ON alpha_records(update_count)
             """)
             
+            # 运行标记: 每个导入目标最近一次成功运行的开始时间
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS run_markers (
+                    run_key TEXT PRIMARY KEY,
+                    started_at REAL NOT NULL
+                )
+            """)
+            
             conn.commit()
             
             logger.info(f"Enhanced state manager initialized: {self.db_path}")
@@ -604,34 +613,35 @@ class EnhancedStateManager:
             return
         
         current_time = int(time.time())
+        rows = [(record.alpha_id, record.file_path, record.file_size,
+                 record.file_mtime, record.content_hash, current_time)
+                for record in records]
         
+        # 单个事务内 executemany，整批只提交一次
         with sqlite3.connect(self.db_path) as conn:
-            for record in records:
-                if is_update:
-                    # 更新现有记录，增加update_count
-                    conn.execute("""
+            if is_update:
+                # 更新现有记录，增加update_count
+                conn.executemany("""
                         INSERT INTO alpha_records 
-                        (alpha_id, file_path, file_size, file_mtime, content_hash, 
-                         processed_time, update_count)
-                        VALUES (?, ?, ?, ?, ?, ?, 1)
-                        ON CONFLICT(alpha_id) DO UPDATE SET
-                            file_path = excluded.file_path,
-                            file_size = excluded.file_size,
-                            file_mtime = excluded.file_mtime,
-                            content_hash = excluded.content_hash,
-                            processed_time = excluded.processed_time,
-                            update_count = update_count + 1
-                    """, (record.alpha_id, record.file_path, record.file_size,
-                         record.file_mtime, record.content_hash, current_time))
-                else:
-                    # 新记录或保持update_count不变
-                    conn.execute("""
-                        INSERT OR REPLACE INTO alpha_records 
-                        (alpha_id, file_path, file_size, file_mtime, content_hash, 
-                         processed_time, update_count)
-                        VALUES (?, ?, ?, ?, ?, ?, 0)
-                    """, (record.alpha_id, record.file_path, record.file_size,
-                         record.file_mtime, record.content_hash, current_time))
+                    (alpha_id, file_path, file_size, file_mtime, content_hash, 
+                     processed_time, update_count)
+                    VALUES (?, ?, ?, ?, ?, ?, 1)
+                    ON CONFLICT(alpha_id) DO UPDATE SET
+                        file_path = excluded.file_path,
+                        file_size = excluded.file_size,
+                        file_mtime = excluded.file_mtime,
+                        content_hash = excluded.content_hash,
+                        processed_time = excluded.processed_time,
+                        update_count = update_count + 1
+                """, rows)
+            else:
+                # 新记录或保持update_count不变
+                conn.executemany("""
+                    INSERT OR REPLACE INTO alpha_records 
+                    (alpha_id, file_path, file_size, file_mtime, content_hash, 
+                     processed_time, update_count)
+                    VALUES (?, ?, ?, ?, ?, ?, 0)
+                """, rows)
             
             conn.commit()
         
@@ -664,6 +674,44 @@ class EnhancedStateManager:
                 'db_size_bytes': self.db_path.stat().st_size if self.db_path.exists() else 0
             }
     
+    def get_stats_fast(self) -> dict:
+        """
+        获取近似统计信息（常数时间）
+        
+        MAX(rowid) 只需读取B树最右侧路径，不扫描全表；删除过记录时会略大于实际行数
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("SELECT MAX(rowid) FROM alpha_records").fetchone()
+        
+        return {
+            'total_alphas_estimate': row[0] or 0,
+            'db_size_bytes': self.db_path.stat().st_size if self.db_path.exists() else 0
+        }
+    
+    def get_last_run_ts(self, run_key: str) -> Optional[float]:
+        """
+        获取指定导入目标最近一次成功运行的开始时间（Unix时间戳）
+        
+        Args:
+            run_key: 导入目标标识（如 "db.collection"）
+        
+        Returns:
+            时间戳，从未成功运行过则返回None
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT started_at FROM run_markers WHERE run_key = ?", (run_key,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def set_last_run_ts(self, run_key: str, started_at: float) -> None:
+        """记录指定导入目标一次成功运行的开始时间"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO run_markers (run_key, started_at) VALUES (?, ?)",
+                (run_key, started_at)
+            )
+    
     def get_frequently_updated_alphas(self, min_updates: int = 5) -> List[Dict]:
         """
         获取频繁更新的alpha列表
@@ -773,6 +821,13 @@ class SQLiteStateManager:
         # Pattern: ..._XX00000_aB1cD2e_6069f3308967.json
         import re
         self.alpha_id_pattern = re.compile(r'_([A-Za-z0-9]{7})_[a-f0-9]{12}\.json$')
+        
+        # Deferred marking between begin()/commit(); depth counts concurrent
+        # phases sharing this manager so the buffer is flushed by the last one
+        self._pending_marks: List[str] = []
+        self._pending_since = 0.0
+        self._batch_depth = 0
+        self._batch_lock = threading.Lock()
     
     def _extract_alpha_id_from_filename(self, file_path: str) -> Optional[str]:
         """Extract alpha_id from filename without opening file"""
@@ -912,15 +967,51 @@ class SQLiteStateManager:
         
         return processed_files
     
+    # Deferred paths are flushed early once this many are buffered or the
+    # oldest has waited this long, so a crash mid-phase loses at most one
+    # flush window of marks (those files are re-imported on the next run)
+    MAX_PENDING_MARKS = 20_000
+    MAX_PENDING_SECONDS = 60.0
+    
+    def begin(self) -> None:
+        """Start deferring mark_processed() writes until commit()"""
+        with self._batch_lock:
+            self._batch_depth += 1
+    
+    def commit(self) -> None:
+        """Flush deferred marks in one transaction once no batch is open"""
+        with self._batch_lock:
+            self._batch_depth = max(0, self._batch_depth - 1)
+            if self._batch_depth or not self._pending_marks:
+                return
+            file_paths, self._pending_marks = self._pending_marks, []
+        self._write_marks(file_paths)
+    
     def mark_processed(self, file_paths: List[str]) -> None:
         """
         Mark files as processed (legacy API)
         
-        This creates/updates records in the database
+        This creates/updates records in the database. Inside begin()/commit()
+        the paths are buffered and written at commit time, or earlier once
+        MAX_PENDING_MARKS paths or MAX_PENDING_SECONDS have accumulated.
         """
         if not file_paths:
             return
         
+        with self._batch_lock:
+            if self._batch_depth:
+                now = time.monotonic()
+                if not self._pending_marks:
+                    self._pending_since = now
+                self._pending_marks.extend(file_paths)
+                if (len(self._pending_marks) < self.MAX_PENDING_MARKS
+                        and now - self._pending_since < self.MAX_PENDING_SECONDS):
+                    return
+                file_paths, self._pending_marks = self._pending_marks, []
+        self._write_marks(file_paths)
+    
+    def _write_marks(self, file_paths: List[str]) -> None:
+        """Write processed records for file_paths to the database"""
         records = []
         for file_path in file_paths:
             # Extract alpha_id
@@ -984,6 +1075,18 @@ class SQLiteStateManager:
         """Get statistics (legacy API)"""
         return self.manager.get_stats()
     
+    def get_stats_fast(self) -> dict:
+        """Approximate statistics in constant time (legacy API)"""
+        return self.manager.get_stats_fast()
+    
+    def get_last_run_ts(self, run_key: str) -> Optional[float]:
+        """Start time of the last successful run for run_key (None if never)"""
+        return self.manager.get_last_run_ts(run_key)
+    
+    def set_last_run_ts(self, run_key: str, started_at: float) -> None:
+        """Record the start time of a successful run for run_key"""
+        self.manager.set_last_run_ts(run_key, started_at)
+    
     def cleanup(self) -> None:
         """Cleanup resources (legacy API)"""
         self.manager.close()
@@ -1,24 +1,33 @@
 # 标准库导入
-import json
 import os
 import time
 import requests
 from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
 import pickle
-import re
-import json
 import orjson
 import logging
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+try:
+    import httpx  # 可选：HTTP/2 分页（需要 httpx[http2]）
+except ImportError:
+    httpx = None
 
 # 第三方库导入
 import wq_login
-from timezone_utils import generate_time_slices_utc
+from timezone_utils import generate_time_slices_utc, build_api_query_with_time_slice
 
 brain_api_url = os.environ.get("BRAIN_API_URL", "https://api.worldquantbrain.com")
 base_directory = wq_login.WQ_DATA_ROOT / wq_login.USER_KEY / "primeval_data"
 
+# 文件名中的时间：':' 和 'T' 统一替换为 '-'
+_SAFE_DATE_TABLE = str.maketrans({':': '-', 'T': '-'})
+
 def get_dates_for_query(days):
     """
     根据天数计算查询的起止日期（UTC时间，对齐到整点小时）
@@ -70,6 +79,10 @@ _DEFAULTS = {
     "INITIAL_WAIT": 3,
     "ORDER_FIELD": "dateCreated",
     "BACKOFF_MULTIPLIER": 2.0,
+    "PAGE_CONCURRENCY": 1,
+    "PAGE_MAX_BACKOFF": 60,
+    "PAGE_HTTP2": False,
+    "OUTPUT_NDJSON": False,
 }
 def _load_cfg():
     cfg = _DEFAULTS.copy()
@@ -88,34 +101,246 @@ def _load_cfg():
     return cfg
 _CFG = _load_cfg()
 
-def get_all_regular_alphas(session, start_date, end_date):
+# 分页相关配置在加载时一次性转换，避免每页重复 dict 查找与类型转换
+_PAGE_LIMIT = int(_CFG.get("PAGE_LIMIT", 100))
+_HTTP_TIMEOUT = int(_CFG.get("HTTP_TIMEOUT", 30))
+_PAGE_MAX_RETRIES = int(_CFG.get("PAGE_MAX_RETRIES", 7))    # 单页失败时的最大重试次数
+_INITIAL_WAIT = int(_CFG.get("INITIAL_WAIT", 3))            # 初始等待时间（若未配置则使用默认 3s）
+_PAGE_MAX_BACKOFF = float(_CFG.get("PAGE_MAX_BACKOFF", 60)) # 单次退避等待上限（秒）
+_PAGE_CONCURRENCY = max(1, int(_CFG.get("PAGE_CONCURRENCY", 1)))
+_ORDER_FIELD = _CFG.get("ORDER_FIELD", "dateCreated")
+_PAGE_HTTP2 = bool(_CFG.get("PAGE_HTTP2", False))
+_OUTPUT_NDJSON = bool(_CFG.get("OUTPUT_NDJSON", False))
+_ALPHAS_URL = "https://api.worldquantbrain.com/users/self/alphas"
+_WRITE_BUFFER_SIZE = 1024 * 1024
+_NO_RESULTS = ()
+
+# 两种 HTTP 客户端的网络错误（httpx 未安装时只有 requests 的）
+_NETWORK_ERRORS = (
+    requests.exceptions.Timeout, requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError
+) + ((httpx.TransportError,) if httpx else ())
+
+_http2_client = None
+_http2_lock = threading.Lock()
+_http2_unavailable = False
+
+def _get_http2_client():
     """
-    Fetch all alphas using pagination with improved error handling.
-    
+    获取进程内共享的 HTTP/2 客户端（PAGE_HTTP2 开启时使用）
+
+    所有切片/分页线程的并发请求复用同一条多路复用连接。
+    httpx 或 h2 未安装时记录一次警告并返回 None，回退到 requests。
+    """
+    global _http2_client, _http2_unavailable
+    if _http2_client is not None or _http2_unavailable:
+        return _http2_client
+    with _http2_lock:
+        if _http2_client is None and not _http2_unavailable:
+            try:
+                if httpx is None:
+                    raise ImportError("httpx 未安装")
+                _http2_client = httpx.Client(http2=True, timeout=_HTTP_TIMEOUT)
+            except ImportError as e:
+                _http2_unavailable = True
+                logging.getLogger(__name__).warning(f"PAGE_HTTP2 已开启但不可用（{e}），改用 requests")
+    return _http2_client
+
+def _http_get(session, url):
+    """
+    发送分页 GET 请求
+
+    PAGE_HTTP2 开启时经共享的 HTTP/2 客户端发送，并带上会话当前的认证 Cookie
+    （每次请求现取，SessionProxy 刷新会话后自动生效）；否则直接使用会话。
+    """
+    client = _get_http2_client() if _PAGE_HTTP2 else None
+    if client is None:
+        return session.get(url, timeout=_HTTP_TIMEOUT)
+    cookie_header = "; ".join(f"{cookie.name}={cookie.value}" for cookie in session.cookies)
+    return client.get(url, headers={"Cookie": cookie_header})
+
+def _next_delay(prev_delay, base, cap):
+    """
+    Decorrelated jitter 退避：在 [base, 3 * prev_delay] 内随机取值并以 cap 封顶
+
+    相比固定倍数的指数退避，等待时间有上限，且并发切片的重试时间点更分散。
+    """
+    return min(cap, random.uniform(base, prev_delay * 3))
+
+def _server_retry_delay(response):
+    """
+    从 429 响应头解析服务端建议的等待秒数
+
+    优先 Retry-After（秒数或 HTTP-date），其次 X-RateLimit-Reset
+    （大于 1e9 视为 epoch 秒，否则视为剩余秒数）；均无法解析时返回 None。
+    结果不超过 _PAGE_MAX_BACKOFF，异常或过大的响应头不会让切片线程长时间挂起。
+    """
+    delay = None
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                pass
+    if delay is None:
+        reset = response.headers.get('X-RateLimit-Reset')
+        if reset:
+            try:
+                reset = float(reset)
+            except ValueError:
+                return None
+            delay = reset - time.time() if reset > 1e9 else reset
+    if delay is None:
+        return None
+    return min(max(0.0, delay), _PAGE_MAX_BACKOFF)
+
+def _fetch_page(session, url, slice_id, logger):
+    """
+    获取单页数据（含页级重试）
+
+    Returns:
+        该页的 results 列表（空页为 _NO_RESULTS）；页级重试耗尽或不可重试错误时返回 None
+
+    Raises:
+        Exception: 会话未授权/过期（401/403），由上层刷新会话
+    """
+    page_max_retries = _PAGE_MAX_RETRIES
+    initial_wait = _INITIAL_WAIT
+    max_backoff = _PAGE_MAX_BACKOFF
+
+    retries = 0
+    wait_time = initial_wait
+    while retries < page_max_retries:
+        try:
+            # 注意：session可能是SessionProxy对象，不需要isinstance检查
+            response = _http_get(session, url)
+            status = response.status_code
+            if status < 400:
+                # 直接从原始字节解析，跳过 requests 的编码探测与标准库 json
+                # 空页返回共享的空元组，不为每个空切片新建列表
+                return orjson.loads(response.content).get("results") or _NO_RESULTS
+        except _NETWORK_ERRORS as e:
+            retries += 1
+            wait_time = _next_delay(wait_time, initial_wait, max_backoff)
+            logger.error(
+                f"[{slice_id}] Timeout/Connection error. Retry {retries}/{page_max_retries}. Waiting {wait_time:.1f}s | URL: {url}"
+            )
+            time.sleep(wait_time)
+            continue
+        except Exception as e:
+            retries += 1
+            if retries >= page_max_retries:
+                logger.warning("[Scope:Page] 达到页级最大重试次数，返回失败由外层处理")
+                return None
+            # 未分类的异常也加入轻微随机抖动，避免集中重试
+            time.sleep(initial_wait * random.uniform(0.8, 1.2))
+            continue
+
+        # 直接按状态码分支，不经 raise_for_status() 构造并捕获 HTTPError
+        if status == 429:
+            retries += 1
+            if retries >= page_max_retries:
+                logger.warning(f"[{slice_id}] 429 达到页级最大重试次数，返回失败由外层处理 | URL: {url}")
+                return None
+            server_delay = _server_retry_delay(response)
+            if server_delay is not None:
+                # 按服务端提示等待，附加少量抖动避免同时醒来
+                wait_time = server_delay + random.uniform(0, 0.5)
+            else:
+                wait_time = _next_delay(wait_time, initial_wait, max_backoff)
+            logger.warning(
+                f"[{slice_id}] Rate limit 429. Retry {retries}/{page_max_retries}. Waiting {wait_time:.1f}s | URL: {url}"
+            )
+            time.sleep(wait_time)
+        elif status in {401, 403}:
+            logger.error(f"[{slice_id}] 会话未授权/过期 {status}，停止分页 | URL: {url}")
+            # 抛出异常以便上层刷新会话
+            raise Exception(f"会话未授权/过期，停止分页")
+        elif status in {500, 502, 503, 504}:
+            retries += 1
+            wait_time = _next_delay(wait_time, initial_wait, max_backoff)
+            logger.error(
+                f"[{slice_id}] Server error {status}. Retry {retries}/{page_max_retries}. Waiting {wait_time:.1f}s | URL: {url}"
+            )
+            time.sleep(wait_time)
+        else:
+            logger.error(f"[{slice_id}] Unexpected HTTP error {status} | URL: {url}")
+            return None
+
+    return None
+
+def _iter_pages(session, url_for, slice_id, logger):
+    """
+    分页获取一个时间切片的数据，逐页产出
+
+    首页单独请求；首页满页时，每轮按 PAGE_CONCURRENCY 并发预取后续若干页，
+    按 offset 顺序产出，遇到不足一页的结果即结束（其后预取的页丢弃）。
+    PAGE_CONCURRENCY=1 时与逐页顺序请求完全一致。
+
+    Args:
+        session: requests.Session 或 SessionProxy
+        url_for: offset -> URL
+        slice_id: 日志用切片标识
+        logger: 日志对象
+
+    Yields:
+        每页的 alpha 列表；任一页失败时产出 None 并结束
+    """
+    limit = _PAGE_LIMIT
+    concurrency = _PAGE_CONCURRENCY
+
+    alphas = _fetch_page(session, url_for(0), slice_id, logger)
+    yield alphas
+    if alphas is None or len(alphas) < limit:
+        # 失败或已到最后一页
+        return
+
+    def fetch(offset):
+        return _fetch_page(session, url_for(offset), slice_id, logger)
+
+    offset = limit
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="PageFetch") if concurrency > 1 else None
+    try:
+        mapper = executor.map if executor else map
+        while True:
+            window = [offset + i * limit for i in range(concurrency)]
+            for alphas in mapper(fetch, window):
+                yield alphas
+                if alphas is None or len(alphas) < limit:
+                    return
+            offset += concurrency * limit
+    finally:
+        if executor:
+            executor.shutdown(wait=True)
+
+def _collect_pages(pages):
+    """将逐页结果合并为 (fetched_alphas, info)；任一页失败返回 (None, info)"""
+    fetched_alphas = []
+    for alphas in pages:
+        if alphas is None:
+            return None, {'incomplete': True, 'skipped_offsets': []}
+        if alphas:
+            fetched_alphas.extend(alphas)
+    return fetched_alphas, {'incomplete': False, 'skipped_offsets': []}
+
+def _iter_alpha_pages(session, start_date, end_date, scope):
+    """
+    逐页获取指定类型的 alphas（生成器）
+
     Args:
         session: A requests.Session object (or SessionProxy) to handle the API requests.
         start_date: The start date for filtering alphas.
         end_date: The end date for filtering alphas.
+        scope: "REGULAR" 或 "SUPER"
 
-    Returns:
-        A tuple of (fetched_alphas, info) when successful, or (None, info) when failed
-        
-    Note:
-        使用SessionProxy时，不再需要返回session，因为SessionProxy会自动管理session生命周期
+    Yields:
+        每页的 alpha 列表；失败时产出 None 并结束
     """
-    fetched_alphas = []  # 确保在函数开始就初始化
-    offset = 0
-    order = 'dateCreated'
-    
     # 生成时间切片标识用于日志（包含年月日和时间）
     slice_id = f"{start_date[0:10]}T{start_date[11:16]}_to_{end_date[0:10]}T{end_date[11:16]}"
     
-    # Set default parameters（统一由配置驱动）
-    limit = int(_CFG.get("PAGE_LIMIT", 100))
-    page_max_retries = int(_CFG.get("PAGE_MAX_RETRIES", 7))    # 单页失败时的最大重试次数
-    initial_wait = int(_CFG.get("INITIAL_WAIT", 3))            # 初始等待时间（若未配置则使用默认 3s）
-    backoff_multiplier = float(_CFG.get("BACKOFF_MULTIPLIER", 2.0))  # 统一指数退避倍数
-
     # 轻量级logger 适配（优先使用项目自带wq_logger，否则回退到标准logging）
     try:
         from wq_logger import get_logger as _get_logger  # type: ignore
@@ -129,94 +354,35 @@ def get_all_regular_alphas(session, start_date, end_date):
             _handler.setFormatter(_formatter)
             logger.addHandler(_handler)
         logger.setLevel(_logging.INFO)
+
+    # 仅使用传入的会话；若无效则直接失败，由外层处理登录
+    if session is None:
+        logger.error("无效的会话对象，停止分页并返回失败")
+        yield None
+        return
+
+    # 查询条件只取决于切片与类型，整个切片只构造一次；offset 放在末尾，
+    # 每页只需拼接一次字符串（时间条件含 "dateCreated%3C..." 这种无 "=" 的写法，
+    # 不能交给 urlencode 重新编码）
+    query_params = build_api_query_with_time_slice(start_date, end_date, scope)
+    url_prefix = f"{_ALPHAS_URL}?limit={_PAGE_LIMIT}&{query_params}&order={_ORDER_FIELD}&offset="
+
+    def url_for(offset):
+        return url_prefix + str(offset)
+
     # 简化：取消分页全局重试与补偿重试，仅保留页级重试
     # 若任一页在页级重试后仍失败，则返回失败，让外层切片重试处理
-    info = {'incomplete': False, 'skipped_offsets': []}
-    while True:
-        retries = 0
-        # 将url变量定义移到try块外面，避免在异常处理中未定义的问题
-        url = ""
-        while retries < page_max_retries:
-            try:
-                from timezone_utils import build_api_query_with_time_slice
-                query_params = build_api_query_with_time_slice(start_date, end_date, "REGULAR")
-                url = f"https://api.worldquantbrain.com/users/self/alphas?limit={limit}&offset={offset}&{query_params}&order={_CFG.get('ORDER_FIELD', 'dateCreated')}"
-                
-                # 仅使用传入的会话；若无效则直接失败，由外层处理登录
-                # 注意：session可能是SessionProxy对象，不需要isinstance检查
-                if session is None:
-                    logger.error("无效的会话对象，停止分页并返回失败")
-                    return None, {'incomplete': True, 'skipped_offsets': []}
-                
-                response = session.get(url, timeout=int(_CFG.get("HTTP_TIMEOUT", 30)))
-                response.raise_for_status()
-                alphas = response.json().get("results", [])
-                fetched_alphas.extend(alphas)
-                
-                if len(alphas) < limit:
-                    # 已到最后一页
-                    return fetched_alphas, info
-                
-                offset += limit
-                break
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 429:
-                    retries += 1
-                    if retries >= page_max_retries:
-                        logger.warning(f"[{slice_id}] 429 达到页级最大重试次数，返回失败由外层处理 | URL: {url}")
-                        return None, {'incomplete': True, 'skipped_offsets': []}
-                    base_wait = initial_wait * (backoff_multiplier ** (retries - 1))
-                    wait_time = base_wait * random.uniform(0.8, 1.2)
-                    logger.warning(
-                        f"[{slice_id}] Rate limit 429. Retry {retries}/{page_max_retries}. Waiting {wait_time:.1f}s | URL: {url}"
-                    )
-                    time.sleep(wait_time)
-                    continue
-                elif e.response.status_code in {401, 403}:
-                    logger.error(f"[{slice_id}] 会话未授权/过期 {e.response.status_code}，停止分页 | URL: {url}")
-                    # 抛出异常以便上层刷新会话
-                    raise Exception(f"会话未授权/过期，停止分页") from e
-                elif e.response.status_code in {500, 502, 503, 504}:
-                    retries += 1
-                    base_wait = initial_wait * (backoff_multiplier ** (min(retries - 1, 5)))
-                    wait_time = base_wait * random.uniform(0.8, 1.2)
-                    logger.error(
-                        f"[{slice_id}] Server error {e.response.status_code}. Retry {retries}/{page_max_retries}. Waiting {wait_time:.1f}s | URL: {url}"
-                    )
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    logger.error(f"[{slice_id}] Unexpected HTTP error {e.response.status_code}: {e} | URL: {url}")
-                    return None, {'incomplete': True, 'skipped_offsets': []}
-            except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
-                retries += 1
-                base_wait = initial_wait * (backoff_multiplier ** (min(retries - 1, 5)))
-                wait_time = base_wait * random.uniform(0.8, 1.2)
-                logger.error(
-                    f"[{slice_id}] Timeout/Connection error. Retry {retries}/{page_max_retries}. Waiting {wait_time:.1f}s | URL: {url}"
-                )
-                time.sleep(wait_time)
-                continue
-            except Exception as e:
-                retries += 1
-                if retries >= page_max_retries:
-                    logger.warning("[Scope:Page] 达到页级最大重试次数，返回失败由外层处理")
-                    return None, {'incomplete': True, 'skipped_offsets': []}
-                # 未分类的异常也加入轻微随机抖动，避免集中重试
-                time.sleep(initial_wait * random.uniform(0.8, 1.2))
-                continue
-
-    # 不应到达此处；如到达，视为失败
-    return None, {'incomplete': True, 'skipped_offsets': []}
-
-def get_all_super_alphas(session, start_date, end_date):
+    yield from _iter_pages(session, url_for, slice_id, logger)
+
+def _get_all_alphas(session, start_date, end_date, scope):
     """
-    Fetch all super alphas using pagination with improved error handling.
+    Fetch all alphas of the given scope using pagination with improved error handling.
     
     Args:
         session: A requests.Session object (or SessionProxy) to handle the API requests.
         start_date: The start date for filtering alphas.
         end_date: The end date for filtering alphas.
+        scope: "REGULAR" 或 "SUPER"
 
     Returns:
         A tuple of (fetched_alphas, info) when successful, or (None, info) when failed
@@ -224,182 +390,95 @@ def get_all_super_alphas(session, start_date, end_date):
     Note:
         使用SessionProxy时，不再需要返回session，因为SessionProxy会自动管理session生命周期
     """
-    fetched_alphas = []
-    offset = 0
-    
-    # 生成时间切片标识用于日志（包含年月日和时间）
-    slice_id = f"{start_date[0:10]}T{start_date[11:16]}_to_{end_date[0:10]}T{end_date[11:16]}"
-    
-    limit = int(_CFG.get("PAGE_LIMIT", 100))
-    page_max_retries = int(_CFG.get("PAGE_MAX_RETRIES", 7))
-    initial_wait = int(_CFG.get("INITIAL_WAIT", 3))
-    backoff_multiplier = float(_CFG.get("BACKOFF_MULTIPLIER", 2.0))
+    return _collect_pages(_iter_alpha_pages(session, start_date, end_date, scope))
 
-    try:
-        from wq_logger import get_logger as _get_logger
-        logger = _get_logger(__name__)
-    except Exception:
-        import logging as _logging
-        logger = _logging.getLogger(__name__)
-        if not logger.handlers:
-            _handler = _logging.StreamHandler()
-            _formatter = _logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
-            _handler.setFormatter(_formatter)
-            logger.addHandler(_handler)
-        logger.setLevel(_logging.INFO)
-    
-    info = {'incomplete': False, 'skipped_offsets': []}
-    while True:
-        retries = 0
-        # 将url变量定义移到try块外面，避免在异常处理中未定义的问题
-        url = ""
-        while retries < page_max_retries:
-            try:
-                from timezone_utils import build_api_query_with_time_slice
-                query_params = build_api_query_with_time_slice(start_date, end_date, "SUPER")
-                url = f"https://api.worldquantbrain.com/users/self/alphas?limit={limit}&offset={offset}&{query_params}&order={_CFG.get('ORDER_FIELD', 'dateCreated')}"
-                
-                # 注意：session可能是SessionProxy对象，不需要isinstance检查
-                if session is None:
-                    logger.error("无效的会话对象，停止分页并返回失败")
-                    return None, {'incomplete': True, 'skipped_offsets': []}
-                
-                response = session.get(url, timeout=int(_CFG.get("HTTP_TIMEOUT", 30)))
-                response.raise_for_status()
-                alphas = response.json().get("results", [])
-                fetched_alphas.extend(alphas)
-                
-                if len(alphas) < limit:
-                    return fetched_alphas, info
-                
-                offset += limit
-                break
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 429:
-                    retries += 1
-                    if retries >= page_max_retries:
-                        logger.warning(f"[{slice_id}] 429 达到页级最大重试次数，返回失败由外层处理 | URL: {url}")
-                        return None, {'incomplete': True, 'skipped_offsets': []}
-                    base_wait = initial_wait * (backoff_multiplier ** (retries - 1))
-                    wait_time = base_wait * random.uniform(0.8, 1.2)
-                    logger.warning(f"[{slice_id}] Rate limit 429. Retry {retries}/{page_max_retries}. Waiting {wait_time:.1f}s | URL: {url}")
-                    time.sleep(wait_time)
-                    continue
-                elif e.response.status_code in {401, 403}:
-                    logger.error(f"[{slice_id}] 会话未授权/过期 {e.response.status_code}，停止分页 | URL: {url}")
-                    # 抛出异常以便上层刷新会话
-                    raise Exception(f"会话未授权/过期，停止分页") from e
-                elif e.response.status_code in {500, 502, 503, 504}:
-                    retries += 1
-                    base_wait = initial_wait * (backoff_multiplier ** (min(retries - 1, 5)))
-                    wait_time = base_wait * random.uniform(0.8, 1.2)
-                    logger.error(f"[{slice_id}] Server error {e.response.status_code}. Retry {retries}/{page_max_retries}. Waiting {wait_time:.1f}s | URL: {url}")
-                    time.sleep(wait_time)
-                    continue
-                else:
-                    logger.error(f"[{slice_id}] Unexpected HTTP error {e.response.status_code}: {e} | URL: {url}")
-                    return None, {'incomplete': True, 'skipped_offsets': []}
-            except (requests.exceptions.Timeout, requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
-                retries += 1
-                base_wait = initial_wait * (backoff_multiplier ** (min(retries - 1, 5)))
-                wait_time = base_wait * random.uniform(0.8, 1.2)
-                logger.error(f"[{slice_id}] Timeout/Connection error. Retry {retries}/{page_max_retries}. Waiting {wait_time:.1f}s | URL: {url}")
-                time.sleep(wait_time)
-                continue
-            except Exception as e:
-                retries += 1
-                if retries >= page_max_retries:
-                    logger.warning("[Scope:Page] 达到页级最大重试次数，返回失败由外层处理")
-                    return None, {'incomplete': True, 'skipped_offsets': []}
-                time.sleep(initial_wait * random.uniform(0.8, 1.2))
-                continue
-
-    return None, {'incomplete': True, 'skipped_offsets': []}
-
-def fetch_and_save_regular_alphas(session, start_date, end_date, userkey, base_directory):
+iter_regular_alpha_pages = partial(_iter_alpha_pages, scope="REGULAR")
+iter_super_alpha_pages = partial(_iter_alpha_pages, scope="SUPER")
+get_all_regular_alphas = partial(_get_all_alphas, scope="REGULAR")
+get_all_super_alphas = partial(_get_all_alphas, scope="SUPER")
+
+def _write_pages_atomically(pages, file_path):
     """
-    获取并保存regular alphas
-    
+    边获取边写入 JSON 数组，写完后原子替换目标文件
+
+    每条 alpha 单独序列化后立即写出，内存中最多只保留一页数据；
+    输出与 orjson.dumps(全部alphas, option=OPT_INDENT_2) 逐字节一致。
+    OUTPUT_NDJSON 开启时改为每行一条 alpha（NDJSON），文件名不变，
+    下游可逐行流式读取（步骤 2 的 _parse_alpha_file 兼容两种格式）。
+
     Returns:
-        (fetched_alphas, filename, session, info)
+        写入的 alpha 数量；任一页获取失败时返回 None（不生成目标文件）
     """
-    fetched_alphas, info = get_all_regular_alphas(session, start_date, end_date)
-    
-    if fetched_alphas is None:
-        return None, None, info
-    
-    # 生成文件名（与稳定版保持一致）
-    safe_start_date = re.sub(r'[:T]', '-', start_date)
-    safe_end_date = re.sub(r'[:T]', '-', end_date)
-    filename = f'{userkey}_{safe_start_date}_to_{safe_end_date}_all_regular_alphas.json'
-    
-    # 创建目录（与稳定版保持一致）
-    directory = base_directory / "all_regular_alphas"
-    directory.mkdir(parents=True, exist_ok=True)
-    
     # 使用临时文件保存，确保原子性
-    file_path = directory / filename
     temp_file = file_path.with_suffix('.tmp')
-    
+    count = 0
     try:
-        # 写入临时文件
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(fetched_alphas, f, ensure_ascii=False, indent=2)
+        # 写入临时文件：逐条的小块写入先在 1MB 缓冲区中合并再落盘；
+        # 不做 fsync，原子性由同目录下的 replace 保证
+        with open(temp_file, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+            if _OUTPUT_NDJSON:
+                for alphas in pages:
+                    if alphas is None:
+                        return None
+                    for alpha in alphas:
+                        f.write(orjson.dumps(alpha, option=orjson.OPT_APPEND_NEWLINE))
+                    count += len(alphas)
+            else:
+                f.write(b'[')
+                for alphas in pages:
+                    if alphas is None:
+                        return None
+                    if not alphas:
+                        continue
+                    for alpha in alphas:
+                        f.write(b',\n  ' if count else b'\n  ')
+                        # orjson 会转义字符串内的换行，这里的替换只作用于缩进
+                        f.write(orjson.dumps(alpha, option=orjson.OPT_INDENT_2).replace(b'\n', b'\n  '))
+                        count += 1
+                f.write(b'\n]' if count else b']')
         
-        # 原子性重命名（如果目标文件存在会被覆盖）
+        # 文件关闭（缓冲区已全部写出）后再原子性重命名（如果目标文件存在会被覆盖）
         temp_file.replace(file_path)
+        return count
         
-    except Exception as e:
-        # 清理临时文件
+    except OSError as e:
+        raise Exception(f"保存文件失败: {e}") from e
+    finally:
+        # 清理临时文件（失败或异常时残留）
         if temp_file.exists():
             try:
                 temp_file.unlink()
-            except:
+            except OSError:
                 pass
-        raise Exception(f"保存文件失败: {e}") from e
-    
-    return fetched_alphas, filename, info
 
-def fetch_and_save_super_alphas(session, start_date, end_date, userkey, base_directory):
+def _fetch_and_save_alphas(session, start_date, end_date, userkey, base_directory, scope):
     """
-    获取并保存super alphas
+    获取并保存指定类型的 alphas（逐页流式写入文件）
+    
+    Args:
+        scope: "REGULAR" 或 "SUPER"，决定查询条件、文件名与子目录
     
     Returns:
-        (fetched_alphas, filename, session, info)
+        (fetched_count, filename, info)，失败时为 (None, None, info)
     """
-    fetched_alphas, info = get_all_super_alphas(session, start_date, end_date)
-    
-    if fetched_alphas is None:
-        return None, None, info
+    alpha_type = scope.lower()
     
     # 生成文件名（与稳定版保持一致）
-    safe_start_date = re.sub(r'[:T]', '-', start_date)
-    safe_end_date = re.sub(r'[:T]', '-', end_date)
-    filename = f'{userkey}_{safe_start_date}_to_{safe_end_date}_all_super_alphas.json'
+    safe_start_date = start_date.translate(_SAFE_DATE_TABLE)
+    safe_end_date = end_date.translate(_SAFE_DATE_TABLE)
+    filename = f'{userkey}_{safe_start_date}_to_{safe_end_date}_all_{alpha_type}_alphas.json'
     
     # 创建目录（与稳定版保持一致）
-    directory = base_directory / "all_super_alphas"
+    directory = base_directory / f"all_{alpha_type}_alphas"
     directory.mkdir(parents=True, exist_ok=True)
     
-    # 使用临时文件保存，确保原子性
-    file_path = directory / filename
-    temp_file = file_path.with_suffix('.tmp')
+    pages = _iter_alpha_pages(session, start_date, end_date, scope)
+    fetched_count = _write_pages_atomically(pages, directory / filename)
     
-    try:
-        # 写入临时文件
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(fetched_alphas, f, ensure_ascii=False, indent=2)
-        
-        # 原子性重命名（如果目标文件存在会被覆盖）
-        temp_file.replace(file_path)
-        
-    except Exception as e:
-        # 清理临时文件
-        if temp_file.exists():
-            try:
-                temp_file.unlink()
-            except:
-                pass
-        raise Exception(f"保存文件失败: {e}") from e
+    if fetched_count is None:
+        return None, None, {'incomplete': True, 'skipped_offsets': []}
     
-    return fetched_alphas, filename, info
\ No newline at end of file
+    return fetched_count, filename, {'incomplete': False, 'skipped_offsets': []}
+
+fetch_and_save_regular_alphas = partial(_fetch_and_save_alphas, scope="REGULAR")
+fetch_and_save_super_alphas = partial(_fetch_and_save_alphas, scope="SUPER")
\ No newline at end of file
@@ -11,12 +11,19 @@
 
 import json
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from pymongo import MongoClient
 import requests
 
+try:
+    import orjson
+except ImportError:  # 可选依赖，缺失时回退到标准库 json
+    orjson = None
+
 # 导入项目模块
 try:
     import wq_logger
@@ -38,6 +45,18 @@ except ImportError as e:
     logger.error(f"导入模块失败: {e}")
     sys.exit(1)
 
+# 按用户缓存的 SessionManager：同一进程内多次调用复用已认证会话及其连接池，
+# 避免每次调用都重新恢复会话、重新建立 TLS 连接
+_SESSION_MANAGERS: Dict[str, SessionManager] = {}
+
+
+def get_session_manager(user_key: str) -> SessionManager:
+    """获取（必要时创建）指定用户的共享 SessionManager"""
+    session_manager = _SESSION_MANAGERS.get(user_key)
+    if session_manager is None:
+        session_manager = _SESSION_MANAGERS[user_key] = SessionManager()
+    return session_manager
+
 
 def load_mongo_config(config_file: str = "mongo_config.json") -> Dict:
     """加载MongoDB配置"""
@@ -58,6 +77,44 @@ def load_mongo_config(config_file: str = "mongo_config.json") -> Dict:
     return config
 
 
+# 按 (host, port) 复用的 MongoClient：pymongo 自带连接池，每次调用都 close 会拆掉连接池
+_MONGO_CLIENTS: Dict[Tuple[str, int], MongoClient] = {}
+
+# 最近更新alpha_id的短期缓存：查询参数 -> (查询时间, alpha_id列表)
+RECENT_IDS_CACHE_TTL = 30  # 秒
+_recent_ids_cache: Dict[Tuple, Tuple[float, List[str]]] = {}
+
+# 只取 id 字段，避免传输和解码整篇alpha文档
+_ID_PROJECTION = {"id": 1, "_id": 0}
+
+# 已确认存在 dateModified 索引的集合
+_DATE_MODIFIED_INDEXED: set = set()
+
+
+def _get_mongo_client(db_host: str, db_port: int) -> MongoClient:
+    """获取（必要时创建）指定地址的共享MongoClient"""
+    client = _MONGO_CLIENTS.get((db_host, db_port))
+    if client is None:
+        client = _MONGO_CLIENTS[(db_host, db_port)] = MongoClient(f"mongodb://{db_host}:{db_port}/")
+    return client
+
+
+def _ensure_date_modified_index(collection, cache_key: Tuple) -> None:
+    """
+    为 dateModified 回退查询创建 (dateModified 降序, id) 复合索引（每个集合只尝试一次）
+    
+    与 3_mongo_import_v4.py 的 ensure_desc_index 使用同一索引规格和名称，两个脚本共用一个索引；
+    查询只投影 id，可直接由该索引覆盖
+    """
+    if cache_key in _DATE_MODIFIED_INDEXED:
+        return
+    _DATE_MODIFIED_INDEXED.add(cache_key)
+    try:
+        collection.create_index([("dateModified", -1), ("id", 1)], name="dateModified_desc")
+    except Exception as e:
+        logger.debug(f"创建dateModified索引失败（将继续无索引查询）: {e}")
+
+
 def get_recently_updated_alphas(
     db_host: str,
     db_port: int,
@@ -82,10 +139,16 @@ def get_recently_updated_alphas(
         hours: 查询最近N小时内的更新（用于过滤）
     
     Returns:
-        alpha_id列表
+        alpha_id列表（RECENT_IDS_CACHE_TTL 秒内的相同查询直接返回缓存结果）
     """
+    cache_key = (db_host, db_port, db_name, collection_name, limit, hours)
+    cached = _recent_ids_cache.get(cache_key)
+    if cached is not None and time.monotonic() - cached[0] < RECENT_IDS_CACHE_TTL:
+        logger.debug(f"使用缓存的最近更新alpha_id: {cached[1]}")
+        return list(cached[1])
+    
     try:
-        client = MongoClient(f"mongodb://{db_host}:{db_port}/")
+        client = _get_mongo_client(db_host, db_port)
         db = client[db_name]
         collection = db[collection_name]
         
@@ -93,7 +156,7 @@ def get_recently_updated_alphas(
         
         # 方法1: 直接按_id排序获取最新的文档（最可靠）
         # MongoDB的_id是ObjectId，包含时间戳，最近插入/更新的文档_id更大
-        cursor = collection.find({}).sort("_id", -1).limit(limit * 2)  # 多取一些以防有无效的
+        cursor = collection.find({}, _ID_PROJECTION).sort("_id", -1).limit(limit * 2)  # 多取一些以防有无效的
         alphas = list(cursor)
         
         # 提取有效的alpha_id
@@ -108,9 +171,11 @@ def get_recently_updated_alphas(
         # 如果还是不足，尝试按dateModified查询
         if len(alpha_ids) < limit:
             logger.info(f"按_id找到{len(alpha_ids)}个，尝试按dateModified查询...")
+            _ensure_date_modified_index(collection, (db_host, db_port, db_name, collection_name))
             time_threshold = datetime.utcnow() - timedelta(hours=hours)
             cursor = collection.find(
-                {"dateModified": {"$gte": time_threshold.isoformat() + "Z"}}
+                {"dateModified": {"$gte": time_threshold.isoformat() + "Z"}},
+                _ID_PROJECTION
             ).sort("dateModified", -1).limit(limit)
             
             additional_alphas = list(cursor)
@@ -121,43 +186,93 @@ def get_recently_updated_alphas(
                     if len(alpha_ids) >= limit:
                         break
         
-        client.close()
+        alpha_ids = alpha_ids[:limit]
+        _recent_ids_cache[cache_key] = (time.monotonic(), alpha_ids)
         
         logger.info(f"找到 {len(alpha_ids)} 个alpha_id: {alpha_ids}")
-        return alpha_ids[:limit]
+        return list(alpha_ids)
         
     except Exception as e:
         logger.error(f"查询MongoDB失败: {e}", exc_info=True)
         return []
 
 
-def fetch_alpha_from_api(session: requests.Session, alpha_id: str) -> Optional[Dict]:
+# ETag缓存文件（位于 updated_alphas/ 下，跨日期目录共享）：
+# {alpha_id: {"etag": 服务端ETag, "path": 该版本已保存的文件路径}}
+ETAG_CACHE_FILENAME = ".etag_cache.json"
+
+
+def load_etag_cache(cache_dir: Path) -> Dict[str, Dict]:
+    """读取ETag缓存，不存在或损坏时返回空字典"""
+    try:
+        with open(cache_dir / ETAG_CACHE_FILENAME, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_etag_cache(cache_dir: Path, cache: Dict[str, Dict]) -> None:
+    """写回ETag缓存（只保留已落盘的条目）"""
+    entries = {alpha_id: entry for alpha_id, entry in cache.items() if entry.get("path")}
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(cache_dir / ETAG_CACHE_FILENAME, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+    except OSError as e:
+        logger.debug(f"保存ETag缓存失败: {e}")
+
+
+def fetch_alpha_from_api(session: requests.Session, alpha_id: str,
+                         etag_cache: Optional[Dict[str, Dict]] = None) -> Tuple[Optional[Dict], bool]:
     """
     从WorldQuant API获取单个alpha的完整数据
     
+    提供 etag_cache 时发送 If-None-Match 条件请求：服务端返回 304 时直接读取
+    本地已保存的文件；返回 200 时记录新的 ETag（保存后由调用者补上 path），
+    响应不带 ETag 时移除旧条目。
+    
     Args:
         session: 已认证的requests Session
         alpha_id: Alpha ID
+        etag_cache: ETag缓存（可选，见 load_etag_cache）
     
     Returns:
-        Alpha的JSON数据，失败返回None
+        (Alpha的JSON数据, 是否为304未变化)，失败时数据为None
     """
     # 方法1: 尝试直接获取单个alpha（如果API支持）
     url = f"https://api.worldquantbrain.com/users/self/alphas/{alpha_id}"
+    entry = etag_cache.get(alpha_id) if etag_cache is not None else None
+    headers = {"If-None-Match": entry["etag"]} if entry else None
     
     try:
-        response = session.get(url, timeout=30)
+        response = session.get(url, headers=headers, timeout=30)
+        if response.status_code == 304 and entry:
+            try:
+                with open(entry["path"], 'rb') as f:
+                    return json.loads(f.read()), True
+            except (OSError, ValueError, TypeError):
+                # 本地副本缺失，去掉条件头重新下载
+                etag_cache.pop(alpha_id, None)
+                return fetch_alpha_from_api(session, alpha_id, etag_cache)
         if response.status_code == 200:
-            return response.json()
+            alpha_data = response.json()
+            etag = response.headers.get("ETag")
+            if etag_cache is not None:
+                if etag:
+                    etag_cache[alpha_id] = {"etag": etag, "path": None}
+                else:
+                    etag_cache.pop(alpha_id, None)
+            return alpha_data, False
         elif response.status_code == 404:
             # API可能不支持单个alpha端点，返回None让调用者尝试备用方法
-            return None
+            return None, False
         else:
             logger.warning(f"获取alpha {alpha_id} 失败: HTTP {response.status_code}")
-            return None
+            return None, False
     except requests.exceptions.RequestException as e:
         logger.debug(f"直接获取alpha {alpha_id} 失败: {e}，尝试备用方法")
-        return None
+        return None, False
 
 
 def fetch_alpha_from_list_api(session: requests.Session, alpha_id: str) -> Optional[Dict]:
@@ -196,6 +311,43 @@ def fetch_alpha_from_list_api(session: requests.Session, alpha_id: str) -> Optio
         return None
 
 
+def fetch_alphas_bulk(session: requests.Session, alpha_ids: List[str]) -> Dict[str, Dict]:
+    """
+    通过列表API一次请求批量获取多个alpha（id__in 过滤）
+    
+    只保留请求的alpha_id（即使服务端忽略过滤参数也不会误收其他alpha），
+    未返回的alpha由调用者逐个补取。
+    
+    Args:
+        session: 已认证的requests Session
+        alpha_ids: Alpha ID列表
+    
+    Returns:
+        {alpha_id: alpha数据}，请求失败时返回空字典
+    """
+    if not alpha_ids:
+        return {}
+    
+    url = "https://api.worldquantbrain.com/users/self/alphas"
+    params = {
+        "id__in": ",".join(alpha_ids),
+        "limit": len(alpha_ids)
+    }
+    
+    try:
+        response = session.get(url, params=params, timeout=30)
+        if response.status_code != 200:
+            logger.debug(f"批量查询alpha失败: HTTP {response.status_code}，改为逐个获取")
+            return {}
+        results = response.json().get("results", [])
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.debug(f"批量查询alpha出错: {e}，改为逐个获取")
+        return {}
+    
+    wanted = set(alpha_ids)
+    return {alpha["id"]: alpha for alpha in results if alpha.get("id") in wanted}
+
+
 def save_alpha_json(alpha_data: Dict, output_dir: Path, alpha_id: str):
     """
     保存alpha JSON到文件
@@ -210,10 +362,15 @@ def save_alpha_json(alpha_data: Dict, output_dir: Path, alpha_id: str):
     filename = f"{alpha_id}_alpha.json"
     filepath = output_dir / filename
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(alpha_data, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(alpha_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(alpha_data, f, indent=2, ensure_ascii=False)
     
     logger.info(f"已保存: {filepath}")
+    return filepath
 
 
 def fetch_updated_alphas_for_user(
@@ -284,10 +441,8 @@ def fetch_updated_alphas_for_user(
         result["alpha_ids"] = alpha_ids
         logger.info(f"找到 {len(alpha_ids)} 个最近更新的alpha: {alpha_ids}")
         
-        # 初始化session
-        from session_manager import SessionManager
-        session_manager = SessionManager(user_key=user_key)
-        session = session_manager.get_session()
+        # 获取session（同一用户复用共享的SessionManager）
+        session = get_session_manager(user_key).get_session()
         
         if not session:
             raise Exception("无法获取有效的session")
@@ -317,25 +472,60 @@ def fetch_updated_alphas_for_user(
         
         result["output_dir"] = str(output_dir)
         
-        # 获取并保存每个alpha的JSON
-        for i, alpha_id in enumerate(alpha_ids, 1):
-            logger.info(f"[{i}/{len(alpha_ids)}] 正在获取 alpha: {alpha_id}")
+        # 先用一次列表API请求批量获取
+        bulk_alphas = fetch_alphas_bulk(session, alpha_ids)
+        logger.info(f"批量获取到 {len(bulk_alphas)}/{len(alpha_ids)} 个alpha")
+        
+        # 逐个补取时使用ETag条件请求，未变化的alpha不重复下载
+        etag_cache_dir = output_dir.parent
+        etag_cache = load_etag_cache(etag_cache_dir)
+        
+        def fetch_one(alpha_id: str):
+            """逐个补取批量请求未返回的alpha（在线程池中执行）"""
+            logger.info(f"正在获取 alpha: {alpha_id}")
             
             # 尝试方法1: 直接获取
-            alpha_data = fetch_alpha_from_api(session, alpha_id)
+            alpha_data, not_modified = fetch_alpha_from_api(session, alpha_id, etag_cache)
             
-            # 如果失败，尝试方法2: 从列表API查询
+            # 如果失败，尝试方法2: 从列表API查询（结果与已缓存的ETag无关，丢弃旧条目）
             if not alpha_data:
                 logger.debug(f"  尝试备用方法...")
+                etag_cache.pop(alpha_id, None)
                 alpha_data = fetch_alpha_from_list_api(session, alpha_id)
-            
+            return alpha_data, not_modified
+        
+        # 未命中的alpha并发补取；保存与计数仍在当前线程按原顺序进行
+        missing_ids = [alpha_id for alpha_id in alpha_ids if not bulk_alphas.get(alpha_id)]
+        not_modified_ids = set()
+        if missing_ids:
+            with ThreadPoolExecutor(max_workers=min(8, len(missing_ids))) as executor:
+                for alpha_id, (alpha_data, not_modified) in zip(missing_ids, executor.map(fetch_one, missing_ids)):
+                    bulk_alphas[alpha_id] = alpha_data
+                    if not_modified:
+                        not_modified_ids.add(alpha_id)
+        
+        # 保存每个alpha的JSON
+        for i, alpha_id in enumerate(alpha_ids, 1):
+            alpha_data = bulk_alphas.get(alpha_id)
             if alpha_data:
-                save_alpha_json(alpha_data, output_dir, alpha_id)
+                entry = etag_cache.get(alpha_id)
+                target_path = str(output_dir / f"{alpha_id}_alpha.json")
+                if alpha_id in not_modified_ids and entry and entry.get("path") == target_path:
+                    # 304 且本地副本就是目标文件，无需重写
+                    logger.debug(f"  未变化，跳过写入: {target_path}")
+                else:
+                    filepath = save_alpha_json(alpha_data, output_dir, alpha_id)
+                    # 只有单独下载的版本与ETag对应；批量结果不改动已有条目
+                    if entry and alpha_id in missing_ids:
+                        entry["path"] = str(filepath)
                 result["saved_count"] += 1
             else:
-                logger.warning(f"  获取失败: {alpha_id}")
+                logger.warning(f"  [{i}/{len(alpha_ids)}] 获取失败: {alpha_id}")
                 result["failed_count"] += 1
         
+        if etag_cache:
+            save_etag_cache(etag_cache_dir, etag_cache)
+        
         result["success"] = True
         logger.info(f"完成：成功保存 {result['saved_count']}/{len(alpha_ids)} 个alpha")
         
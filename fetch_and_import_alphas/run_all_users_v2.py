@@ -17,16 +17,53 @@ import json
 import logging
 import argparse
 import csv
+import re
+import functools
+import copy
+from operator import itemgetter
+import importlib
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Tuple, Optional
-import traceback
+from typing import List, Dict, Tuple, Optional, Callable
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 # 确保项目根目录在 sys.path 中
 PROJECT_ROOT = Path(__file__).resolve().parent
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
+# 可选：orjson 加速配置读取与结果写出（未安装时使用标准库 json）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj, indent: bool = True) -> str:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option).decode('utf-8')
+
+    def _json_dumps_bytes(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+else:
+    _json_loads = json.loads
+
+    def _json_dumps(obj, indent: bool = True) -> str:
+        return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
+    def _json_dumps_bytes(obj) -> bytes:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+# 可选：pyarrow 的 C++ CSV 解析器（未安装时使用标准库 csv）
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+    pacsv = None
+
 # 导入项目模块
 import wq_login
 from wq_logger import get_logger
@@ -43,10 +80,75 @@ except ImportError as e:
     FETCH_UPDATED_ALPHAS_AVAILABLE = False
     fetch_updated_alphas_for_user = None
 
+# 步骤1输出的切片文件名：<user>_<start>_to_<end>_all_<kind>_alphas.json
+_RE_ALPHA_NAME = re.compile(
+    r'^(?P<id>[A-Za-z0-9@._]+)'
+    r'_(?P<start>\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}\.000Z)_to_'
+    r'(?P<end>\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}\.000Z)_'
+    r'all_(?P<kind>regular|super)_alphas\.json$'
+)
+
+# 账号行的前三列：user_key, email, password
+_ACCOUNT_FIELDS = itemgetter(0, 1, 2)
+
 # ============================================================================
 # 配置加载
 # ============================================================================
 
+def _read_account_csv_rows(file_path: str) -> List:
+    """
+    读取账号CSV的所有行
+    
+    安装了 pyarrow 时用其向量化解析（三列均按字符串读取），否则或文件
+    不是规整的三列格式时回退到标准库 csv，行号与 csv.reader 保持一致。
+    
+    Args:
+        file_path: CSV文件路径
+        
+    Returns:
+        行列表，每行为字段序列
+    """
+    if pacsv is not None:
+        columns = ['user_key', 'email', 'password']
+        try:
+            table = pacsv.read_csv(
+                file_path,
+                read_options=pacsv.ReadOptions(column_names=columns),
+                parse_options=pacsv.ParseOptions(delimiter=',', ignore_empty_lines=False),
+                convert_options=pacsv.ConvertOptions(
+                    column_types={name: pa.string() for name in columns},
+                    strings_can_be_null=False
+                )
+            )
+            return list(zip(*(table.column(name).to_pylist() for name in columns)))
+        except (pa.ArrowInvalid, UnicodeDecodeError) as e:
+            logger.debug(f"pyarrow 解析账号文件失败，回退到 csv 模块: {e}")
+    
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        return list(csv.reader(f))
+
+
+def _write_credential_files(credential_writes: Dict[Path, Dict]) -> None:
+    """
+    并发写出账号凭据文件（凭据目录只创建一次）
+    
+    Args:
+        credential_writes: {凭据文件路径: {"email": ..., "password": ...}}
+    """
+    if not credential_writes:
+        return
+    
+    credentials_dir = Path.home() / "secrets"
+    credentials_dir.mkdir(exist_ok=True)
+    
+    def write_one(item):
+        credentials_file, payload = item
+        credentials_file.write_text(_json_dumps(payload), encoding='utf-8')
+    
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(write_one, credential_writes.items()))
+
+
 def load_accounts_from_csv_excel(file_path: str) -> List[Dict]:
     """
     从CSV或Excel文件读取账号列表
@@ -60,6 +162,9 @@ def load_accounts_from_csv_excel(file_path: str) -> List[Dict]:
         账号列表
     """
     accounts = []
+    # 凭据文件先收集，读完后统一写出；同一用户出现多次时以最后一行为准
+    credential_writes = {}
+    credentials_dir = Path.home() / "secrets"
     file_path_obj = Path(file_path)
     
     if not file_path_obj.exists():
@@ -71,85 +176,84 @@ def load_accounts_from_csv_excel(file_path: str) -> List[Dict]:
         if file_path.endswith(('.xlsx', '.xls')):
             # Excel文件
             try:
-                import importlib
                 openpyxl = importlib.import_module("openpyxl")
-                workbook = openpyxl.load_workbook(file_path)
-                sheet = workbook.active
-                
-                for row_idx, row in enumerate(sheet.iter_rows(min_row=1, values_only=True), 1):
-                    if not row or len(row) < 3:
-                        continue
-                    
-                    user_key = str(row[0]).strip() if row[0] else None
-                    email = str(row[1]).strip() if row[1] else None
-                    password = str(row[2]).strip() if row[2] else None
-                    
-                    if user_key and email and password:
-                        # 自动创建凭据文件
-                        credentials_dir = Path.home() / "secrets"
-                        credentials_dir.mkdir(exist_ok=True)
-                        credentials_file = credentials_dir / f"{user_key}_platform-brain.json"
-                        
-                        with open(credentials_file, 'w', encoding='utf-8') as f:
-                            json.dump({"email": email, "password": password}, f, indent=2)
-                        
-                        accounts.append({
-                            "user_key": user_key,
-                            "description": f"从Excel导入 (行{row_idx})",
-                            "enabled": True
-                        })
-                        logger.info(f"从Excel读取账号: {user_key}")
+                # 只读流式模式：不解析样式、不构建单元格对象，只取单元格的值
+                workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+                try:
+                    sheet = workbook.active
+                    # 一次性过滤掉不足三列或有空单元格的行，循环体内只剩去空白后的检查
+                    rows = (
+                        (row_idx, str(row[0]).strip(), str(row[1]).strip(), str(row[2]).strip())
+                        for row_idx, row in enumerate(sheet.iter_rows(min_row=1, values_only=True), 1)
+                        if row and len(row) >= 3 and row[0] and row[1] and row[2]
+                    )
+                    for row_idx, user_key, email, password in rows:
+                        if user_key and email and password:
+                            # 自动创建凭据文件
+                            credentials_file = credentials_dir / f"{user_key}_platform-brain.json"
+                            
+                            credential_writes[credentials_file] = {"email": email, "password": password}
+                            
+                            accounts.append({
+                                "user_key": user_key,
+                                "description": f"从Excel导入 (行{row_idx})",
+                                "enabled": True
+                            })
+                            logger.info(f"从Excel读取账号: {user_key}")
+                finally:
+                    # 只读模式会一直持有 zip 文件句柄，需要显式关闭
+                    workbook.close()
                     
             except ImportError:
                 logger.error("需要安装 openpyxl 库来读取Excel文件: pip install openpyxl")
                 return accounts
         else:
             # CSV文件
-            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                reader = csv.reader(f)
-                for row_idx, row in enumerate(reader, 1):
-                    if len(row) < 3:
-                        continue
+            for row_idx, row in enumerate(_read_account_csv_rows(file_path), 1):
+                if len(row) < 3:
+                    continue
+                
+                user_key, email, password = map(str.strip, _ACCOUNT_FIELDS(row))
+                
+                if user_key and email and password:
+                    # 自动创建凭据文件
+                    credentials_file = credentials_dir / f"{user_key}_platform-brain.json"
                     
-                    user_key = row[0].strip()
-                    email = row[1].strip()
-                    password = row[2].strip()
+                    credential_writes[credentials_file] = {"email": email, "password": password}
                     
-                    if user_key and email and password:
-                        # 自动创建凭据文件
-                        credentials_dir = Path.home() / "secrets"
-                        credentials_dir.mkdir(exist_ok=True)
-                        credentials_file = credentials_dir / f"{user_key}_platform-brain.json"
-                        
-                        with open(credentials_file, 'w', encoding='utf-8') as f:
-                            json.dump({"email": email, "password": password}, f, indent=2)
-                        
-                        accounts.append({
-                            "user_key": user_key,
-                            "description": f"从CSV导入 (行{row_idx})",
-                            "enabled": True
-                        })
-                        logger.info(f"从CSV读取账号: {user_key}")
+                    accounts.append({
+                        "user_key": user_key,
+                        "description": f"从CSV导入 (行{row_idx})",
+                        "enabled": True
+                    })
+                    logger.info(f"从CSV读取账号: {user_key}")
         
+        _write_credential_files(credential_writes)
         logger.info(f"成功从文件读取 {len(accounts)} 个账号")
         
     except Exception as e:
         logger.error(f"读取账号文件失败: {e}")
-        logger.debug(traceback.format_exc())
+        logger.debug("异常堆栈:", exc_info=True)
     
     return accounts
 
 
 def load_user_config(config_file: str = "user_accounts_config.json") -> Dict:
     """
-    从配置文件加载用户账号配置
+    从配置文件加载用户账号配置（按路径缓存，同一文件只解析一次）
     
     Args:
-        config_file: 配置文件路径
+        config_file: 配置文件路径（传入解析后的绝对路径以便命中缓存）
         
     Returns:
-        配置字典
+        配置字典（缓存结果的深拷贝，调用方修改不会影响其他调用方）
     """
+    return copy.deepcopy(_load_user_config_cached(config_file))
+
+
+@functools.cache
+def _load_user_config_cached(config_file: str) -> Dict:
+    """解析配置文件，结果按路径缓存；只通过 load_user_config 取拷贝使用"""
     config_path = Path(config_file)
     
     # 默认配置
@@ -171,7 +275,7 @@ def load_user_config(config_file: str = "user_accounts_config.json") -> Dict:
     
     try:
         with open(config_path, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
+            config_data = _json_loads(f.read())
         
         # 过滤注释字段
         config = {}
@@ -205,6 +309,32 @@ def load_user_config(config_file: str = "user_accounts_config.json") -> Dict:
 # 辅助函数
 # ============================================================================
 
+@functools.cache
+def load_step_module(module_name: str):
+    """
+    导入步骤模块（每个进程只导入一次）
+    
+    各步骤在调用 main() 时才读取 wq_login.USER_KEY，切换用户后无需重新导入。
+    
+    Args:
+        module_name: 模块名
+        
+    Returns:
+        模块对象
+    """
+    return importlib.import_module(module_name)
+
+
+@functools.cache
+def default_package_workers() -> int:
+    """步骤2的默认工作进程数（CPU 核数的 2 倍，至少 8；每个进程只计算一次）"""
+    try:
+        cpu_cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpu_cores = os.cpu_count() or 8
+    return max(8, int(cpu_cores * 2))
+
+
 def format_time(seconds: float) -> str:
     """将秒数格式化为可读的时间字符串"""
     if seconds < 60:
@@ -264,10 +394,11 @@ def check_step_prerequisites(step_name: str, user_key: str) -> Tuple[bool, str]:
         regular_dir = primeval_dir / "all_regular_alphas"
         super_dir = primeval_dir / "all_super_alphas"
         
+        # 找到第一个文件即可停止，不列出整个目录
         has_files = False
-        if regular_dir.exists() and list(regular_dir.glob("*.json")):
+        if regular_dir.exists() and next(regular_dir.glob("*.json"), None) is not None:
             has_files = True
-        if super_dir.exists() and list(super_dir.glob("*.json")):
+        if super_dir.exists() and next(super_dir.glob("*.json"), None) is not None:
             has_files = True
         
         if not has_files:
@@ -282,11 +413,13 @@ def check_step_prerequisites(step_name: str, user_key: str) -> Tuple[bool, str]:
             return False, f"最终数据目录不存在: {final_dir}"
         
         # 检查是否有数据文件
+        # scandir 的目录项自带文件类型，判断子目录不需要额外的 stat
         has_files = False
-        for item in final_dir.iterdir():
-            if item.is_dir() and list(item.rglob("*.json")):
-                has_files = True
-                break
+        with os.scandir(final_dir) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False) and next(Path(entry.path).rglob("*.json"), None) is not None:
+                    has_files = True
+                    break
         
         if not has_files:
             return False, f"最终数据目录为空: {final_dir}"
@@ -328,23 +461,7 @@ def execute_step1_fetch(user_key: str) -> Dict:
             raise Exception(f"前置条件检查失败: {message}")
         
         # 导入并执行步骤1的主函数
-        # 注意：需要重新导入以获取更新后的 USER_KEY
-        import importlib
-        import sys
-        
-        # 移除旧的模块缓存
-        modules_to_reload = [
-            '1_fetch_all_alpha_main_async',
-            'fetch_all_alphas',
-            'session_manager',
-            'session_proxy'
-        ]
-        for module in modules_to_reload:
-            if module in sys.modules:
-                del sys.modules[module]
-        
-        # 重新导入
-        step1_module = __import__('1_fetch_all_alpha_main_async')
+        step1_module = load_step_module('1_fetch_all_alpha_main_async')
         
         # 执行主函数
         step1_module.main()
@@ -356,7 +473,7 @@ def execute_step1_fetch(user_key: str) -> Dict:
         result["success"] = False
         result["error"] = str(e)
         logger.error(f"步骤1失败 (用户: {user_key}): {e}")
-        logger.debug(traceback.format_exc())
+        logger.debug("异常堆栈:", exc_info=True)
     
     finally:
         result["end_time"] = time.time()
@@ -365,6 +482,30 @@ def execute_step1_fetch(user_key: str) -> Dict:
     return result
 
 
+def load_packaging_options() -> Tuple[str, int]:
+    """
+    读取步骤2的打包模式和工作进程数（async_config.json 中的 PACKAGING_MODE / PACKAGING_WORKERS）
+    
+    Returns:
+        (mode, workers)
+    """
+    config_file = Path(__file__).parent / "async_config.json"
+    mode = 'incremental'
+    workers = None
+    
+    if config_file.exists():
+        try:
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config = _json_loads(f.read())
+            mode = config.get('PACKAGING_MODE', 'incremental')
+            workers = config.get('PACKAGING_WORKERS', None)
+        except Exception:
+            pass
+    
+    # 计算工作线程数
+    return mode, workers or default_package_workers()
+
+
 def execute_step2_package(user_key: str) -> Dict:
     """
     执行步骤2：数据打包和分解
@@ -397,15 +538,7 @@ def execute_step2_package(user_key: str) -> Dict:
             raise Exception(f"前置条件检查失败: {message}")
         
         # 导入步骤2模块
-        import importlib
-        import sys
-        
-        # 移除旧的模块缓存
-        if '2_alpha_files_packaging_and_decomposition' in sys.modules:
-            del sys.modules['2_alpha_files_packaging_and_decomposition']
-        
-        # 重新导入
-        step2_module = __import__('2_alpha_files_packaging_and_decomposition')
+        step2_module = load_step_module('2_alpha_files_packaging_and_decomposition')
         
         # 准备参数
         primeval_root = wq_login.WQ_DATA_ROOT / user_key / "primeval_data"
@@ -413,42 +546,13 @@ def execute_step2_package(user_key: str) -> Dict:
         final_root.mkdir(exist_ok=True, parents=True)
         
         # 加载配置
-        config_file = Path(__file__).parent / "async_config.json"
-        mode = 'incremental'
-        workers = None
-        
-        if config_file.exists():
-            try:
-                with open(config_file, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                mode = config.get('PACKAGING_MODE', 'incremental')
-                workers = config.get('PACKAGING_WORKERS', None)
-            except Exception:
-                pass
-        
-        # 计算工作线程数
-        if workers is None:
-            try:
-                cpu_cores = len(os.sched_getaffinity(0))
-                workers = max(8, int(cpu_cores * 2))
-            except AttributeError:
-                cpu_cores = os.cpu_count() or 8
-                workers = max(8, int(cpu_cores * 2))
-        
-        # 文件名正则
-        import re
-        re_name = re.compile(
-            r'^(?P<id>[A-Za-z0-9@._]+)'
-            r'_(?P<start>\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}\.000Z)_to_'
-            r'(?P<end>\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}\.000Z)_'
-            r'all_(?P<kind>regular|super)_alphas\.json$'
-        )
+        mode, workers = load_packaging_options()
         
         # 执行打包
         step2_module.group_and_split_by_date(
             primeval_root,
             final_root,
-            re_name,
+            _RE_ALPHA_NAME,
             workers,
             mode
         )
@@ -460,7 +564,7 @@ def execute_step2_package(user_key: str) -> Dict:
         result["success"] = False
         result["error"] = str(e)
         logger.error(f"步骤2失败 (用户: {user_key}): {e}")
-        logger.debug(traceback.format_exc())
+        logger.debug("异常堆栈:", exc_info=True)
     
     finally:
         result["end_time"] = time.time()
@@ -501,15 +605,7 @@ def execute_step3_import(user_key: str) -> Dict:
             raise Exception(f"前置条件检查失败: {message}")
         
         # 导入步骤3模块
-        import importlib
-        import sys
-        
-        # 移除旧的模块缓存
-        if '3_mongo_import_v4' in sys.modules:
-            del sys.modules['3_mongo_import_v4']
-        
-        # 重新导入
-        step3_module = __import__('3_mongo_import_v4')
+        step3_module = load_step_module('3_mongo_import_v4')
         
         # 执行主函数
         exit_code = step3_module.main()
@@ -524,7 +620,106 @@ def execute_step3_import(user_key: str) -> Dict:
         result["success"] = False
         result["error"] = str(e)
         logger.error(f"步骤3失败 (用户: {user_key}): {e}")
-        logger.debug(traceback.format_exc())
+        logger.debug("异常堆栈:", exc_info=True)
+    
+    finally:
+        result["end_time"] = time.time()
+        result["duration"] = result["end_time"] - result["start_time"]
+    
+    return result
+
+
+@functools.cache
+def _load_mongo_config(config_path: str) -> Optional[Dict]:
+    """
+    加载 mongo_config.json 并过滤注释字段（按路径缓存，多用户运行时只解析一次）
+    
+    Args:
+        config_path: 配置文件的绝对路径
+        
+    Returns:
+        配置字典；文件不存在或解析失败时返回 None（使用默认配置）
+    """
+    try:
+        path = Path(config_path)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            config_data = _json_loads(f.read())
+        # 过滤注释字段
+        return {
+            key: value for key, value in config_data.items()
+            if not key.startswith('_') and not key.startswith('//')
+        }
+    except Exception as e:
+        logger.debug(f"加载mongo_config.json失败，使用默认配置: {e}")
+        return None
+
+
+def execute_step2_step3_fused(user_key: str) -> Dict:
+    """
+    执行步骤2+3（内存直连）：打包写出的 alpha 直接交给步骤3导入
+    
+    步骤2照常写出 final_data，但步骤3不再扫描并回读这些文件。
+    
+    Args:
+        user_key: 用户标识
+        
+    Returns:
+        执行结果字典
+    """
+    logger.info("="*80)
+    logger.info(f"步骤2+3：打包分解并直接导入 MongoDB (用户: {user_key})")
+    logger.info("="*80)
+    
+    result = {
+        "step": "step2_step3_fused",
+        "user_key": user_key,
+        "success": False,
+        "start_time": time.time(),
+        "end_time": None,
+        "duration": None,
+        "error": None,
+        "details": {}
+    }
+    
+    try:
+        # 检查前置条件
+        is_ready, message = check_step_prerequisites("step2_package", user_key)
+        if not is_ready:
+            raise Exception(f"前置条件检查失败: {message}")
+        
+        step2_module = load_step_module('2_alpha_files_packaging_and_decomposition')
+        step3_module = load_step_module('3_mongo_import_v4')
+        
+        # 准备参数
+        primeval_root = wq_login.WQ_DATA_ROOT / user_key / "primeval_data"
+        final_root = wq_login.WQ_DATA_ROOT / user_key / "final_data"
+        final_root.mkdir(exist_ok=True, parents=True)
+        mode, workers = load_packaging_options()
+        
+        # 步骤2逐个产出写出的 alpha，步骤3边接收边批量写入
+        docs = step2_module.group_and_split_by_date(
+            primeval_root,
+            final_root,
+            _RE_ALPHA_NAME,
+            workers,
+            mode,
+            yield_docs=True
+        )
+        exit_code = step3_module.import_iter(docs)
+        
+        if exit_code == 0:
+            result["success"] = True
+            logger.info(f"步骤2+3完成 (用户: {user_key})")
+        else:
+            raise Exception(f"MongoDB导入返回非零退出码: {exit_code}")
+        
+    except Exception as e:
+        result["success"] = False
+        result["error"] = str(e)
+        logger.error(f"步骤2+3失败 (用户: {user_key}): {e}")
+        logger.debug("异常堆栈:", exc_info=True)
     
     finally:
         result["end_time"] = time.time()
@@ -533,7 +728,45 @@ def execute_step3_import(user_key: str) -> Dict:
     return result
 
 
-def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: bool) -> Dict:
+def fetch_recent_updated_alphas(user_key: str) -> None:
+    """
+    步骤3成功后，获取用户最近更新的alpha JSON（失败不影响主流程）
+    
+    Args:
+        user_key: 用户标识
+    """
+    try:
+        logger.info(f"\n{'='*80}")
+        logger.info(f"获取用户 {user_key} 最近更新的Alpha JSON数据")
+        logger.info(f"{'='*80}")
+        
+        # 加载MongoDB配置
+        mongo_config = _load_mongo_config(str(Path("mongo_config.json").resolve()))
+        
+        # 调用获取更新的alpha函数（output_dir=None会使用wq_logger的日志目录）
+        fetch_result = fetch_updated_alphas_for_user(
+            user_key=user_key,
+            limit=5,
+            mongo_config=mongo_config,
+            output_dir=None  # None表示使用wq_logger的日志目录
+        )
+        
+        if fetch_result["success"]:
+            if fetch_result["saved_count"] > 0:
+                logger.info(f"成功保存 {fetch_result['saved_count']} 个更新的alpha JSON文件到: {fetch_result['output_dir']}")
+            else:
+                logger.info("未找到需要保存的更新alpha")
+        else:
+            logger.warning(f"获取更新的alpha失败: {fetch_result.get('error', '未知错误')}")
+        
+    except Exception as e:
+        # 获取更新的alpha失败不影响主流程
+        logger.warning(f"获取更新的alpha时出错（不影响主流程）: {e}")
+        logger.debug("异常堆栈:", exc_info=True)
+
+
+def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: bool,
+                 fuse_step2_step3: bool = False) -> Dict:
     """
     处理单个用户账号（执行完整的3个步骤）
     
@@ -541,6 +774,7 @@ def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: boo
         user_account: 用户账号信息字典
         execute_steps: 执行步骤配置
         continue_on_error: 遇到错误是否继续
+        fuse_step2_step3: 步骤2和3都执行时，是否在内存中直接衔接（不回读 final_data）
         
     Returns:
         处理结果字典
@@ -554,11 +788,11 @@ def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: boo
     
     user_start_time = time.time()
     
-    # 用户处理结果
+    # 用户处理结果（success 随每个步骤的结果累积更新）
     user_result = {
         "user_key": user_key,
         "description": description,
-        "success": False,
+        "success": True,
         "start_time": user_start_time,
         "end_time": None,
         "duration": None,
@@ -574,6 +808,7 @@ def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: boo
         if execute_steps.get("step1_fetch", True):
             step1_result = execute_step1_fetch(user_key)
             user_result["steps"]["step1_fetch"] = step1_result
+            user_result["success"] &= step1_result["success"]
             
             if not step1_result["success"]:
                 if not continue_on_error:
@@ -581,10 +816,29 @@ def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: boo
                 else:
                     logger.warning(f"步骤1失败，但继续执行后续步骤")
         
+        # 步骤2+3：内存直连
+        fused = (fuse_step2_step3 and execute_steps.get("step2_package", True)
+                 and execute_steps.get("step3_import", True))
+        if fused:
+            fused_result = execute_step2_step3_fused(user_key)
+            user_result["steps"]["step2_step3_fused"] = fused_result
+            user_result["success"] &= fused_result["success"]
+            
+            if not fused_result["success"]:
+                if not continue_on_error:
+                    raise Exception(f"步骤2+3失败: {fused_result['error']}")
+                else:
+                    logger.warning(f"步骤2+3失败: {fused_result['error']}")
+            
+            # 导入成功后，获取最近更新的alpha JSON
+            if fused_result["success"] and FETCH_UPDATED_ALPHAS_AVAILABLE:
+                fetch_recent_updated_alphas(user_key)
+        
         # 步骤2：打包分解
-        if execute_steps.get("step2_package", True):
+        if execute_steps.get("step2_package", True) and not fused:
             step2_result = execute_step2_package(user_key)
             user_result["steps"]["step2_package"] = step2_result
+            user_result["success"] &= step2_result["success"]
             
             if not step2_result["success"]:
                 if not continue_on_error:
@@ -593,9 +847,10 @@ def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: boo
                     logger.warning(f"步骤2失败，但继续执行后续步骤")
         
         # 步骤3：导入MongoDB
-        if execute_steps.get("step3_import", True):
+        if execute_steps.get("step3_import", True) and not fused:
             step3_result = execute_step3_import(user_key)
             user_result["steps"]["step3_import"] = step3_result
+            user_result["success"] &= step3_result["success"]
             
             if not step3_result["success"]:
                 if not continue_on_error:
@@ -605,57 +860,9 @@ def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: boo
             
             # 步骤3成功后，获取最近更新的alpha JSON
             if step3_result["success"] and FETCH_UPDATED_ALPHAS_AVAILABLE:
-                try:
-                    logger.info(f"\n{'='*80}")
-                    logger.info(f"获取用户 {user_key} 最近更新的Alpha JSON数据")
-                    logger.info(f"{'='*80}")
-                    
-                    # 加载MongoDB配置
-                    mongo_config = None
-                    try:
-                        import json
-                        config_path = Path("mongo_config.json")
-                        if config_path.exists():
-                            with open(config_path, 'r', encoding='utf-8') as f:
-                                config_data = json.load(f)
-                            # 过滤注释字段
-                            mongo_config = {}
-                            for key, value in config_data.items():
-                                if not key.startswith('_') and not key.startswith('//'):
-                                    mongo_config[key] = value
-                    except Exception as e:
-                        logger.debug(f"加载mongo_config.json失败，使用默认配置: {e}")
-                    
-                    # 调用获取更新的alpha函数（output_dir=None会使用wq_logger的日志目录）
-                    fetch_result = fetch_updated_alphas_for_user(
-                        user_key=user_key,
-                        limit=5,
-                        mongo_config=mongo_config,
-                        output_dir=None  # None表示使用wq_logger的日志目录
-                    )
-                    
-                    if fetch_result["success"]:
-                        if fetch_result["saved_count"] > 0:
-                            logger.info(f"成功保存 {fetch_result['saved_count']} 个更新的alpha JSON文件到: {fetch_result['output_dir']}")
-                        else:
-                            logger.info("未找到需要保存的更新alpha")
-                    else:
-                        logger.warning(f"获取更新的alpha失败: {fetch_result.get('error', '未知错误')}")
-                    
-                except Exception as e:
-                    # 获取更新的alpha失败不影响主流程
-                    logger.warning(f"获取更新的alpha时出错（不影响主流程）: {e}")
-                    logger.debug(traceback.format_exc())
-        
-        # 检查所有步骤是否成功
-        all_success = all(
-            result["success"]
-            for result in user_result["steps"].values()
-        )
-        
-        user_result["success"] = all_success
+                fetch_recent_updated_alphas(user_key)
         
-        if all_success:
+        if user_result["success"]:
             logger.info(f"用户 {user_key} 处理完成 - 所有步骤成功")
         else:
             logger.warning(f"用户 {user_key} 处理完成 - 部分步骤失败")
@@ -664,7 +871,7 @@ def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: boo
         user_result["success"] = False
         user_result["error"] = str(e)
         logger.error(f"用户 {user_key} 处理失败: {e}")
-        logger.debug(traceback.format_exc())
+        logger.debug("异常堆栈:", exc_info=True)
     
     finally:
         user_result["end_time"] = time.time()
@@ -675,25 +882,271 @@ def process_user(user_account: Dict, execute_steps: Dict, continue_on_error: boo
     return user_result
 
 
-def print_summary(all_results: List[Dict], total_duration: float) -> None:
+def process_users_parallel(user_accounts: List[Dict], execute_steps: Dict,
+                           continue_on_error: bool, max_workers: int,
+                           on_result: Optional[Callable[[Dict], None]] = None,
+                           fuse_step2_step3: bool = False) -> List[Dict]:
+    """
+    多进程并行处理多个用户账号
+    
+    process_user 会修改 wq_login 的模块级全局变量（USER_KEY 等），
+    因此每个用户必须在独立的进程中执行，不能用线程。
+    
+    Args:
+        user_accounts: 用户账号列表
+        execute_steps: 执行步骤配置
+        continue_on_error: 遇到错误是否继续
+        max_workers: 并行进程数
+        on_result: 每个用户完成时的回调（用于逐条持久化结果）
+        fuse_step2_step3: 是否在内存中直接衔接步骤2和3
+        
+    Returns:
+        处理结果列表（与 user_accounts 顺序一致）
+    """
+    results = {}
+    stopping = False
+    done = 0
+    
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(process_user, account, execute_steps, continue_on_error, fuse_step2_step3): i
+            for i, account in enumerate(user_accounts)
+        }
+        
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            done += 1
+            i = futures[future]
+            try:
+                user_result = future.result()
+            except Exception as e:
+                # 子进程异常退出，结果无法取回
+                account = user_accounts[i]
+                now = time.time()
+                user_result = {
+                    "user_key": account["user_key"],
+                    "description": account.get("description", ""),
+                    "success": False,
+                    "start_time": now,
+                    "end_time": now,
+                    "duration": 0.0,
+                    "steps": {},
+                    "error": f"子进程执行失败: {e}"
+                }
+                logger.error(f"用户 {account['user_key']} 子进程执行失败: {e}")
+            
+            results[i] = user_result
+            if on_result:
+                on_result(user_result)
+            logger.info(f"进度: {done}/{len(user_accounts)} (用户: {user_result['user_key']})")
+            
+            # 如果失败且不继续，则取消尚未开始的用户；已在运行的用户仍等待完成并记录结果
+            if not user_result["success"] and not continue_on_error and not stopping:
+                stopping = True
+                logger.error("遇到错误，停止处理（等待已开始的用户完成）")
+                for pending in futures:
+                    pending.cancel()
+    
+    return [results[i] for i in sorted(results)]
+
+
+# 流水线模式下按顺序执行的步骤
+PIPELINE_STEPS = ("step1_fetch", "step2_package", "step3_import")
+
+STEP_LABELS = {
+    "step1_fetch": "步骤1",
+    "step2_package": "步骤2",
+    "step3_import": "步骤3",
+}
+
+
+def run_pipeline_step(step_name: str, user_key: str) -> Dict:
+    """
+    在流水线阶段进程中执行单个用户的单个步骤
+    
+    每个阶段独占一个进程，先切换该进程内的用户环境再执行。
+    
+    Args:
+        step_name: 步骤名称
+        user_key: 用户标识
+        
+    Returns:
+        步骤执行结果字典
+    """
+    setup_user_environment(user_key)
+    
+    if step_name == "step1_fetch":
+        return execute_step1_fetch(user_key)
+    if step_name == "step2_package":
+        return execute_step2_package(user_key)
+    
+    step3_result = execute_step3_import(user_key)
+    if step3_result["success"] and FETCH_UPDATED_ALPHAS_AVAILABLE:
+        fetch_recent_updated_alphas(user_key)
+    return step3_result
+
+
+def process_users_pipeline(user_accounts: List[Dict], execute_steps: Dict,
+                           continue_on_error: bool,
+                           on_result: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+    """
+    以流水线方式处理多个用户账号
+    
+    步骤1（网络）、步骤2（CPU/磁盘）、步骤3（MongoDB）各由一个独立进程执行：
+    用户A完成步骤1后立即进入步骤2，同时用户B开始步骤1，依此类推。
+    步骤1和步骤3都读取 wq_login 的模块级全局变量，因此各阶段必须是独立进程。
+    
+    Args:
+        user_accounts: 用户账号列表
+        execute_steps: 执行步骤配置
+        continue_on_error: 遇到错误是否继续
+        on_result: 每个用户完成时的回调（用于逐条持久化结果）
+        
+    Returns:
+        处理结果列表（与 user_accounts 顺序一致，不含未开始的用户）
+    """
+    steps = [step for step in PIPELINE_STEPS if execute_steps.get(step, True)]
+    user_results = [
+        {
+            "user_key": account["user_key"],
+            "description": account.get("description", ""),
+            "success": True,
+            "start_time": None,
+            "end_time": None,
+            "duration": None,
+            "steps": {},
+            "error": None
+        }
+        for account in user_accounts
+    ]
+    if not steps:
+        return []
+    
+    stages = {step: ProcessPoolExecutor(max_workers=1) for step in steps}
+    pending = {}
+    
+    def submit(i: int, stage: int) -> None:
+        step_name = steps[stage]
+        future = stages[step_name].submit(run_pipeline_step, step_name, user_accounts[i]["user_key"])
+        pending[future] = (i, stage)
+    
+    try:
+        for i in range(len(user_accounts)):
+            submit(i, 0)
+        
+        stopped = False
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, stage = pending.pop(future)
+                if future.cancelled():
+                    # 已完成部分步骤的用户在停止时也算处理结束
+                    if user_results[i]["steps"] and on_result:
+                        on_result(user_results[i])
+                    continue
+                
+                step_name = steps[stage]
+                user_result = user_results[i]
+                try:
+                    step_result = future.result()
+                except Exception as e:
+                    # 阶段进程异常退出，结果无法取回
+                    now = time.time()
+                    step_result = {
+                        "step": step_name,
+                        "user_key": user_result["user_key"],
+                        "success": False,
+                        "start_time": now,
+                        "end_time": now,
+                        "duration": 0.0,
+                        "error": f"子进程执行失败: {e}",
+                        "details": {}
+                    }
+                
+                user_result["steps"][step_name] = step_result
+                if user_result["start_time"] is None:
+                    user_result["start_time"] = step_result["start_time"]
+                user_result["end_time"] = step_result["end_time"]
+                user_result["duration"] = user_result["end_time"] - user_result["start_time"]
+                
+                if not step_result["success"]:
+                    user_result["success"] = False
+                    if not continue_on_error:
+                        user_result["error"] = f"{STEP_LABELS[step_name]}失败: {step_result['error']}"
+                        logger.error("遇到错误，停止处理")
+                        stopped = True
+                        for other in pending:
+                            other.cancel()
+                        if on_result:
+                            on_result(user_result)
+                        continue
+                    logger.warning(f"{STEP_LABELS[step_name]}失败 (用户: {user_result['user_key']})，但继续执行后续步骤")
+                
+                if stage + 1 < len(steps) and not stopped:
+                    submit(i, stage + 1)
+                else:
+                    status = "所有步骤成功" if user_result["success"] else "部分步骤失败"
+                    logger.info(f"用户 {user_result['user_key']} 处理完成 - {status}，"
+                                f"耗时: {format_time(user_result['duration'])}")
+                    if on_result:
+                        on_result(user_result)
+    finally:
+        for executor in stages.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+    
+    return [r for r in user_results if r["steps"]]
+
+
+def print_summary(all_results: List[Dict], total_duration: float) -> int:
     """
     打印所有用户的处理摘要
     
     Args:
         all_results: 所有用户的处理结果列表
         total_duration: 总耗时（秒）
+        
+    Returns:
+        成功的用户数
     """
+    step_labels = {
+        "step1_fetch": "步骤1-获取数据",
+        "step2_package": "步骤2-打包分解",
+        "step2_step3_fused": "步骤2+3-打包并直接导入",
+        "step3_import": "步骤3-导入MongoDB"
+    }
+    
+    # 一次遍历同时完成成功/失败分组和详细信息的生成
+    success_users = []
+    failed_users = []
+    detail_lines = []
+    for result in all_results:
+        (success_users if result["success"] else failed_users).append(result)
+        
+        description = result.get("description", "")
+        detail_lines.append(f"\n用户: {result['user_key']}" + (f" ({description})" if description else ""))
+        detail_lines.append(f"状态: {'[成功]' if result['success'] else '[失败]'}")
+        detail_lines.append(f"耗时: {format_time(result['duration'])}")
+        
+        if result["error"]:
+            detail_lines.append(f"错误: {result['error']}")
+        
+        # 步骤详情
+        if result["steps"]:
+            detail_lines.append("步骤详情:")
+            for step_name, step_result in result["steps"].items():
+                step_status = "[OK]" if step_result["success"] else "[FAIL]"
+                step_label = step_labels.get(step_name, step_name)
+                detail_lines.append(f"  {step_status} {step_label}: {format_time(step_result['duration'])}")
+                if not step_result["success"] and step_result["error"]:
+                    detail_lines.append(f"     错误: {step_result['error']}")
+    
     print("\n" + "="*80)
     print(" "*30 + "执行摘要")
     print("="*80)
     
     print(f"\n总耗时: {format_time(total_duration)}")
     print(f"处理用户数: {len(all_results)}")
-    
-    # 统计成功和失败的用户
-    success_users = [r for r in all_results if r["success"]]
-    failed_users = [r for r in all_results if not r["success"]]
-    
     print(f"成功: {len(success_users)} 个用户")
     print(f"失败: {len(failed_users)} 个用户")
     
@@ -701,35 +1154,7 @@ def print_summary(all_results: List[Dict], total_duration: float) -> None:
     print("\n" + "-"*80)
     print("详细信息:")
     print("-"*80)
-    
-    for result in all_results:
-        user_key = result["user_key"]
-        description = result.get("description", "")
-        status = "[成功]" if result["success"] else "[失败]"
-        duration = format_time(result["duration"])
-        
-        print(f"\n用户: {user_key}" + (f" ({description})" if description else ""))
-        print(f"状态: {status}")
-        print(f"耗时: {duration}")
-        
-        if result["error"]:
-            print(f"错误: {result['error']}")
-        
-        # 步骤详情
-        if result["steps"]:
-            print("步骤详情:")
-            for step_name, step_result in result["steps"].items():
-                step_status = "[OK]" if step_result["success"] else "[FAIL]"
-                step_duration = format_time(step_result["duration"])
-                step_label = {
-                    "step1_fetch": "步骤1-获取数据",
-                    "step2_package": "步骤2-打包分解",
-                    "step3_import": "步骤3-导入MongoDB"
-                }.get(step_name, step_name)
-                
-                print(f"  {step_status} {step_label}: {step_duration}")
-                if not step_result["success"] and step_result["error"]:
-                    print(f"     错误: {step_result['error']}")
+    print("\n".join(detail_lines))
     
     print("\n" + "="*80)
     
@@ -737,35 +1162,39 @@ def print_summary(all_results: List[Dict], total_duration: float) -> None:
     if failed_users:
         print("\n[警告] 失败的用户:")
         for result in failed_users:
-            user_key = result["user_key"]
-            error = result.get("error", "未知错误")
-            print(f"  - {user_key}: {error}")
+            print(f"  - {result['user_key']}: {result.get('error', '未知错误')}")
     
     print("\n")
+    
+    return len(success_users)
 
 
-def save_results_to_json(all_results: List[Dict], output_file: str = "run_all_users_results.json") -> None:
+def save_results_to_json(all_results: List[Dict], output_file: str = "run_all_users_results.json",
+                         success_count: Optional[int] = None) -> None:
     """
     将结果保存到JSON文件
     
     Args:
         all_results: 所有用户的处理结果列表
         output_file: 输出文件名
+        success_count: 成功用户数（print_summary 已统计时直接传入，避免再次遍历）
     """
     try:
         output_path = Path(__file__).parent / output_file
         
         # 准备输出数据
+        if success_count is None:
+            success_count = sum(1 for r in all_results if r["success"])
         output_data = {
             "timestamp": datetime.now().isoformat(),
             "total_users": len(all_results),
-            "success_count": sum(1 for r in all_results if r["success"]),
-            "failed_count": sum(1 for r in all_results if not r["success"]),
+            "success_count": success_count,
+            "failed_count": len(all_results) - success_count,
             "results": all_results
         }
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        # 直接写入字节，省去中间 str 与再次编码
+        output_path.write_bytes(_json_dumps_bytes(output_data))
         
         logger.info(f"结果已保存到: {output_path}")
         
@@ -788,6 +1217,8 @@ def parse_arguments():
   python run_all_users_v2.py --config my_config.json     # 使用自定义配置文件
   python run_all_users_v2.py --user zzz                  # 只处理指定用户
   python run_all_users_v2.py --skip-step1                # 跳过步骤1
+  python run_all_users_v2.py --parallel 4                # 4 个用户并行处理
+  python run_all_users_v2.py --pipeline                  # 三个步骤按流水线重叠执行
         """
     )
     
@@ -835,6 +1266,25 @@ def parse_arguments():
         help='结果输出文件名 (默认: run_all_users_results.json)'
     )
     
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        default=1,
+        help='并行处理的用户数，每个用户一个独立进程 (默认: 1，即逐个处理)'
+    )
+    
+    parser.add_argument(
+        '--pipeline',
+        action='store_true',
+        help='流水线模式：三个步骤各由一个进程执行，不同用户的步骤重叠进行（优先于 --parallel）'
+    )
+    
+    parser.add_argument(
+        '--fuse-step2-step3',
+        action='store_true',
+        help='步骤2写出的alpha直接在内存中交给步骤3导入，不再回读 final_data（覆盖配置文件设置，流水线模式下不生效）'
+    )
+    
     return parser.parse_args()
 
 
@@ -849,7 +1299,7 @@ def main():
     args = parse_arguments()
     
     # 加载配置
-    config = load_user_config(args.config)
+    config = load_user_config(str(Path(args.config).resolve()))
     
     # 处理命令行覆盖
     execute_steps = config["EXECUTE_STEPS"].copy()
@@ -861,6 +1311,7 @@ def main():
         execute_steps["step3_import"] = False
     
     continue_on_error = not args.stop_on_error if args.stop_on_error else config["CONTINUE_ON_ERROR"]
+    fuse_step2_step3 = args.fuse_step2_step3 or bool(config.get("FUSE_STEP2_STEP3", False))
     
     # 确定要处理的账号列表
     if args.user:
@@ -878,6 +1329,7 @@ def main():
         return 1
     
     global_start_time = time.time()
+    parallel = max(1, min(args.parallel, len(user_accounts)))
     
     # 显示配置
     logger.info("配置信息:")
@@ -886,6 +1338,9 @@ def main():
     logger.info(f"执行步骤: {[k for k, v in execute_steps.items() if v]}")
     logger.info(f"失败处理策略: {'继续' if continue_on_error else '立即停止'}")
     logger.info(f"输出文件: {args.output}")
+    logger.info(f"并行进程数: {parallel}")
+    logger.info(f"流水线模式: {'开启' if args.pipeline else '关闭'}")
+    logger.info(f"步骤2+3内存直连: {'开启' if fuse_step2_step3 and not args.pipeline else '关闭'}")
     
     # 显示用户列表
     logger.info("\n用户列表:")
@@ -899,31 +1354,50 @@ def main():
     # 处理所有用户
     all_results = []
     
-    for i, account in enumerate(user_accounts, 1):
-        logger.info(f"\n{'='*80}")
-        logger.info(f"进度: {i}/{len(user_accounts)}")
-        logger.info(f"{'='*80}")
-        
-        user_result = process_user(account, execute_steps, continue_on_error)
-        all_results.append(user_result)
-        
-        # 如果失败且不继续，则停止
-        if not user_result["success"] and not continue_on_error:
-            logger.error("遇到错误，停止处理")
-            break
+    # 每个用户完成后立即追加一行到 .jsonl，程序中断时已完成用户的结果不会丢失
+    results_log_path = (Path(__file__).parent / args.output).with_suffix('.jsonl')
+    results_log = open(results_log_path, 'a', encoding='utf-8', buffering=1)
+    logger.info(f"逐条结果文件: {results_log_path}")
+    
+    def record_result(user_result: Dict) -> None:
+        results_log.write(_json_dumps(user_result, indent=False) + "\n")
+        results_log.flush()
+    
+    try:
+        if args.pipeline:
+            all_results = process_users_pipeline(user_accounts, execute_steps, continue_on_error,
+                                                 on_result=record_result)
+        elif parallel > 1:
+            all_results = process_users_parallel(user_accounts, execute_steps, continue_on_error, parallel,
+                                                 on_result=record_result, fuse_step2_step3=fuse_step2_step3)
+        else:
+            for i, account in enumerate(user_accounts, 1):
+                logger.info(f"\n{'='*80}")
+                logger.info(f"进度: {i}/{len(user_accounts)}")
+                logger.info(f"{'='*80}")
+                
+                user_result = process_user(account, execute_steps, continue_on_error, fuse_step2_step3)
+                all_results.append(user_result)
+                record_result(user_result)
+                
+                # 如果失败且不继续，则停止
+                if not user_result["success"] and not continue_on_error:
+                    logger.error("遇到错误，停止处理")
+                    break
+    finally:
+        results_log.close()
     
     # 计算总耗时
     total_duration = time.time() - global_start_time
     
     # 打印摘要
-    print_summary(all_results, total_duration)
+    success_count = print_summary(all_results, total_duration)
     
     # 保存结果到JSON
-    save_results_to_json(all_results, args.output)
+    save_results_to_json(all_results, args.output, success_count)
     
     # 返回退出码
-    all_success = all(r["success"] for r in all_results)
-    return 0 if all_success else 1
+    return 0 if success_count == len(all_results) else 1
 
 
 if __name__ == "__main__":
@@ -1,27 +1,29 @@
 # WQ Shared Module
 # 项目公共模块，供各子模块导入使用
+#
+# 子模块按需懒加载（PEP 562）：只用 logger 的进程不会因此导入 requests / zoneinfo
 
-from .wq_logger import get_logger, WQLogger, init_logger, quick_setup, setup_root_logging
-from .wq_login import (
-    start_session, 
-    get_credentials, 
-    check_session_validity,
-    clear_credentials,
-    WQ_DATA_ROOT,
-    WQ_LOGS_ROOT,
-    USER_KEY,
-    BRAIN_API_URL
-)
-from .timezone_utils import (
-    convert_eastern_to_utc,
-    get_utc_date_range_for_eastern_date,
-    get_file_date_from_utc_timestamp,
-    generate_time_slices_utc,
-    EASTERN_TZ,
-    UTC_TZ
-)
-from .session_manager import SessionManager
-from .session_proxy import SessionProxy
+import importlib
+
+# 公共名称 -> 所在子模块
+_LAZY = {
+    # wq_logger
+    'get_logger': 'wq_logger', 'WQLogger': 'wq_logger', 'init_logger': 'wq_logger',
+    'quick_setup': 'wq_logger', 'setup_root_logging': 'wq_logger',
+    # wq_login
+    'start_session': 'wq_login', 'get_credentials': 'wq_login',
+    'check_session_validity': 'wq_login', 'clear_credentials': 'wq_login',
+    'WQ_DATA_ROOT': 'wq_login', 'WQ_LOGS_ROOT': 'wq_login',
+    'USER_KEY': 'wq_login', 'BRAIN_API_URL': 'wq_login',
+    # timezone_utils
+    'convert_eastern_to_utc': 'timezone_utils',
+    'get_utc_date_range_for_eastern_date': 'timezone_utils',
+    'get_file_date_from_utc_timestamp': 'timezone_utils',
+    'generate_time_slices_utc': 'timezone_utils',
+    'EASTERN_TZ': 'timezone_utils', 'UTC_TZ': 'timezone_utils',
+    # session
+    'SessionManager': 'session_manager', 'SessionProxy': 'session_proxy',
+}
 
 __all__ = [
     # wq_logger
@@ -36,3 +38,17 @@ __all__ = [
     # session
     'SessionManager', 'SessionProxy',
 ]
+
+
+def __getattr__(name):
+    mod_name = _LAZY.get(name)
+    if mod_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{mod_name}', __name__), name)
+    # 缓存到模块全局，后续访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,22 @@
+"""
+轻量 logger 适配：优先使用共享的 wq_logger，否则回退到标准 logging
+
+session_manager / session_proxy 共用此模块，导入时只执行一次回退判断。
+"""
+
+try:
+    from .wq_logger import get_logger as _get_logger
+except Exception:
+    _get_logger = None
+    import logging as _logging
+    if not _logging.getLogger().handlers:
+        _logging.basicConfig(level=_logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
+
+__all__ = ['get_logger']
+
+
+def get_logger(name: str):
+    """获取指定名称的 logger"""
+    if _get_logger is not None:
+        return _get_logger(name)
+    return _logging.getLogger(name)
@@ -1,14 +1,7 @@
 import time
 import threading
-# 轻量 logger 适配：优先使用上级共享的 wq_logger，否则回退到标准 logging
-try:
-    from wq_logger import get_logger as _get_logger
-    logger = _get_logger(__name__)
-except Exception:
-    import logging as _logging
-    if not _logging.getLogger().handlers:
-        _logging.basicConfig(level=_logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
-    logger = _logging.getLogger(__name__)
+from ._logger_adapter import get_logger
+logger = get_logger(__name__)
 
 from datetime import datetime, timedelta
 import wq_login
@@ -25,20 +18,23 @@ class SessionManager:
     - 快速路径：大部分情况下无锁检查session有效性
     - 慢速路径：只在需要刷新时才获取锁
     - 双重检查锁定：避免多线程重复刷新
-    - 可重入锁：支持同一线程多次获取锁
+    - 普通互斥锁：锁内调用的方法均不会再次获取锁，无需可重入锁
     
     线程安全策略：
     1. 读取session：快速路径，无锁检查（如果session有效）
     2. 刷新session：慢速路径，获取锁后双重检查
-    3. 使用RLock：允许同一线程递归调用
+    3. 使用Lock：只有 get_session / force_refresh / update_session 获取锁，
+       _create_new_session / _check_and_refresh_if_needed / _update_expiry_time
+       必须在锁内调用且不会重入（修改时需保持这一约束，否则会死锁）
     """
     
     def __init__(self):
         self.session: Optional[requests.Session] = None
+        # 过期时间与检查时间均基于 time.monotonic()，不受系统时钟调整影响
         self.session_expiry_time: Optional[float] = None
         self.last_check_time: Optional[float] = None
         self.buffer_time: int = 1800  # 保留30分钟的缓冲时间，确保分页过程中的旧session有足够时间完成
-        self._lock = threading.RLock()  # 使用可重入锁，支持递归调用
+        self._lock = threading.Lock()  # 不存在重入路径，使用开销更小的普通锁
         logger.debug("SessionManager initialized with 30-minute buffer and thread-safe lock.")
 
     def get_session(self) -> requests.Session:
@@ -57,24 +53,28 @@ class SessionManager:
         Returns:
             requests.Session: 有效的session对象
         """
-        current_time = time.time()
+        current_time = time.monotonic()
         
         # ===== 快速路径：无锁检查 =====
-        # 如果session存在且有预估的过期时间
-        if self.session is not None and self.session_expiry_time is not None:
-            remaining_time = self.session_expiry_time - current_time
+        # 先把两个字段快照到局部变量，避免其他线程刷新导致前后读取不一致
+        sess = self.session
+        exp = self.session_expiry_time
+        if sess is not None and exp is not None:
+            remaining_time = exp - current_time
             
             # 如果剩余时间充足（超过缓冲时间），直接返回
             if remaining_time > self.buffer_time:
-                # 偶尔记录一下状态（避免日志过多）
-                if remaining_time > 3600:  # 如果剩余时间超过1小时
-                    if not self.last_check_time or (current_time - self.last_check_time) > 1800:  # 每30分钟记录一次
-                        logger.info(f"会话仍然有效，剩余时间: {int(remaining_time/60)} 分钟")
-                        self.last_check_time = current_time
-                return self.session
+                # 偶尔记录一下状态（剩余超过1小时时每30分钟记录一次，避免日志过多）
+                if remaining_time > 3600 and (current_time - (self.last_check_time or 0)) > 1800:
+                    logger.info("会话仍然有效，剩余时间: %d 分钟", remaining_time // 60)
+                    self.last_check_time = current_time
+                return sess
         
         # ===== 慢速路径：需要刷新，获取锁 =====
         with self._lock:
+            # 等锁期间其他线程可能已刷新（耗时可达数秒），重新读取当前时间
+            current_time = time.monotonic()
+            
             # 双重检查：可能其他线程已经刷新了session
             if self.session is not None and self.session_expiry_time is not None:
                 remaining_time = self.session_expiry_time - current_time
@@ -90,35 +90,40 @@ class SessionManager:
                 return self._check_and_refresh_if_needed()
             else:
                 remaining_time = self.session_expiry_time - current_time
-                logger.warning(f"会话剩余时间不足 {int(remaining_time/60)} 分钟（{int(remaining_time)}秒），主动刷新会话……")
+                logger.warning("会话剩余时间不足 %d 分钟（%d秒），主动刷新会话……", remaining_time // 60, remaining_time)
             
             return self._create_new_session()
 
-    def _update_expiry_time(self, verbose: bool = True):
+    def _update_expiry_time(self, verbose: bool = True, expiry_seconds: Optional[float] = None):
         """更新会话过期时间
         
         Args:
             verbose: 是否输出详细日志（默认True）
+            expiry_seconds: 已探测到的会话剩余秒数；为 None 时请求认证接口获取
         """
         try:
-            expiry_seconds = wq_login.check_session_timeout(self.session)
+            if expiry_seconds is None:
+                expiry_seconds = wq_login.check_session_timeout(self.session)
+            now = time.monotonic()
             if expiry_seconds and expiry_seconds > 0:
-                self.session_expiry_time = time.time() + expiry_seconds
+                self.session_expiry_time = now + expiry_seconds
                 if verbose:
                     logger.info(
-                        f"会话有效，剩余时间: {int(expiry_seconds/3600)} 小时 {int((expiry_seconds%3600)/60)} 分钟 ({int(expiry_seconds)}秒)"
+                        "会话有效，剩余时间: %d 小时 %d 分钟 (%d秒)",
+                        expiry_seconds // 3600, (expiry_seconds % 3600) // 60, expiry_seconds
                     )
             else:
                 # 设置保守估计
-                self.session_expiry_time = time.time() + 6 * 3600
+                self.session_expiry_time = now + 6 * 3600
                 if verbose:
                     logger.warning("无法获取会话剩余时间，使用默认6小时")
-            self.last_check_time = time.time()
+            self.last_check_time = now
         except Exception as e:
             if verbose:
-                logger.warning(f"获取会话剩余时间失败，使用默认6小时: {e}")
-            self.session_expiry_time = time.time() + 6 * 3600
-            self.last_check_time = time.time()
+                logger.warning("获取会话剩余时间失败，使用默认6小时: %s", e)
+            now = time.monotonic()
+            self.session_expiry_time = now + 6 * 3600
+            self.last_check_time = now
 
     def _create_new_session(self) -> requests.Session:
         """
@@ -143,7 +148,7 @@ class SessionManager:
             return self.session
             
         except Exception as e:
-            logger.error(f"创建会话失败: {e}", exc_info=True)
+            logger.error("创建会话失败: %s", e, exc_info=True)
             self.session = None
             self.session_expiry_time = None
             raise
@@ -158,10 +163,11 @@ class SessionManager:
             requests.Session: 有效的session对象
         """
         try:
-            # 使用30分钟阈值验证有效性
-            if self.session is not None and wq_login.check_session_validity(self.session, min_remaining_seconds=self.buffer_time):
-                # 会话有效，获取并更新过期时间
-                self._update_expiry_time()
+            # 一次请求同时得到有效性与剩余时间，使用30分钟阈值验证有效性
+            expiry_seconds = wq_login.check_session_timeout(self.session) if self.session is not None else 0
+            if expiry_seconds > self.buffer_time:
+                # 会话有效，直接用探测结果更新过期时间
+                self._update_expiry_time(expiry_seconds=expiry_seconds)
                 return self.session
             else:
                 # 会话无效，创建新会话
@@ -169,7 +175,7 @@ class SessionManager:
                 return self._create_new_session()
                 
         except Exception as e:
-            logger.error(f"检查会话时出错: {e}", exc_info=True)
+            logger.warning("检查会话时出错，重新创建会话: %s", e)
             return self._create_new_session()
 
     def force_refresh(self) -> requests.Session:
@@ -213,6 +219,6 @@ class SessionManager:
     def get_remaining_time(self) -> float:
         """获取会话剩余时间（秒）"""
         if self.session_expiry_time:
-            remaining = self.session_expiry_time - time.time()
+            remaining = self.session_expiry_time - time.monotonic()
             return max(0, remaining)
         return 0.0
\ No newline at end of file
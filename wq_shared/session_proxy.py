@@ -2,11 +2,12 @@
 SessionProxy - 会话代理类
 
 这个类包装了requests.Session，确保每次HTTP请求都使用最新的有效session。
-它解决了Worker持有session引用过期的问题，通过在每次请求时从SessionManager获取最新session。
+它解决了Worker持有session引用过期的问题：请求前确认所用session仍是SessionManager当前的session，
+被替换（刷新/重新登录）后立即改用新session。
 
 核心特性：
 - 透明代理：实现requests.Session的主要接口
-- 自动刷新：每次请求前自动获取最新session
+- 自动刷新：SessionManager替换session后，下一次请求即使用新session
 - 线程安全：依赖SessionManager的线程安全机制
 - 零侵入：对调用代码透明，无需修改fetch_all_alphas.py
 
@@ -20,16 +21,10 @@ SessionProxy - 会话代理类
     cookies = session_proxy.cookies
 """
 
-# 轻量 logger 适配：优先使用上级共享的 wq_logger，否则回退到标准 logging
-try:
-    from wq_logger import get_logger as _get_logger
-    logger = _get_logger(__name__)
-except Exception:
-    import logging as _logging
-    if not _logging.getLogger().handlers:
-        _logging.basicConfig(level=_logging.INFO, format='%(asctime)s - %(levelname)s - %(name)s - %(message)s')
-    logger = _logging.getLogger(__name__)
+from ._logger_adapter import get_logger
+logger = get_logger(__name__)
 
+import time
 from typing import Any, Optional
 import requests
 
@@ -39,12 +34,12 @@ class SessionProxy:
     """
     Session代理类，自动获取最新的有效session
     
-    这个类实现了requests.Session的主要接口，但每次请求时都从SessionManager
-    获取最新的session对象，确保不会使用过期的session引用。
+    这个类实现了requests.Session的主要接口。解析出的session最多复用1秒，且每次复用前
+    都核对它仍是SessionManager当前持有的对象，确保不会使用已被替换的session引用。
     
     设计原理：
     - 不持有session对象的长期引用
-    - 每次请求时调用session_manager.get_session()获取最新session
+    - 缓存过期或session已被替换时调用session_manager.get_session()重新获取
     - SessionManager负责session的生命周期管理和线程安全
     
     性能考虑：
@@ -53,6 +48,8 @@ class SessionProxy:
     
     Attributes:
         _session_manager: SessionManager实例，用于获取最新session
+        _cached_session: 短期缓存的session引用（约1秒，且须与SessionManager当前session为同一对象）
+        _cached_until: 缓存失效的 monotonic 时间点
     """
     
     def __init__(self, session_manager):
@@ -63,13 +60,38 @@ class SessionProxy:
             session_manager: SessionManager实例，负责管理session生命周期
         """
         self._session_manager = session_manager
+        self._cached_session = None
+        self._cached_until = 0.0
         logger.debug("SessionProxy initialized")
     
+    def _current(self) -> requests.Session:
+        """
+        获取当前session，1秒内的连续调用复用同一个解析结果
+        
+        复用前核对SessionManager的当前session：force_refresh等替换了session
+        （例如收到401后重新登录）时立即失效，不会在缓存期内继续使用被撤销的session。
+        
+        Returns:
+            requests.Session: 有效的session对象
+        """
+        now = time.monotonic()
+        session = self._cached_session
+        if session is not None and now < self._cached_until and session is self._session_manager.session:
+            return session
+        session = self._session_manager.get_session()
+        self._cached_session = session
+        self._cached_until = now + 1.0
+        return session
+    
+    def _invalidate(self) -> None:
+        """请求出错时丢弃缓存，下次调用重新从SessionManager获取"""
+        self._cached_until = 0.0
+    
     def get(self, url: str, **kwargs) -> requests.Response:
         """
         发送GET请求，自动使用最新session
         
-        每次调用时从SessionManager获取最新的有效session，确保不会使用过期session。
+        从SessionManager获取最新的有效session（1秒内的连续调用共用同一引用）。
         
         Args:
             url: 请求URL
@@ -81,14 +103,18 @@ class SessionProxy:
         Raises:
             requests.RequestException: 请求失败时抛出
         """
-        session = self._session_manager.get_session()
-        return session.get(url, **kwargs)
+        session = self._current()
+        try:
+            return session.get(url, **kwargs)
+        except requests.RequestException:
+            self._invalidate()
+            raise
     
     def post(self, url: str, **kwargs) -> requests.Response:
         """
         发送POST请求，自动使用最新session
         
-        每次调用时从SessionManager获取最新的有效session，确保不会使用过期session。
+        从SessionManager获取最新的有效session（1秒内的连续调用共用同一引用）。
         
         Args:
             url: 请求URL
@@ -100,21 +126,40 @@ class SessionProxy:
         Raises:
             requests.RequestException: 请求失败时抛出
         """
-        session = self._session_manager.get_session()
-        return session.post(url, **kwargs)
+        session = self._current()
+        try:
+            return session.post(url, **kwargs)
+        except requests.RequestException:
+            self._invalidate()
+            raise
     
     @property
     def cookies(self):
         """
         获取当前session的cookies
         
-        返回当前有效session的cookies对象。注意：每次访问都会获取最新session的cookies。
+        返回当前有效session的cookies对象。cookie jar 随session存活且为同一引用，
+        短期缓存的session未变化时直接返回其cookies，无需再次调用get_session()。
         
         Returns:
             requests.cookies.RequestsCookieJar: 当前session的cookies
         """
-        session = self._session_manager.get_session()
-        return session.cookies
+        return self._current().cookies
+    
+    def __getattr__(self, name: str) -> Any:
+        """
+        其余属性（如 headers、auth、request 等）透明转发到当前有效session
+        
+        Args:
+            name: 属性名
+        
+        Returns:
+            Any: 当前session上对应的属性
+        """
+        # 私有属性不转发，避免初始化完成前访问 _session_manager 时无限递归
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._current(), name)
     
     def __repr__(self) -> str:
         """返回SessionProxy的字符串表示"""
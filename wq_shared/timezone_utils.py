@@ -4,9 +4,12 @@
 解决美国东部时间夏令时/冬令时转换问题
 """
 
-from datetime import datetime, timezone, timedelta
+import functools
+import re
+import time
+from datetime import date, datetime, timezone
 from zoneinfo import ZoneInfo
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 import logging
 
 __all__ = [
@@ -14,38 +17,34 @@ __all__ = [
     'get_eastern_offset_for_date', 'convert_eastern_to_utc',
     'get_utc_date_range_for_eastern_date', 'build_api_query_with_correct_timezone',
     'build_api_query_with_time_slice', 'get_file_date_from_utc_timestamp',
-    'convert_alpha_timestamps_to_utc', 'generate_time_slices_utc',
+    'convert_alpha_timestamps_to_utc', 'convert_alpha_timestamps_to_utc_batch',
+    'generate_time_slices_utc',
 ]
 
 logger = logging.getLogger(__name__)
 
 # 美国东部时区与UTC（使用标准库 zoneinfo/timezone）
 # 注意：在 Windows 上需要安装 tzdata 包：pip install tzdata
+# ZoneInfo 自带实例缓存，桥接模块统一经 wq_shared 导入后 tzdata 只解析一次
 EASTERN_TZ = ZoneInfo('America/New_York')
 UTC_TZ = timezone.utc
 
-def get_eastern_offset_for_date(dt: datetime) -> str:
+# Alpha数据中需要转换为UTC的时间字段
+_TIME_FIELDS = ('dateCreated', 'dateModified', 'dateSubmitted')
+
+@functools.lru_cache(maxsize=16384)
+def _offset_for_eastern_hour(year: int, month: int, day: int, hour: int, fold: int) -> str:
     """
-    获取指定日期的美国东部时区偏移量
+    计算东部本地时间某一小时的UTC偏移量字符串（结果缓存）
     
-    Args:
-        dt: 日期时间对象
-        
-    Returns:
-        str: 时区偏移量字符串，如 "-05:00" 或 "-04:00"
+    夏令时切换发生在整点（本地 02:00），同一小时内偏移量不变；
+    fold 用于区分冬令时回拨时重复出现的 01:00 时段。
     """
-    # 确保输入是naive datetime，则视为东部本地时间；否则转换到东部时区
-    if dt.tzinfo is None:
-        eastern_dt = dt.replace(tzinfo=EASTERN_TZ)
-    else:
-        eastern_dt = dt.astimezone(EASTERN_TZ)
-    
-    # 获取UTC偏移量
-    offset = eastern_dt.utcoffset()
+    offset = datetime(year, month, day, hour, fold=fold, tzinfo=EASTERN_TZ).utcoffset()
     
     # 检查offset是否为None
     if offset is None:
-        raise ValueError(f"无法获取 {eastern_dt} 的UTC偏移量")
+        raise ValueError(f"无法获取 {year:04d}-{month:02d}-{day:02d} {hour:02d}:00 的UTC偏移量")
     
     # 转换为字符串格式
     total_seconds = int(offset.total_seconds())
@@ -55,6 +54,37 @@ def get_eastern_offset_for_date(dt: datetime) -> str:
     sign = '-' if total_seconds < 0 else '+'
     return f"{sign}{hours:02d}:{minutes:02d}"
 
+def get_eastern_offset_for_date(dt: datetime) -> str:
+    """
+    获取指定日期的美国东部时区偏移量
+    
+    Args:
+        dt: 日期时间对象
+        
+    Returns:
+        str: 时区偏移量字符串，如 "-05:00" 或 "-04:00"
+    """
+    # 确保输入是naive datetime，则视为东部本地时间；否则转换到东部时区
+    eastern_dt = dt if dt.tzinfo is None else dt.astimezone(EASTERN_TZ)
+    
+    # 按东部本地时间的小时查缓存（偏移量一年只变化两次）
+    return _offset_for_eastern_hour(eastern_dt.year, eastern_dt.month, eastern_dt.day,
+                                    eastern_dt.hour, eastern_dt.fold)
+
+def _eastern_to_utc(dt_str: str, _ET=EASTERN_TZ, _UT=UTC_TZ) -> datetime:
+    """convert_eastern_to_utc 的内部实现，不记录日志（供已自行处理错误的批量转换使用）"""
+    # 解析带时区的时间字符串（fromisoformat 为 C 实现，常见的 "-04:00"/"-05:00"
+    # 形式直接得到固定偏移时区，比纯 Python 的正则拆分快约 5 倍）
+    dt = datetime.fromisoformat(dt_str)
+    
+    # 常见情况：自带偏移量，直接转换为UTC（已是UTC时原样返回）
+    tz = dt.tzinfo
+    if tz is not None:
+        return dt if tz is _UT else dt.astimezone(_UT)
+    
+    # 如果没有时区信息，假设为东部时间
+    return dt.replace(tzinfo=_ET).astimezone(_UT)
+
 def convert_eastern_to_utc(dt_str: str) -> datetime:
     """
     将美国东部时间字符串转换为UTC时间
@@ -66,27 +96,19 @@ def convert_eastern_to_utc(dt_str: str) -> datetime:
         datetime: UTC时间对象
     """
     try:
-        # 解析带时区的时间字符串
-        dt = datetime.fromisoformat(dt_str)
-        
-        # 转换为UTC
-        if dt.tzinfo is None:
-            # 如果没有时区信息，假设为东部时间
-            eastern_dt = dt.replace(tzinfo=EASTERN_TZ)
-            return eastern_dt.astimezone(UTC_TZ)
-        else:
-            return dt.astimezone(UTC_TZ)
-            
-    except Exception as e:
+        return _eastern_to_utc(dt_str)
+    except (ValueError, TypeError) as e:
         logger.error(f"时间转换失败: {dt_str}, 错误: {e}")
         raise
 
-def get_utc_date_range_for_eastern_date(date_str: str) -> Tuple[str, str]:
+@functools.lru_cache(maxsize=2048)
+def get_utc_date_range_for_eastern_date(date_str: str, *, _ET=EASTERN_TZ, _UT=UTC_TZ) -> Tuple[str, str]:
     """
     获取东部时间日期对应的UTC时间范围
     
     Args:
         date_str: 日期字符串，如 "2025-09-16" 或 "2025-09-16T00:00:00"
+        _ET, _UT: 内部使用，将时区绑定为局部变量（LOAD_FAST），调用方无需传入
         
     Returns:
         tuple: (UTC开始时间, UTC结束时间)
@@ -101,22 +123,24 @@ def get_utc_date_range_for_eastern_date(date_str: str) -> Tuple[str, str]:
             date_obj = datetime.strptime(date_str, "%Y-%m-%d")
         
         # 东部时间的一天开始和结束（使用 zoneinfo）
-        eastern_start = date_obj.replace(hour=0, minute=0, second=0, tzinfo=EASTERN_TZ)
-        eastern_end = date_obj.replace(hour=23, minute=59, second=59, tzinfo=EASTERN_TZ)
+        eastern_start = date_obj.replace(hour=0, minute=0, second=0, tzinfo=_ET)
+        eastern_end = date_obj.replace(hour=23, minute=59, second=59, tzinfo=_ET)
         
         # 转换为UTC
-        utc_start = eastern_start.astimezone(UTC_TZ)
-        utc_end = eastern_end.astimezone(UTC_TZ)
+        utc_start = eastern_start.astimezone(_UT)
+        utc_end = eastern_end.astimezone(_UT)
         
+        # isoformat 比 strftime 快，截掉 "+00:00" 后补毫秒
         return (
-            utc_start.strftime("%Y-%m-%dT%H:%M:%S.000"),
-            utc_end.strftime("%Y-%m-%dT%H:%M:%S.000")
+            utc_start.isoformat(timespec='seconds')[:19] + ".000",
+            utc_end.isoformat(timespec='seconds')[:19] + ".000"
         )
         
-    except Exception as e:
+    except (ValueError, TypeError) as e:
         logger.error(f"日期范围转换失败: {date_str}, 错误: {e}")
         raise
 
+@functools.lru_cache(maxsize=4096)
 def build_api_query_with_correct_timezone(start_date: str, end_date: str, alpha_type: str = "REGULAR") -> str:
     """
     构建带有正确时区的API查询URL
@@ -129,23 +153,19 @@ def build_api_query_with_correct_timezone(start_date: str, end_date: str, alpha_
     Returns:
         str: API查询URL的时间部分
     """
-    try:
-        # 获取UTC时间范围
-        utc_start, utc_end = get_utc_date_range_for_eastern_date(start_date)
-        
-        # 构建查询参数 - utc_start和utc_end已经包含毫秒精度
-        query_params = (
-            f"type={alpha_type}&"
-            f"dateCreated%3E={utc_start}Z&"
-            f"dateCreated%3C{utc_end}Z"
-        )
-        
-        return query_params
-        
-    except Exception as e:
-        logger.error(f"构建API查询失败: {start_date} to {end_date}, 错误: {e}")
-        raise
+    # 获取UTC时间范围
+    utc_start, utc_end = get_utc_date_range_for_eastern_date(start_date)
+    
+    # 构建查询参数 - utc_start和utc_end已经包含毫秒精度
+    query_params = (
+        f"type={alpha_type}&"
+        f"dateCreated%3E={utc_start}Z&"
+        f"dateCreated%3C{utc_end}Z"
+    )
+    
+    return query_params
 
+@functools.lru_cache(maxsize=4096)
 def build_api_query_with_time_slice(start_timestamp: str, end_timestamp: str, alpha_type: str = "REGULAR") -> str:
     """
     构建带有精确时间切片的API查询URL
@@ -158,23 +178,33 @@ def build_api_query_with_time_slice(start_timestamp: str, end_timestamp: str, al
     Returns:
         str: API查询URL的时间部分
     """
+    # 直接使用时间戳，去掉末尾的Z
+    start_clean = start_timestamp.rstrip('Z')
+    end_clean = end_timestamp.rstrip('Z')
+    
+    # 构建查询参数
+    query_params = (
+        f"type={alpha_type}&"
+        f"dateCreated%3E={start_clean}Z&"
+        f"dateCreated%3C{end_clean}Z"
+    )
+    
+    return query_params
+
+# 已是UTC的时间戳："YYYY-MM-DD"，可带时间部分，可以 Z 结尾，不带偏移量
+_UTC_DATE_PREFIX_RE = re.compile(
+    r'\d{4}-\d{2}-\d{2}'
+    r'(?:[T ](?:[01]\d|2[0-3]):[0-5]\d(?::[0-5]\d(?:\.\d{1,6})?)?)?Z?'
+)
+
+@functools.lru_cache(maxsize=4096)
+def _is_valid_date(date_str: str) -> bool:
+    """判断 "YYYY-MM-DD" 是否为合法日期（结果缓存，同一天的时间戳只校验一次）"""
     try:
-        # 直接使用时间戳，去掉末尾的Z
-        start_clean = start_timestamp.rstrip('Z')
-        end_clean = end_timestamp.rstrip('Z')
-        
-        # 构建查询参数
-        query_params = (
-            f"type={alpha_type}&"
-            f"dateCreated%3E={start_clean}Z&"
-            f"dateCreated%3C{end_clean}Z"
-        )
-        
-        return query_params
-        
-    except Exception as e:
-        logger.error(f"构建时间切片API查询失败: {start_timestamp} to {end_timestamp}, 错误: {e}")
-        raise
+        date.fromisoformat(date_str)
+    except ValueError:
+        return False
+    return True
 
 def get_file_date_from_utc_timestamp(utc_timestamp: str) -> str:
     """
@@ -186,21 +216,26 @@ def get_file_date_from_utc_timestamp(utc_timestamp: str) -> str:
     Returns:
         str: 文件日期 "YYYY-MM-DD"（UTC）
     """
+    # 快速路径：整串校验为已是UTC的合法时间戳时，日期就是前10个字符；
+    # 其余格式（含非法输入）交给 fromisoformat 解析或报错
+    if (isinstance(utc_timestamp, str) and _UTC_DATE_PREFIX_RE.fullmatch(utc_timestamp)
+            and _is_valid_date(utc_timestamp[:10])):
+        return utc_timestamp[:10]
+    
     try:
-        # 解析UTC时间
+        # 解析UTC时间（带非零偏移量等需要真正换算时区的情况）
         if utc_timestamp.endswith('Z'):
-            utc_dt = datetime.fromisoformat(utc_timestamp[:-1]).replace(tzinfo=UTC_TZ)
+            utc_dt = datetime.fromisoformat(utc_timestamp[:-1])
         else:
             utc_dt = datetime.fromisoformat(utc_timestamp)
-            if utc_dt.tzinfo is None:
-                utc_dt = utc_dt.replace(tzinfo=UTC_TZ)
-            else:
+            # 无时区或偏移量为0时已是UTC，无需 astimezone
+            if utc_dt.tzinfo is not None and utc_dt.utcoffset():
                 utc_dt = utc_dt.astimezone(UTC_TZ)
         
         # 返回UTC日期
-        return utc_dt.strftime("%Y-%m-%d")
+        return utc_dt.date().isoformat()
         
-    except Exception as e:
+    except (ValueError, TypeError) as e:
         logger.error(f"时间戳转换失败: {utc_timestamp}, 错误: {e}")
         raise
 
@@ -212,23 +247,66 @@ def convert_alpha_timestamps_to_utc(alpha_data: dict) -> dict:
         alpha_data: Alpha数据字典
         
     Returns:
-        dict: 转换后的Alpha数据
+        dict: 转换后的Alpha数据（没有字段发生变化时直接返回原字典，不做复制）
     """
-    alpha_copy = alpha_data.copy()
+    updates = {}
     
-    # 需要转换的时间字段
-    time_fields = ['dateCreated', 'dateModified', 'dateSubmitted']
-    
-    for field in time_fields:
-        if field in alpha_copy and alpha_copy[field]:
+    for field in _TIME_FIELDS:
+        value = alpha_data.get(field)
+        if value:
             try:
                 # 转换为UTC时间
-                utc_dt = convert_eastern_to_utc(alpha_copy[field])
-                alpha_copy[field] = utc_dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-            except Exception as e:
-                logger.warning(f"转换字段 {field} 失败: {alpha_copy[field]}, 错误: {e}")
+                utc_value = _eastern_to_utc(value).isoformat(timespec='seconds')[:19] + ".000Z"
+                if utc_value != value:
+                    updates[field] = utc_value
+            except (ValueError, TypeError) as e:
+                logger.warning(f"转换字段 {field} 失败: {value}, 错误: {e}")
     
-    return alpha_copy
+    return {**alpha_data, **updates} if updates else alpha_data
+
+def convert_alpha_timestamps_to_utc_batch(alphas: List[dict], copy: bool = True) -> List[dict]:
+    """
+    批量将Alpha数据中的时间戳转换为UTC格式
+    
+    与逐条调用 convert_alpha_timestamps_to_utc 结果一致，但把转换函数和字段元组
+    绑定为局部变量，在紧凑循环中处理整批数据。
+    
+    Args:
+        alphas: Alpha数据字典列表
+        copy: True 时仅对有字段变化的Alpha复制后修改（不改动输入）；False 时原地修改
+        
+    Returns:
+        list: 转换后的Alpha数据列表
+    """
+    _conv = _eastern_to_utc
+    _fields = _TIME_FIELDS
+    _warn = logger.warning
+    results = []
+    append = results.append
+    
+    for alpha in alphas:
+        out = alpha
+        for field in _fields:
+            value = alpha.get(field)
+            if not value:
+                continue
+            try:
+                utc_value = _conv(value).isoformat(timespec='seconds')[:19] + ".000Z"
+            except (ValueError, TypeError) as e:
+                _warn(f"转换字段 {field} 失败: {value}, 错误: {e}")
+                continue
+            if utc_value != value:
+                if copy and out is alpha:
+                    out = alpha.copy()
+                out[field] = utc_value
+        append(out)
+    
+    return results
+
+@functools.lru_cache(maxsize=4096)
+def _format_utc_epoch(ts: int) -> str:
+    """将UTC整数秒时间戳格式化为 "YYYY-MM-DDTHH:MM:SS.000Z"（相邻切片共享边界，结果缓存）"""
+    return time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(ts))
 
 def generate_time_slices_utc(start_date_str: str, end_date_str: str, interval_hours: float = 2) -> list:
     """
@@ -264,23 +342,18 @@ def generate_time_slices_utc(start_date_str: str, end_date_str: str, interval_ho
                 d = datetime.strptime(s, "%Y-%m-%d")
                 return d.replace(tzinfo=UTC_TZ)
 
-        start_dt = _parse_utc(start_date_str)
-        end_dt = _parse_utc(end_date_str)
-
-        slices = []
-        current_start = start_dt
-        interval = timedelta(hours=int(interval_hours))
-
-        while current_start < end_dt:
-            current_end = min(current_start + interval, end_dt)
-            slices.append((
-                current_start.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
-                current_end.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-            ))
-            current_start = current_end
+        # 转为整数秒后用 range 生成边界，避免循环中反复构造 datetime
+        start_epoch = int(_parse_utc(start_date_str).timestamp())
+        end_epoch = int(_parse_utc(end_date_str).timestamp())
+        step = int(interval_hours * 3600)
+        if step <= 0:
+            raise ValueError(f"时间间隔必须大于0: {interval_hours}")
 
-        return slices
-    except Exception as e:
+        return [
+            (_format_utc_epoch(s), _format_utc_epoch(min(s + step, end_epoch)))
+            for s in range(start_epoch, end_epoch, step)
+        ]
+    except (ValueError, TypeError) as e:
         logger.error(f"生成UTC时间切片失败: {e}")
         raise
 
@@ -1,11 +1,13 @@
 # Canonical wq_logger.py (project-wide)
+import functools
 import logging
+import logging.handlers
+import threading
 import time
 import os
 import sys
 import tempfile
 import re
-from datetime import datetime, timezone
 from typing import Tuple, Optional
 
 __all__ = [
@@ -17,6 +19,10 @@ __all__ = [
 # 默认子目录，可通过环境变量覆盖
 DEFAULT_SUBDIR = os.environ.get("WQ_DEFAULT_SUBDIR", "simulate")
 
+# 默认日志级别，可通过环境变量 WQ_LOG_LEVEL 覆盖（导入时解析一次）
+_ENV_LEVEL = os.environ.get("WQ_LOG_LEVEL")
+_DEFAULT_LEVEL = getattr(logging, _ENV_LEVEL.upper(), logging.INFO) if _ENV_LEVEL else logging.INFO
+
 # 项目根目录（wq_shared 的父目录）
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -24,6 +30,8 @@ _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 WQ_DRIVE = os.environ.get("WQ_DRIVE", _PROJECT_ROOT)
 WQ_LOGS_ROOT = os.environ.get("WQ_LOGS_ROOT", os.path.join(_PROJECT_ROOT, "WorldQuant", "Logs"))
 
+_WINDOWS = os.name == 'nt'
+
 # 统一日志格式（UTC + Z）
 # 说明：通过设置 logging.Formatter.converter = time.gmtime 强制使用UTC；
 # DATE_FORMAT 包含 'Z' 以明确时区。
@@ -33,16 +41,65 @@ DATE_FORMAT = '%Y-%m-%d %H:%M:%SZ'
 # 强制所有 Formatter 使用 UTC 时间
 logging.Formatter.converter = time.gmtime
 
+# 文件日志缓冲：最多积攒 256 条或 1 秒写一次，ERROR 及以上立即写出
+_BUFFER_CAPACITY = 256
+_FLUSH_INTERVAL = 1.0
+_buffered_handler: Optional[logging.handlers.MemoryHandler] = None
+_flush_thread: Optional[threading.Thread] = None
+
+# 已配置的根日志：(userkey, subdir, filename_prefix, level) -> (memory_handler, file_handler, log_file_path)
+# 相同参数重复初始化时直接复用，不再拆除处理器、重新打开新的日志文件
+_LOGGER_REGISTRY: dict = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _periodic_flush() -> None:
+    """后台守护线程：定期刷新当前的文件日志缓冲，保证日志延迟不超过 _FLUSH_INTERVAL"""
+    while True:
+        time.sleep(_FLUSH_INTERVAL)
+        handler = _buffered_handler
+        if handler is not None:
+            handler.flush()
+
+
+def _ensure_flush_thread() -> None:
+    global _flush_thread
+    if _flush_thread is None:
+        _flush_thread = threading.Thread(target=_periodic_flush, name="wq_logger_flush", daemon=True)
+        _flush_thread.start()
+
+
+def _register_exit_flush(handler: logging.handlers.MemoryHandler) -> None:
+    """multiprocessing 子进程以 os._exit 结束、不执行 logging.shutdown，借助其退出清理写出剩余缓冲"""
+    from multiprocessing import util as mp_util
+    mp_util.Finalize(handler, handler.flush, exitpriority=0)
+
+
+def _reset_after_fork() -> None:
+    """fork 出的子进程没有刷新线程：重新启动，并丢弃继承来的缓冲（这些记录由父进程写出）"""
+    global _flush_thread
+    _flush_thread = None
+    handler = _buffered_handler
+    if handler is not None:
+        handler.buffer.clear()
+        _ensure_flush_thread()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
 
+# Parent directory references, path separators and other problematic characters, replaced in a single pass
+_SANITIZE_RE = re.compile(r'\.\.|[<>:"|?*\x00-\x1f\\/]')
+
+
+@functools.lru_cache(maxsize=256)
 def _sanitize_path_component(component: str) -> str:
     """
     清理路径组件，防止路径遍历攻击和非法字符
     """
-    # Remove any path separators and parent directory references
-    component = component.replace('\\', '_').replace('/', '_')
-    component = component.replace('..', '_')
-    # Remove other potentially problematic characters
-    component = re.sub(r'[<>:"|?*\x00-\x1f]', '_', component)
+    # Replace parent directory references and separators/illegal characters in one pass
+    component = _SANITIZE_RE.sub('_', component)
     # Ensure not empty
     return component.strip() or 'default'
 
@@ -55,7 +112,14 @@ def _determine_log_dir(userkey: str, subdir: Optional[str]) -> str:
     3. 系统备用路径 (Windows: C:\WorldQuant\Logs, Unix: ~/WorldQuant/Logs)
     4. 当前目录备用路径
     5. 系统临时目录 (最后备用)
+
+    结果按 (WQ_LOG_DIR, userkey, subdir) 缓存，同一进程内重复初始化不再探测/创建目录。
     """
+    return _resolve_log_dir(os.environ.get("WQ_LOG_DIR"), userkey, subdir)
+
+
+@functools.lru_cache(maxsize=32)
+def _resolve_log_dir(env_dir: Optional[str], userkey: str, subdir: Optional[str]) -> str:
     # Sanitize inputs to prevent path traversal
     safe_userkey = _sanitize_path_component(userkey)
     chosen_subdir = _sanitize_path_component(subdir or DEFAULT_SUBDIR)
@@ -64,7 +128,6 @@ def _determine_log_dir(userkey: str, subdir: Optional[str]) -> str:
     temp_logger = logging.getLogger('wq_logger_init')
     
     # 环境变量完全覆盖
-    env_dir = os.environ.get("WQ_LOG_DIR")
     if env_dir:
         try:
             os.makedirs(env_dir, exist_ok=True)
@@ -81,7 +144,7 @@ def _determine_log_dir(userkey: str, subdir: Optional[str]) -> str:
         temp_logger.warning(f"Cannot create primary log directory {primary_path}: {e}")
     
     # 系统备用路径 (Windows: C:\WorldQuant\Logs, Unix: ~/WorldQuant/Logs)
-    if os.name == 'nt':  # Windows
+    if _WINDOWS:
         backup_root = r"C:\WorldQuant\Logs"
     else:  # Unix-like (Linux, macOS)
         backup_root = os.path.expanduser("~/WorldQuant/Logs")
@@ -120,12 +183,34 @@ def setup_root_logging(
     filename_prefix: str = "run_log",
     level: int = logging.INFO,
 ) -> Tuple[logging.Logger, str]:
+    key = (userkey, subdir or DEFAULT_SUBDIR, filename_prefix, level)
+    root_logger = logging.getLogger()
+    with _REGISTRY_LOCK:
+        entry = _LOGGER_REGISTRY.get(key)
+        if entry is not None:
+            memory_handler, file_handler, log_file_path = entry
+            # Reuse only while our handlers are still installed and not closed
+            # (the file itself opens lazily, so its stream may still be None)
+            if memory_handler in root_logger.handlers and memory_handler.target is file_handler:
+                return root_logger, log_file_path
+        root_logger, log_file_path, memory_handler, file_handler = _configure_root_logging(
+            userkey, subdir, filename_prefix, level
+        )
+        _LOGGER_REGISTRY[key] = (memory_handler, file_handler, log_file_path)
+        return root_logger, log_file_path
+
+
+def _configure_root_logging(
+    userkey: str,
+    subdir: Optional[str],
+    filename_prefix: str,
+    level: int,
+) -> Tuple[logging.Logger, str, logging.handlers.MemoryHandler, logging.FileHandler]:
     # _determine_log_dir already creates the directory
     log_dir = _determine_log_dir(userkey, subdir)
 
-    # 使用UTC时间生成日志文件名，并在秒级末尾加 'Z'
-    # 使用时区感知的UTC时间，避免 utcnow() 的弃用警告
-    timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%SZ")
+    # 使用UTC时间生成日志文件名，并在秒级末尾加 'Z'（与 Formatter.converter = time.gmtime 一致）
+    timestamp = time.strftime("%Y%m%d_%H%M%SZ", time.gmtime())
     log_filename = f"{filename_prefix}_{timestamp}.log"
     log_file_path = os.path.join(log_dir, log_filename)
 
@@ -133,49 +218,43 @@ def setup_root_logging(
 
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
-    # Clear existing handlers to avoid duplicates
+    # Clear existing handlers to avoid duplicates (flush first so buffered records are not lost)
     for h in list(root_logger.handlers):
+        h.flush()
         root_logger.removeHandler(h)
 
-    # Create file handler with immediate write (unbuffered mode for real-time logging)
-    file_handler = logging.FileHandler(log_file_path, encoding='utf-8', mode='a', delay=False)
+    # Standard file handler: records reach the OS page cache (enough for tailing);
+    # no per-record fsync. logging.shutdown() flushes and closes it at exit.
+    # delay=True: the file is only created when the first record is written.
+    file_handler = logging.FileHandler(log_file_path, encoding='utf-8', mode='a', delay=True)
     file_handler.setLevel(level)
     file_handler.setFormatter(formatter)
-    
-    # Force unbuffered writes for real-time logging
-    # Override emit to flush after every log message
-    original_emit = file_handler.emit
-    def emit_with_flush(record):
-        original_emit(record)
-        if file_handler.stream:
-            try:
-                file_handler.stream.flush()
-                os.fsync(file_handler.stream.fileno())  # Ensure OS writes to disk
-            except (OSError, AttributeError):
-                pass  # Handle closed streams gracefully
-    file_handler.emit = emit_with_flush
-    
-    root_logger.addHandler(file_handler)
 
-    # Console handler with auto-flush
+    # Batch file writes: INFO records coalesce, ERROR flushes immediately,
+    # and a daemon thread flushes at least once per second
+    global _buffered_handler
+    memory_handler = logging.handlers.MemoryHandler(
+        capacity=_BUFFER_CAPACITY,
+        flushLevel=logging.ERROR,
+        target=file_handler,
+        flushOnClose=True,
+    )
+    memory_handler.setLevel(level)
+    root_logger.addHandler(memory_handler)
+    _buffered_handler = memory_handler
+    _ensure_flush_thread()
+    # multiprocessing 会在 fork 出的子进程启动时清空继承的退出清理表，因此在子进程中重新登记
+    _register_exit_flush(memory_handler)
+    from multiprocessing import util as mp_util
+    mp_util.register_after_fork(memory_handler, _register_exit_flush)
+
+    # Console handler (StreamHandler.emit already flushes after every record)
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    
-    # Console also gets immediate flush
-    original_console_emit = console_handler.emit
-    def console_emit_with_flush(record):
-        original_console_emit(record)
-        if console_handler.stream:
-            try:
-                console_handler.stream.flush()
-            except (OSError, AttributeError):
-                pass
-    console_handler.emit = console_emit_with_flush
-    
     root_logger.addHandler(console_handler)
 
-    return root_logger, log_file_path
+    return root_logger, log_file_path, memory_handler, file_handler
 
 
 class WQLogger:
@@ -186,10 +265,11 @@ class WQLogger:
         self.log_file_path: Optional[str] = None
         self.logger: Optional[logging.Logger] = None
         # default levels policy: INFO for normal run; override via env
-        env_level = os.environ.get("WQ_LOG_LEVEL")
-        self.default_level = getattr(logging, env_level.upper(), logging.INFO) if env_level else logging.INFO
+        self.default_level = _DEFAULT_LEVEL
 
     def setup_logging(self) -> logging.Logger:
+        if self.logger is not None:
+            return self.logger
         logger, path = setup_root_logging(self.userkey, self.subdir, self.filename_prefix, self.default_level)
         self.logger = logger
         self.log_file_path = path
@@ -203,13 +283,6 @@ class WQLogger:
     def get_log_file_path(self) -> Optional[str]:
         return self.log_file_path
     
-    def _flush_handlers(self):
-        """强制刷新所有日志处理器"""
-        if self.logger:
-            for handler in self.logger.handlers:
-                if hasattr(handler, 'flush'):
-                    handler.flush()
-
     def _ensure_logger(self) -> logging.Logger:
         """确保logger已初始化并返回"""
         if self.logger is None:
@@ -217,39 +290,38 @@ class WQLogger:
         return self.logger  # type: ignore
 
     def info(self, message):
-        """带自动刷新的info日志"""
-        logger = self._ensure_logger()
-        logger.info(message)
-        self._flush_handlers()
+        """info日志（文件输出由缓冲处理器批量写入）"""
+        self._ensure_logger().info(message)
 
     def warning(self, message):
-        """带自动刷新的warning日志"""
-        logger = self._ensure_logger()
-        logger.warning(message)
-        self._flush_handlers()
+        """warning日志（文件输出由缓冲处理器批量写入）"""
+        self._ensure_logger().warning(message)
 
     def error(self, message):
-        """带自动刷新的error日志"""
-        logger = self._ensure_logger()
-        logger.error(message)
-        self._flush_handlers()
+        """error日志（文件输出由缓冲处理器批量写入）"""
+        self._ensure_logger().error(message)
 
     def log_program_start(self, params_dict=None):
+        # Build the banner once and emit it as a single record
         logger = self.get_logger()
-        logger.info("=" * 50)
-        logger.info("程序开始执行")
-        logger.info(f"用户键: {self.userkey}")
-        logger.info(f"日志文件: {self.log_file_path}")
-        for key, value in (params_dict or {}).items():
-            logger.info(f"参数 {key}: {value}")
-        logger.info("=" * 50)
+        lines = [
+            "=" * 50,
+            "程序开始执行",
+            f"用户键: {self.userkey}",
+            f"日志文件: {self.log_file_path}",
+        ]
+        lines.extend(f"参数 {key}: {value}" for key, value in (params_dict or {}).items())
+        lines.append("=" * 50)
+        logger.info("\n".join(lines))
 
     def log_program_end(self):
         logger = self.get_logger()
-        logger.info("=" * 50)
-        logger.info("程序执行结束")
-        logger.info(f"完整日志已保存到: {self.log_file_path}")
-        logger.info("=" * 50)
+        logger.info("\n".join([
+            "=" * 50,
+            "程序执行结束",
+            f"完整日志已保存到: {self.log_file_path}",
+            "=" * 50,
+        ]))
 
 
 def init_logger(userkey: str, subdir: Optional[str] = None) -> Tuple[logging.Logger, WQLogger]:
@@ -280,31 +352,15 @@ def get_logger(name: Optional[str] = None, level: Optional[int] = None) -> loggi
     - Returning a named logger allows per-module names while sharing root handlers.
     """
     # resolve level (env override wins when no explicit level supplied)
-    env_level = os.environ.get("WQ_LOG_LEVEL")
-    resolved_level = (
-        level
-        if level is not None
-        else (getattr(logging, env_level.upper(), logging.INFO) if env_level else logging.INFO)
-    )
+    resolved_level = level if level is not None else _DEFAULT_LEVEL
 
     root_logger = logging.getLogger()
     if not root_logger.handlers:
         # lazy minimal setup to avoid per-module duplicate handlers
+        # (StreamHandler.emit already flushes after every record)
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(resolved_level)
         console_handler.setFormatter(logging.Formatter(LOG_FORMAT, DATE_FORMAT))
-        
-        # Add auto-flush for real-time console output
-        original_emit = console_handler.emit
-        def emit_with_flush(record):
-            original_emit(record)
-            if console_handler.stream:
-                try:
-                    console_handler.stream.flush()
-                except (OSError, AttributeError):
-                    pass
-        console_handler.emit = emit_with_flush
-        
         root_logger.setLevel(resolved_level)
         root_logger.addHandler(console_handler)
 
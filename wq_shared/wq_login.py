@@ -2,11 +2,28 @@ import os
 import json
 import time
 import getpass
+import random
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 from urllib.parse import urljoin, urlparse
 from typing import Optional
 
+# 可选：orjson 加速 Cookie/凭证文件的读写（未安装时使用标准库 json）
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    _json_loads = orjson.loads
+    _json_dumps_bytes = orjson.dumps
+else:
+    _json_loads = json.loads
+
+    def _json_dumps_bytes(obj) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
 __all__ = [
     'WQ_DRIVE', 'WQ_LOGS_ROOT', 'WQ_DATA_ROOT', 
     'BRAIN_API_URL', 'brain_api_url', 'USER_KEY',
@@ -45,6 +62,10 @@ except ImportError:
 # API配置
 BRAIN_API_URL = os.environ.get("brain_api_url", "https://api.worldquantbrain.com")
 brain_api_url = BRAIN_API_URL
+AUTH_URL = f"{BRAIN_API_URL}/authentication"
+
+# 认证检查超时：(连接, 读取)。连接失败快速返回，尽早进入重试
+AUTH_CHECK_TIMEOUT = (3.05, 15)
 
 # 用户配置
 USER_KEY = 'test'
@@ -52,10 +73,51 @@ USER_KEY = 'test'
 # 默认会话最小剩余时间（秒）
 MIN_REMAINING_SECONDS = 600
 
-COOKIES_FOLDER_PATH = os.path.join(os.path.expanduser("~"), "secrets", "wq_cookies")
-os.makedirs(COOKIES_FOLDER_PATH, exist_ok=True)
+# 会话连接池大小：多个切片/分页线程共享同一会话，requests 默认的 10 个连接不够，
+# 超出的连接会在请求结束后被丢弃，下次请求重新做 TLS 握手
+HTTP_POOL_CONNECTIONS = 32
+HTTP_POOL_MAXSIZE = 64
+
+# 凭证与 Cookie 路径在导入时计算一次
+_SECRETS_DIR = os.path.join(os.path.expanduser("~"), "secrets")
+_CREDENTIALS_FILE = os.path.join(_SECRETS_DIR, f"{USER_KEY}_platform-brain.json")
+
+COOKIES_FOLDER_PATH = os.path.join(_SECRETS_DIR, "wq_cookies")
 COOKIE_FILE_PATH = os.path.join(COOKIES_FOLDER_PATH, f"{USER_KEY}_session_cookie.json")
 
+# 已解析的 Cookie 缓存：(文件路径, st_mtime_ns, (cookies, expiry_at))，文件未变化时不再重复读取
+_cookie_cache: Optional[tuple] = None
+
+# Cookie 目录在首次写入前才创建，只读缓存 Cookie 或清除凭证时不产生额外的 mkdir
+_cookie_dir_ready = False
+
+def _ensure_cookie_dir():
+    """确保 Cookie 目录存在（每个进程只创建一次）。"""
+    global _cookie_dir_ready
+    if not _cookie_dir_ready:
+        os.makedirs(COOKIES_FOLDER_PATH, exist_ok=True)
+        _cookie_dir_ready = True
+
+# 进程内共享的连接池适配器：重新登录得到的新会话沿用已建立的 TLS 连接，
+# Cookie 仍由各自的 Session 保存，适配器本身不携带会话状态
+_shared_adapter: Optional[HTTPAdapter] = None
+
+def _get_shared_adapter() -> HTTPAdapter:
+    """懒加载进程级共享的 HTTPAdapter（重试由调用方自行处理）。"""
+    global _shared_adapter
+    if _shared_adapter is None:
+        _shared_adapter = HTTPAdapter(pool_connections=HTTP_POOL_CONNECTIONS,
+                                      pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+    return _shared_adapter
+
+def _new_session() -> requests.Session:
+    """创建挂载共享大容量连接池的 requests 会话。"""
+    s = requests.Session()
+    adapter = _get_shared_adapter()
+    s.mount('https://', adapter)
+    s.mount('http://', adapter)
+    return s
+
 def get_credentials():
     """
     获取平台凭证（优先环境变量，其次本地文件，否则交互输入）。
@@ -63,17 +125,16 @@ def get_credentials():
     credential_email = os.environ.get('BRAIN_CREDENTIAL_EMAIL')
     credential_password = os.environ.get('BRAIN_CREDENTIAL_PASSWORD')
 
-    credentials_folder_path = os.path.join(os.path.expanduser("~"), "secrets")
-    credentials_file_path = os.path.join(credentials_folder_path, f"{USER_KEY}_platform-brain.json")
+    # 一次 stat 同时判断文件是否存在及是否为空
+    try:
+        has_file = os.stat(_CREDENTIALS_FILE).st_size > 2
+    except OSError:
+        has_file = False
 
-    if (
-        Path(credentials_file_path).exists()
-        and os.path.getsize(credentials_file_path) > 2
-    ):
-        with open(credentials_file_path) as file:
-            data = json.loads(file.read())
+    if has_file:
+        with open(_CREDENTIALS_FILE, 'rb') as file:
+            data = _json_loads(file.read())
     else:
-        os.makedirs(credentials_folder_path, exist_ok=True)
         if credential_email and credential_password:
             email = credential_email
             password = credential_password
@@ -81,71 +142,107 @@ def get_credentials():
             email = input("Email:\n")
             password = getpass.getpass(prompt="Password:")
         data = {"email": email, "password": password}
-        with open(credentials_file_path, "w") as file:
-            json.dump(data, file)
+        os.makedirs(_SECRETS_DIR, exist_ok=True)
+        with open(_CREDENTIALS_FILE, "wb") as file:
+            file.write(_json_dumps_bytes(data))
     return (data["email"], data["password"])
 
 # --- wq_login.py ---
 # 请用这个新版本替换旧的 check_session_validity 函数
 
-def check_session_validity(s: requests.Session, min_remaining_seconds: int = 60) -> bool:
-    """
-    检查当前会话是否有效。
-    - 增加重试逻辑来处理网络抖动 (如 SSLError)。
-    - 只有在多次网络尝试失败，或明确收到401/过期响应时，才认为会话无效。
-    - 当剩余有效期大于 min_remaining_seconds 时，才视为"满足需求的有效会话"。
+def _probe_session(s: requests.Session, max_retries: int = 5) -> Optional[float]:
     """
-    logger.info("正在检查已缓存会话的有效性...")
-    authentication_url = f"{brain_api_url}/authentication"
+    请求 /authentication 获取会话剩余秒数（check_session_validity 与 check_session_timeout 共用）。
+    - 增加重试逻辑来处理网络抖动 (如 SSLError)，max_retries=1 时只尝试一次、不等待。
+    - 明确收到 401、其他HTTP/解析错误或多次网络尝试均失败时返回 None。
     
-    max_retries = 5  # 最多重试5次
-    base_delay = 5  # 线性退避：5/10/15/20/25 秒
+    Returns:
+        float: 会话剩余秒数（已过期时为 0）；无法确认时返回 None
+    """
+    base_delay = 5  # 指数退避：5/10/20/30 秒（上限30秒），并加 ±50% 随机抖动，避免多个进程同时重试
 
     for attempt in range(max_retries):
         try:
-            response = s.get(authentication_url, timeout=15)  # 增加超时时间
+            response = s.get(AUTH_URL, timeout=AUTH_CHECK_TIMEOUT)
 
             # 如果收到 401 Unauthorized，说明 cookie 确定无疑无效的
             if response.status_code == 401:
                 logger.warning("会话明确无效 (收到 401 Unauthorized)。")
-                return False
+                return None
 
             response.raise_for_status()  # 检查其他HTTP错误 (如 500, 502)
             
-            expiry_seconds = response.json().get("token", {}).get("expiry", 0)
-            if expiry_seconds and expiry_seconds > min_remaining_seconds:
-                logger.info(f"会话有效，剩余时间: {int(expiry_seconds)} 秒。")
-                return True
-            else:
-                logger.info("会话已过期或即将过期。")
-                return False
+            return float(response.json().get("token", {}).get("expiry") or 0)
         
-        # --- 这是关键的修改 ---
         # 只捕获网络连接相关的异常进行重试
         except requests.exceptions.ConnectionError as e:
             logger.warning(f"检查会话时发生网络错误 (第 {attempt + 1}/{max_retries} 次): {e}")
             if attempt < max_retries - 1:
-                time.sleep(base_delay * (attempt + 1))
+                time.sleep(min(30, base_delay * (2 ** attempt)) * (0.5 + random.random()))
             continue  # 继续下一次重试
 
         # 捕获其他类型的异常（如超时、JSON解析错误），这些不应该重试
-        except (requests.exceptions.RequestException, KeyError, json.JSONDecodeError) as e:
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
             logger.warning(f"检查会话时发生决定性错误: {e}")
-            return False  # 遇到这些错误直接判定为失败
+            return None  # 遇到这些错误直接判定为失败
 
-    # 如果五次尝试后仍因网络问题无法验证，最终放弃
+    # 如果多次尝试后仍因网络问题无法验证，最终放弃
     logger.warning("因持续的网络错误，无法验证会话有效性。")
+    return None
+
+
+def check_session_validity(s: requests.Session, min_remaining_seconds: int = 60) -> bool:
+    """
+    检查当前会话是否有效。
+    - 只有在多次网络尝试失败，或明确收到401/过期响应时，才认为会话无效。
+    - 当剩余有效期大于 min_remaining_seconds 时，才视为"满足需求的有效会话"。
+    """
+    logger.info("正在检查已缓存会话的有效性...")
+    expiry_seconds = _probe_session(s)
+    if expiry_seconds is None:
+        return False
+    if expiry_seconds > min_remaining_seconds:
+        logger.info(f"会话有效，剩余时间: {int(expiry_seconds)} 秒。")
+        return True
+    logger.info("会话已过期或即将过期。")
     return False
 
 
-def save_cookie_to_file(s: requests.Session):
-    """保存requests会话中的cookie到文件。"""
+def _expiry_from_response(response) -> Optional[float]:
+    """从认证接口的响应中取出会话剩余秒数，取不到时返回 None。"""
     try:
-        with open(COOKIE_FILE_PATH, 'w') as f:
-            json.dump(s.cookies.get_dict(), f)
+        expiry = response.json().get("token", {}).get("expiry")
+    except (ValueError, AttributeError):
+        return None
+    return float(expiry) if expiry else None
+
+
+def save_cookie_to_file(s: requests.Session, expiry_seconds: Optional[float] = None):
+    """
+    保存requests会话中的cookie到文件（先写临时文件再原子替换，读取方不会看到写了一半的文件）。
+    
+    已知会话剩余时间时一并记录绝对过期时间 expiry_at，start_session 可据此跳过对明显过期会话的在线检查。
+    """
+    payload = {"cookies": s.cookies.get_dict()}
+    if expiry_seconds:
+        payload["expiry_at"] = time.time() + expiry_seconds
+    data = _json_dumps_bytes(payload)
+    # 临时文件名带进程号，避免多个进程同时保存时互相覆盖
+    tmp_path = f"{COOKIE_FILE_PATH}.{os.getpid()}.tmp"
+    try:
+        _ensure_cookie_dir()
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, COOKIE_FILE_PATH)
         logger.info(f"会话 Cookie 已成功保存至 {COOKIE_FILE_PATH}")
-    except IOError as e:
+    except OSError as e:
         logger.warning(f"无法保存 Cookie 文件: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
 
 
 def perform_full_login_with_retry_limit(max_credential_retries: int = 2) -> requests.Session:
@@ -159,20 +256,20 @@ def perform_full_login_with_retry_limit(max_credential_retries: int = 2) -> requ
         raise Exception("凭据错误次数过多，请检查您的邮箱和密码后重新运行程序。")
     
     logger.info(f"需要执行完整登录流程... (剩余凭据重试次数: {max_credential_retries})")
-    s = requests.Session()
+    s = _new_session()
     s.auth = get_credentials()
 
     max_retries = 5
-    initial_backoff = 5  # 初始等待5秒
+    initial_backoff = 5  # 初始等待5秒，指数增长（上限60秒）并加随机抖动
 
     for attempt in range(max_retries):
         try:
             logger.info(f"正在尝试登录 (第 {attempt + 1}/{max_retries} 次)...")
-            response = s.post(f'{brain_api_url}/authentication', timeout=30)
+            response = s.post(AUTH_URL, timeout=30)
             
             if response.status_code == 201:
                 logger.info("登录成功！")
-                save_cookie_to_file(s)
+                save_cookie_to_file(s, _expiry_from_response(response))
                 return s
 
             elif response.status_code == 401:
@@ -190,16 +287,17 @@ def perform_full_login_with_retry_limit(max_credential_retries: int = 2) -> requ
                         confirm_response = s.post(persona_url)
                         if confirm_response.status_code == 201:
                             logger.info("生物识别验证成功！")
-                            save_cookie_to_file(s)
+                            save_cookie_to_file(s, _expiry_from_response(confirm_response))
                             return s
                         else:
                             input("验证尚未完成或已失败。请确保您已在浏览器中确认，然后按 Enter 键重试。\n")
                 else:
                     print("\n邮箱或密码错误。请检查后重试。")  # 与用户交互的提示
                     # 清除错误的凭据，以便下次重新输入
-                    credentials_file_path = os.path.join(os.path.expanduser("~"), "secrets", f"{USER_KEY}_platform-brain.json")
-                    if os.path.exists(credentials_file_path):
-                        os.remove(credentials_file_path)
+                    try:
+                        os.remove(_CREDENTIALS_FILE)
+                    except FileNotFoundError:
+                        pass
                     # 使用受保护的递归调用，避免无限递归
                     return perform_full_login_with_retry_limit(max_credential_retries - 1)
 
@@ -209,8 +307,8 @@ def perform_full_login_with_retry_limit(max_credential_retries: int = 2) -> requ
         except requests.exceptions.RequestException as e:
             logger.warning(f"登录时发生网络或请求错误: {e}")
             if attempt < max_retries - 1:
-                wait_time = initial_backoff * (2 ** attempt)
-                logger.info(f"将在 {wait_time} 秒后重试...")
+                wait_time = min(60, initial_backoff * (2 ** attempt)) * (0.5 + random.random())
+                logger.info(f"将在 {wait_time:.1f} 秒后重试...")
                 time.sleep(wait_time)
             else:
                 logger.warning("达到最大重试次数，登录失败。")
@@ -226,6 +324,48 @@ def perform_full_login() -> requests.Session:
     return perform_full_login_with_retry_limit(max_credential_retries=2)
 
 
+def _load_cached_cookies() -> Optional[tuple]:
+    """
+    读取缓存的 Cookie 文件；文件的修改时间未变化时直接复用上次解析的结果。
+    
+    兼容旧格式（文件内容直接是 Cookie 字典，没有过期时间）。
+    
+    Returns:
+        tuple: (cookies, expiry_at)，expiry_at 为绝对过期时间戳，未记录时为 None；
+        文件不存在、损坏或为空时返回 None
+    """
+    global _cookie_cache
+    try:
+        st = os.stat(COOKIE_FILE_PATH)
+    except OSError:
+        return None
+    
+    cache = _cookie_cache
+    if cache is not None and cache[0] == COOKIE_FILE_PATH and cache[1] == st.st_mtime_ns:
+        return cache[2]
+    
+    logger.info(f"发现已缓存的 Cookie 文件: {COOKIE_FILE_PATH}")
+    # 只读取一次：文件损坏或为空时直接执行完整登录，不再等待重试
+    try:
+        with open(COOKIE_FILE_PATH, 'rb') as f:
+            data = _json_loads(f.read())
+    except (json.JSONDecodeError, ValueError):
+        logger.warning("Cookie 文件损坏或为空，将执行完整登录。")
+        return None
+    except OSError:
+        return None
+    
+    if isinstance(data, dict) and isinstance(data.get("cookies"), dict):
+        loaded = (data["cookies"], data.get("expiry_at"))
+    else:
+        loaded = (data, None)
+    if not loaded[0]:
+        return None
+    
+    _cookie_cache = (COOKIE_FILE_PATH, st.st_mtime_ns, loaded)
+    return loaded
+
+
 def start_session(min_remaining_seconds: Optional[int] = None) -> requests.Session:
     """
     智能获取已认证的 requests 会话对象。
@@ -236,27 +376,15 @@ def start_session(min_remaining_seconds: Optional[int] = None) -> requests.Sessi
     if min_remaining_seconds is None:
         min_remaining_seconds = MIN_REMAINING_SECONDS
     
-    if Path(COOKIE_FILE_PATH).is_file():
-        logger.info(f"发现已缓存的 Cookie 文件: {COOKIE_FILE_PATH}")
-        # 增加重试逻辑以处理文件并发读写导致的空文件或不完整JSON
-        for i in range(3):
-            try:
-                with open(COOKIE_FILE_PATH, 'r') as f:
-                    cookies = json.load(f)
-                break
-            except (json.JSONDecodeError, ValueError):
-                if i < 2:
-                    time.sleep(0.5)
-                else:
-                    logger.warning("Cookie 文件损坏或为空，将执行完整登录。")
-                    cookies = None
-            except Exception:
-                cookies = None
-                break
-        
-        if cookies:
+    loaded = _load_cached_cookies()
+    if loaded:
+        cookies, expiry_at = loaded
+        if expiry_at is not None and expiry_at - time.time() < min_remaining_seconds:
+            # 本地记录已表明会话过期或即将过期，无需再发请求确认
+            logger.info("缓存的会话已过期或即将过期（本地记录），需要重新登录。")
+        else:
             try:
-                s = requests.Session()
+                s = _new_session()
                 s.cookies.update(cookies)
                 if check_session_validity(s, min_remaining_seconds=min_remaining_seconds):
                     logger.info("使用缓存的会话成功恢复登录状态。")
@@ -264,7 +392,7 @@ def start_session(min_remaining_seconds: Optional[int] = None) -> requests.Sessi
                 else:
                     logger.info("缓存的会话已失效，需要重新登录。")
             except Exception as e:
-                 logger.warning(f"恢复会话失败: {e}")
+                logger.warning(f"恢复会话失败: {e}")
 
     return perform_full_login()
 
@@ -272,6 +400,8 @@ def start_session(min_remaining_seconds: Optional[int] = None) -> requests.Sessi
 def check_session_timeout(s):
     """
     Function checks session time out
+    与 check_session_validity 共用 _probe_session，但只尝试一次、不做退避重试：
+    SessionManager 在持锁状态下调用它，重试等待会阻塞所有 get_session() 调用方。无法获取时返回 0。
 
     json_example = 
 {
@@ -295,16 +425,7 @@ def check_session_timeout(s):
   ]
 }
     """
-    
-    authentication_url = brain_api_url + "/authentication"
-    try:
-        response = s.get(authentication_url, timeout=15)
-        response.raise_for_status()
-        result = response.json().get("token", {}).get("expiry")
-        return result
-    except (requests.exceptions.RequestException, KeyError, json.JSONDecodeError) as e:
-        logger.warning(f"检查会话超时时出错: {e}")
-        return 0
+    return _probe_session(s, max_retries=1) or 0
 
 
 def clear_credentials():
@@ -313,31 +434,24 @@ def clear_credentials():
     """
     files_cleared = 0
     
-    # 清除凭证文件
-    credentials_file_path = os.path.join(os.path.expanduser("~"), "secrets", f"{USER_KEY}_platform-brain.json")
-    credentials_file = Path(credentials_file_path)
-    
+    # 清除凭证文件（直接 unlink，不存在时由异常判断，省去额外的 exists 检查）
     try:
-        if credentials_file.exists():
-            credentials_file.unlink()
-            logger.info(f"凭证文件已清除: {credentials_file_path}")
-            files_cleared += 1
-        else:
-            logger.info(f"未找到凭证文件: {credentials_file_path}")
-    except (OSError, PermissionError) as e:
+        os.remove(_CREDENTIALS_FILE)
+        logger.info(f"凭证文件已清除: {_CREDENTIALS_FILE}")
+        files_cleared += 1
+    except FileNotFoundError:
+        logger.info(f"未找到凭证文件: {_CREDENTIALS_FILE}")
+    except OSError as e:
         logger.warning(f"清除凭证文件时出错: {e}")
     
     # 清除会话cookie文件
-    cookie_file = Path(COOKIE_FILE_PATH)
-    
     try:
-        if cookie_file.exists():
-            cookie_file.unlink()
-            logger.info(f"会话cookie文件已清除: {COOKIE_FILE_PATH}")
-            files_cleared += 1
-        else:
-            logger.info(f"未找到会话cookie文件: {COOKIE_FILE_PATH}")
-    except (OSError, PermissionError) as e:
+        os.remove(COOKIE_FILE_PATH)
+        logger.info(f"会话cookie文件已清除: {COOKIE_FILE_PATH}")
+        files_cleared += 1
+    except FileNotFoundError:
+        logger.info(f"未找到会话cookie文件: {COOKIE_FILE_PATH}")
+    except OSError as e:
         logger.warning(f"清除会话cookie文件时出错: {e}")
     
     if files_cleared > 0: